@@ -0,0 +1,72 @@
+"""Conversions per second through ``Service.convert`` with a warm cache.
+
+Run with ``poetry run python benchmarks/bench_convert.py``. The database
+manager is an autospec, so the run also proves that a warm cache issues
+no queries.
+"""
+
+import asyncio
+import random
+import time
+from datetime import UTC, datetime
+from decimal import Decimal
+from unittest.mock import create_autospec
+
+from currencies import CURRENCIES
+from db.manager import DBManager
+from dtos import RatesSnapshot
+from rates_cache import RatesCache
+from requesters import RatesRequester
+from service import Service
+
+CONVERSIONS = 200_000
+
+
+def build_snapshot() -> RatesSnapshot:
+    rnd = random.Random(42)
+    iso_codes = [iso for iso in CURRENCIES if iso != Service.BASE_CURRENCY]
+    return RatesSnapshot(
+        base_iso_code=Service.BASE_CURRENCY,
+        base_currency_id=1,
+        version=datetime.now(tz=UTC),
+        rates={
+            iso: Decimal(str(round(rnd.uniform(0.01, 5000), 6)))
+            for iso in iso_codes
+        },
+        currency_ids={iso: i for i, iso in enumerate(iso_codes, start=2)},
+    )
+
+
+async def main() -> None:
+    db_manager = create_autospec(DBManager, instance=True)
+    cache = RatesCache(db_manager, Service.BASE_CURRENCY, ttl=3600)
+    cache.swap(build_snapshot())
+    service = Service(
+        db_manager,
+        create_autospec(RatesRequester, instance=True),
+        rates_cache=cache,
+    )
+
+    rnd = random.Random(7)
+    iso_codes = list(CURRENCIES)
+    pairs = [
+        (rnd.choice(iso_codes), rnd.choice(iso_codes)) for _ in range(1024)
+    ]
+    amount = Decimal("123.45")
+
+    started = time.perf_counter()
+    for i in range(CONVERSIONS):
+        from_iso_code, to_iso_code = pairs[i & 1023]
+        _ = await service.convert(amount, from_iso_code, to_iso_code)
+    elapsed = time.perf_counter() - started
+
+    assert not db_manager.get_rates_version.called
+    assert not db_manager.get_rates_from.called
+    print(  # noqa: T201
+        f"{CONVERSIONS} conversions in {elapsed:.3f}s: "
+        f"{CONVERSIONS / elapsed:,.0f} conversions/sec",
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Throughput and peak memory of parsing and batching a CSV statement.
+
+Run with ``poetry run python benchmarks/bench_csv_import.py [ROWS]``. A
+statement of ``ROWS`` lines is written to a temporary file, then read and
+resolved into insert batches the way ``Service.import_statement`` does,
+without the database writes. Peak memory is traced for the streamed read
+and for reading the whole file into a list first.
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+
+from csv_import import StatementResolver, read_statement
+from db.models import Account, Category
+from dtos import ColumnMapping, UserRefData
+from env import IMPORT_CHUNK_SIZE
+from expense_parser import CategoryMatcher
+from misc import DEFAULT_CATEGORIES
+
+NOTES = ["Coffee downtown", "Taxi to work", "Supermarket", "Paycheck", ""]
+
+
+def make_refdata() -> UserRefData:
+    categories = {
+        i: Category(
+            category_id=i,
+            user_id=1,
+            name=category["name"],
+            type=category["category_type"],
+        )
+        for i, category in enumerate(DEFAULT_CATEGORIES)
+    }
+    account = Account(
+        account_id=1,
+        user_id=1,
+        name="Default",
+        balance=Decimal(0),
+        currency_id=1,
+    )
+    return UserRefData(
+        user_id=1,
+        version=1,
+        categories=categories,
+        accounts={1: account},
+    )
+
+
+def write_statement(path: Path, rows: int) -> None:
+    with path.open("w", encoding="utf-8") as file:
+        _ = file.write("date,amount,category,note\n")
+        for i in range(rows):
+            category = "Groceries" if i % 3 == 0 else ""
+            note = NOTES[i % len(NOTES)]
+            _ = file.write(f"2025-03-{i % 28 + 1:02},-{i % 97}.50,")
+            _ = file.write(f"{category},{note}\n")
+
+
+def run(path: Path, *, streamed: bool) -> tuple[float, int, int]:
+    refdata = make_refdata()
+    resolver = StatementResolver(
+        refdata,
+        CategoryMatcher(refdata.categories.values()),
+        1,
+    )
+    imported = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    with path.open(encoding="utf-8-sig", newline="") as lines:
+        rows = read_statement(lines, ColumnMapping())
+        if not streamed:
+            rows = iter(list(rows))
+        while chunk := list(islice(rows, IMPORT_CHUNK_SIZE)):
+            imported += len(resolver.resolve(chunk).account_ids)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, imported
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "statement.csv"
+        write_statement(path, rows)
+        for streamed in (True, False):
+            elapsed, peak, imported = run(path, streamed=streamed)
+            label = "streamed" if streamed else "read whole"
+            print(  # noqa: T201
+                f"{label:>10}: {imported} rows in {elapsed:.2f}s, "
+                f"{rows / elapsed:,.0f} rows/s, "
+                f"peak {peak / 2**20:.1f} MiB",
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
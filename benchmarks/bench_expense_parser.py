@@ -0,0 +1,90 @@
+"""Latency of parsing a free-text expense for a user with many categories.
+
+Run with ``poetry run python benchmarks/bench_expense_parser.py
+[CATEGORIES]``. Messages are parsed against a cached trie of the user's
+category names, and against a naive scan that tries every category phrase
+on every message, for comparison.
+"""
+
+import sys
+import time
+
+from db.models import Category
+from dtos import UserRefData
+from expense_parser import ExpenseParser, normalize_words
+from misc import CategoryType
+
+MESSAGES = [
+    "12.50$ item bm with friends",
+    "+1500 eur item h long phrase bonus",
+    "item lp long phrase 23,40 € to the airport",
+    "3 item jq",
+    "item j long phrase 9.90",
+]
+ROUNDS = 20_000
+
+
+def category_name(i: int) -> str:
+    # Names are words, digits would be taken for the amount
+    letters, rest = "", i
+    while True:
+        rest, digit = divmod(rest, 26)
+        letters = chr(ord("a") + digit) + letters
+        if not rest:
+            break
+    return f"Item {letters} long phrase" if i % 2 else f"Item {letters}"
+
+
+def naive_match(words: list[str], phrases: dict[int, list[str]]) -> int:
+    best_id, best_len = -1, 0
+    for category_id, phrase in phrases.items():
+        size = len(phrase)
+        for start in range(len(words) - size + 1):
+            if words[start : start + size] == phrase and size > best_len:
+                best_id, best_len = category_id, size
+    return best_id
+
+
+def main(category_count: int) -> None:
+    categories = {
+        i: Category(
+            category_id=i,
+            user_id=1,
+            name=category_name(i),
+            type=CategoryType.EXPENSE,
+        )
+        for i in range(category_count)
+    }
+    refdata = UserRefData(
+        user_id=1,
+        version=1,
+        categories=categories,
+        accounts={},
+    )
+    parser = ExpenseParser()
+    _ = parser.parse(refdata, MESSAGES[0])
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for message in MESSAGES:
+            _ = parser.parse(refdata, message)
+    trie_us = (time.perf_counter() - started) / ROUNDS / len(MESSAGES) * 1e6
+
+    phrases = {
+        c.category_id: normalize_words(c.name.split())
+        for c in categories.values()
+    }
+    rounds = max(ROUNDS // 100, 1)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            _ = naive_match(normalize_words(message.split()), phrases)
+    naive_us = (time.perf_counter() - started) / rounds / len(MESSAGES) * 1e6
+
+    print(f"{category_count} categories")  # noqa: T201
+    print(f"trie parse:  {trie_us:8.1f} us/message")  # noqa: T201
+    print(f"naive scan:  {naive_us:8.1f} us/message")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
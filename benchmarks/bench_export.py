@@ -0,0 +1,73 @@
+"""Peak memory of exporting a long transaction history.
+
+Run with ``poetry run python benchmarks/bench_export.py [ROWS]``. Rows
+are produced by an async generator standing in for the database cursor
+and written into a spooled temporary file as CSV and XLSX (when openpyxl
+is installed). For comparison the rows are also collected into a list
+first, as ``DBManager.get_user_transactions`` does.
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+from db.queries import ExportTransactionsRow
+from env import EXPORT_SPOOL_SIZE
+from export import ExportFormat, openpyxl, write_export
+
+START = datetime(2020, 1, 1, tzinfo=UTC)
+
+
+async def cursor(rows: int) -> AsyncIterator[ExportTransactionsRow]:
+    for i in range(rows):
+        yield ExportTransactionsRow.model_construct(
+            transaction_id=i,
+            date=START + timedelta(minutes=i),
+            account_name="Default",
+            iso_code="EUR",
+            category_name="Groceries",
+            category_type="expense",
+            withdrawal_amount=Decimal(-i) / 100,
+            expense_amount=Decimal(-i) / 100,
+            note=f"Receipt {i}",
+        )
+
+
+async def collected(rows: int) -> AsyncIterator[ExportTransactionsRow]:
+    for row in [row async for row in cursor(rows)]:
+        yield row
+
+
+async def run(rows: int, export_format: ExportFormat, *, stream: bool) -> None:
+    source = cursor(rows) if stream else collected(rows)
+    tracemalloc.start()
+    started = time.perf_counter()
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as file:
+        _ = await write_export(source, file, export_format)
+        size = file.tell()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    label = f"{export_format} {'streamed' if stream else 'collected'}"
+    print(  # noqa: T201
+        f"{label:>15}: {size / 2**20:5.1f} MiB file in {elapsed:.2f}s, "
+        f"peak {peak / 2**20:.1f} MiB",
+    )
+
+
+async def main(rows: int) -> None:
+    formats = [ExportFormat.CSV]
+    if openpyxl is not None:
+        formats.append(ExportFormat.XLSX)
+    for export_format in formats:
+        for stream in (True, False):
+            await run(rows, export_format, stream=stream)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,95 @@
+"""As-of conversion of 100k transactions against 5 years of rate history.
+
+Run with ``poetry run python benchmarks/bench_ledger.py``. The input is
+synthetic and shaped like the rows returned by ``GetUserLedgerArrays``
+and ``GetRateHistoryArrays``: hourly rates for every currency involved.
+"""
+
+import time
+from datetime import UTC, datetime
+
+import numpy as np
+
+from db.queries import GetRateHistoryArraysRow, GetUserLedgerArraysRow
+from ledger import (
+    LedgerArrays,
+    RateHistoryArrays,
+    convert_ledger,
+    totals_by_category_month,
+)
+
+TRANSACTIONS = 100_000
+YEARS = 5
+CURRENCY_IDS = [1, 2, 3, 4, 5, 6]  # 1 is the base currency
+BASE_CURRENCY_ID = 1
+HOME_CURRENCY_ID = 2
+CATEGORIES = 40
+ROUNDS = 20
+
+
+def build_rows() -> tuple[GetUserLedgerArraysRow, GetRateHistoryArraysRow]:
+    rng = np.random.default_rng(42)
+    end = int(datetime(2025, 5, 1, tzinfo=UTC).timestamp())
+    start = end - YEARS * 365 * 24 * 3600
+    hours = np.arange(start, end, 3600, dtype=np.int64)
+
+    rated = np.array(CURRENCY_IDS[1:], dtype=np.int64)
+    history_currencies = np.repeat(rated, hours.size)
+    history_timestamps = np.tile(hours, rated.size)
+    history_rates = rng.uniform(0.5, 150, rated.size).repeat(hours.size) * (
+        1 + rng.normal(0, 0.001, history_currencies.size).cumsum() / 100
+    )
+
+    dates = np.sort(rng.integers(start, end, TRANSACTIONS))
+    ledger = GetUserLedgerArraysRow(
+        dates=dates.tolist(),
+        category_ids=rng.integers(1, CATEGORIES + 1, TRANSACTIONS).tolist(),
+        currency_ids=rng.choice(CURRENCY_IDS, TRANSACTIONS).tolist(),
+        amounts=np.round(rng.uniform(-300, 50, TRANSACTIONS), 2).tolist(),
+    )
+    history = GetRateHistoryArraysRow(
+        to_currencies=history_currencies.tolist(),
+        timestamps=history_timestamps.tolist(),
+        rates=history_rates.tolist(),
+    )
+    return ledger, history
+
+
+def main() -> None:
+    ledger_row, history_row = build_rows()
+    print(  # noqa: T201
+        f"{TRANSACTIONS} transactions, "
+        f"{len(history_row.rates)} rate history rows",
+    )
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        ledger = LedgerArrays.from_row(ledger_row)
+        history = RateHistoryArrays.from_row(history_row)
+    to_arrays = (time.perf_counter() - started) / ROUNDS
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        converted = convert_ledger(
+            ledger,
+            history,
+            BASE_CURRENCY_ID,
+            HOME_CURRENCY_ID,
+        )
+    conversion = (time.perf_counter() - started) / ROUNDS
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        totals = totals_by_category_month(ledger, converted)
+    aggregation = (time.perf_counter() - started) / ROUNDS
+
+    print(f"rows to arrays:      {to_arrays * 1000:8.2f} ms")  # noqa: T201
+    print(f"as-of conversion:    {conversion * 1000:8.2f} ms")  # noqa: T201
+    print(  # noqa: T201
+        f"category/month sums: {aggregation * 1000:8.2f} ms "
+        f"({len(totals)} groups)",
+    )
+
+
+if __name__ == "__main__":
+    main()
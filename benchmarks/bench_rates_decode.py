@@ -0,0 +1,83 @@
+"""Parse plus normalize time of a 170-currency rates response.
+
+Run with ``poetry run python benchmarks/bench_rates_decode.py``. The
+``float`` path mirrors the previous decoding: ``response.json()``, a
+``dict[str, float]`` model and ``Decimal(str(rate))`` per rate.
+"""
+
+import json
+import random
+import time
+from collections.abc import Callable
+from decimal import Decimal
+
+from pydantic import BaseModel
+
+from currencies import CURRENCIES
+from requesters import decode_rates
+from service import Service
+
+ROUNDS = 5_000
+
+
+class FloatRates(BaseModel):
+    source_iso_code: str
+    timestamp: int
+    data: dict[str, float]
+
+
+def build_payload() -> bytes:
+    rnd = random.Random(42)
+    rates = {iso: round(rnd.uniform(0.01, 5000), 6) for iso in CURRENCIES}
+    return json.dumps(
+        {
+            "success": True,
+            "timestamp": 1746093600,
+            "base": Service.BASE_CURRENCY,
+            "date": "2025-05-01",
+            "rates": rates,
+        },
+    ).encode()
+
+
+def float_path(content: bytes) -> tuple[list[str], list[Decimal]]:
+    response = json.loads(content)
+    rates = FloatRates(
+        source_iso_code=response["base"],
+        timestamp=response["timestamp"],
+        data=response["rates"],
+    )
+    iso_codes: list[str] = []
+    values: list[Decimal] = []
+    for iso_code, rate in rates.data.items():
+        if iso_code in CURRENCIES:
+            iso_codes.append(iso_code)
+            values.append(Decimal(str(rate)))
+    return iso_codes, values
+
+
+def decimal_path(content: bytes) -> tuple[list[str], list[Decimal]]:
+    normalized = Service.normalize_rates(decode_rates(content))
+    return normalized.iso_codes, normalized.rates
+
+
+def measure(path: Callable[[bytes], object], content: bytes) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        _ = path(content)
+    return (time.perf_counter() - started) / ROUNDS
+
+
+def main() -> None:
+    content = build_payload()
+    assert float_path(content) == decimal_path(content)
+    print(  # noqa: T201
+        f"{len(json.loads(content)['rates'])} rates, {len(content)} bytes",
+    )
+    for name, path in (("float", float_path), ("decimal", decimal_path)):
+        took = measure(path, content)
+        print(f"{name:>8}: {took * 1_000_000:8.1f} us")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
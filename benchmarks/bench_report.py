@@ -0,0 +1,85 @@
+"""Event loop lag while drawing report charts, and cached report latency.
+
+Run with ``poetry run python benchmarks/bench_report.py [CHARTS]``.
+``CHARTS`` charts of twelve months and ten categories are drawn once
+directly on the event loop and once through ``ChartRenderer``, while a
+ticker measures how late the loop wakes it up, i.e. how long other bot
+updates would wait. Cached lookups are timed for comparison.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import date
+
+from charts import (
+    ChartCache,
+    ChartRenderer,
+    Period,
+    SpendingChart,
+    render_spending_chart,
+)
+
+TICK = 0.005
+CHART = SpendingChart(
+    title="Spending per month, EUR",
+    months=tuple(f"{month:02}/2025" for month in range(1, 13)),
+    series=tuple(
+        (f"Category {i}", tuple(float(i * m % 97) for m in range(12)))
+        for i in range(10)
+    ),
+)
+
+
+async def max_lag(stop: asyncio.Event) -> float:
+    lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lag = max(lag, time.perf_counter() - started - TICK)
+    return lag
+
+
+async def measure(charts: int, *, pooled: bool) -> tuple[float, float]:
+    renderer = ChartRenderer()
+    # Start the worker outside of the measurement
+    _ = await renderer.render(CHART)
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(max_lag(stop))
+    await asyncio.sleep(TICK)
+    started = time.perf_counter()
+    for _ in range(charts):
+        if pooled:
+            _ = await renderer.render(CHART)
+        else:
+            _ = render_spending_chart(CHART)
+            await asyncio.sleep(0)
+    elapsed = (time.perf_counter() - started) / charts
+    stop.set()
+    lag = await ticker
+    await renderer.close()
+    return elapsed, lag
+
+
+async def main(charts: int) -> None:
+    for pooled in (False, True):
+        elapsed, lag = await measure(charts, pooled=pooled)
+        label = "process pool" if pooled else "event loop"
+        print(  # noqa: T201
+            f"{label:>12}: {elapsed * 1000:6.1f} ms per chart, "
+            f"max loop lag {lag * 1000:6.1f} ms",
+        )
+
+    cache = ChartCache()
+    period = Period(date(2025, 1, 1), date(2025, 12, 1))
+    cache.put(1, period, (1, None), render_spending_chart(CHART))
+    rounds = 100_000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        _ = cache.get(1, period, (1, None))
+    elapsed = (time.perf_counter() - started) / rounds
+    print(f"{'cached':>12}: {elapsed * 1e6:6.2f} us per chart")  # noqa: T201
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
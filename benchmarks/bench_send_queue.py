@@ -0,0 +1,73 @@
+"""Reply latency while a broadcast is being sent.
+
+Run with ``poetry run python benchmarks/bench_send_queue.py [BROADCAST]``.
+``BROADCAST`` messages to different chats are queued at once, then a
+reply is sent every 100 ms. Replies are timed once as broadcasts
+themselves, i.e. waiting in line, and once as interactive sends that
+overtake the queue. Sending is simulated, no requests reach Telegram.
+"""
+
+import asyncio
+import sys
+import time
+
+from rate_limiter import Priority, SendRateLimiter
+
+REPLIES = 10
+REPLY_INTERVAL = 0.1
+
+
+async def sent() -> bool:
+    return True
+
+
+async def send(
+    limiter: SendRateLimiter,
+    chat_id: int,
+    priority: Priority,
+) -> float:
+    started = time.perf_counter()
+    _ = await limiter.process_request(
+        sent,
+        (),
+        {},
+        "sendMessage",
+        {"chat_id": chat_id},
+        priority,
+    )
+    return time.perf_counter() - started
+
+
+async def measure(broadcast: int, reply_priority: Priority) -> list[float]:
+    limiter = SendRateLimiter()
+    await limiter.initialize()
+    broadcasts = [
+        asyncio.create_task(send(limiter, chat_id, Priority.BROADCAST))
+        for chat_id in range(1, broadcast + 1)
+    ]
+    replies: list[asyncio.Task[float]] = []
+    for chat_id in range(-REPLIES, 0):
+        await asyncio.sleep(REPLY_INTERVAL)
+        # Group chat ids are negative, they never collide with broadcasts
+        replies.append(
+            asyncio.create_task(send(limiter, chat_id, reply_priority)),
+        )
+    waits = await asyncio.gather(*replies)
+    for task in broadcasts:
+        _ = task.cancel()
+    await limiter.shutdown()
+    return sorted(waits)
+
+
+async def main(broadcast: int) -> None:
+    for priority in (Priority.BROADCAST, Priority.INTERACTIVE):
+        waits = await measure(broadcast, priority)
+        print(  # noqa: T201
+            f"{priority.name.lower():>11} replies: "
+            f"median {waits[len(waits) // 2] * 1000:8.1f} ms, "
+            f"max {waits[-1] * 1000:8.1f} ms",
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
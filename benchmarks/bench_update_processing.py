@@ -0,0 +1,114 @@
+"""Bot throughput with sequential vs concurrent update processing.
+
+Run with ``poetry run python benchmarks/bench_update_processing.py
+[LATENCY]``. Fake updates from a handful of users are pushed through a
+real ``Application`` (with a bot that never talks to Telegram) whose
+handler waits ``LATENCY`` seconds, standing in for a database round trip.
+The run compares the default one-at-a-time processing with
+``UserOrderedUpdateProcessor`` and checks that every user's updates were
+still handled in order.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import UTC, datetime
+from typing import Any, override
+
+from telegram import Chat, Message, Update, User
+from telegram.ext import (
+    ApplicationBuilder,
+    BaseUpdateProcessor,
+    ContextTypes,
+    ExtBot,
+    MessageHandler,
+    SimpleUpdateProcessor,
+    filters,
+)
+
+from update_processor import UserOrderedUpdateProcessor
+
+UPDATES = 400
+USERS = 50
+RUNNING_UPDATES = 8
+
+
+class OfflineBot(ExtBot):
+    @override
+    async def get_me(self, *args: Any, **kwargs: Any) -> User:
+        self._bot_user = User(id=1, first_name="Bot", is_bot=True)
+        return self._bot_user
+
+
+def make_updates() -> list[Update]:
+    date = datetime.now(tz=UTC)
+    return [
+        Update(
+            update_id=i,
+            message=Message(
+                message_id=i,
+                date=date,
+                chat=Chat(id=i % USERS, type=Chat.PRIVATE),
+                from_user=User(id=i % USERS, first_name="User", is_bot=False),
+                text=f"/edit {i}",
+            ),
+        )
+        for i in range(UPDATES)
+    ]
+
+
+async def run(processor: BaseUpdateProcessor, latency: float) -> float:
+    handled: dict[int, list[int]] = {}
+    done = asyncio.Event()
+
+    async def handle(
+        update: Update,
+        _: ContextTypes.DEFAULT_TYPE,
+    ) -> None:
+        await asyncio.sleep(latency)
+        assert update.effective_user is not None
+        handled.setdefault(update.effective_user.id, []).append(
+            update.update_id,
+        )
+        if sum(map(len, handled.values())) == UPDATES:
+            done.set()
+
+    app = (
+        ApplicationBuilder()
+        .bot(OfflineBot("1:offline"))
+        .updater(None)
+        .concurrent_updates(processor)
+        .build()
+    )
+    app.add_handler(MessageHandler(filters.TEXT, handle))
+
+    async with app:
+        await app.start()
+        started = time.perf_counter()
+        for update in make_updates():
+            await app.update_queue.put(update)
+        _ = await done.wait()
+        elapsed = time.perf_counter() - started
+        await app.stop()
+
+    assert all(ids == sorted(ids) for ids in handled.values())
+    return elapsed
+
+
+async def main(latency: float) -> None:
+    for name, processor in (
+        ("sequential", SimpleUpdateProcessor(1)),
+        (
+            f"user-ordered x{RUNNING_UPDATES}",
+            UserOrderedUpdateProcessor(RUNNING_UPDATES),
+        ),
+    ):
+        elapsed = await run(processor, latency)
+        print(  # noqa: T201
+            f"{name}: {UPDATES} updates in {elapsed:.3f}s, "
+            f"{UPDATES / elapsed:,.0f} updates/s",
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.005))
@@ -0,0 +1,80 @@
+"""Rates update pipeline replayed from recorded provider responses.
+
+Run with ``poetry run python benchmarks/bench_update_rates.py [LATENCY]``.
+Responses come from ``tests/fixtures/rates`` (record fresh ones with
+``RecordingRatesRequester``) and the database manager is an autospec, so
+the run needs no network and measures the fetch, decode, normalize and
+delta computation of ``Service.update_currency_rates``. Pass a provider
+latency in seconds to see it in the totals; wrap the run in
+``python -m cProfile`` to profile the pipeline.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import create_autospec
+
+from loguru import logger
+
+from currencies import CURRENCIES
+from db.manager import DBManager
+from db.models import Currency
+from db.queries import GetRatesFromRow
+from rates_cache import RatesCache
+from requesters import ReplayRatesRequester
+from service import Service
+
+FIXTURES_DIR = Path(__file__).parent.parent / "tests" / "fixtures" / "rates"
+UPDATES = 500
+
+
+def make_db_manager() -> DBManager:
+    db_manager = create_autospec(DBManager, instance=True)
+    currency_ids = {iso: i for i, iso in enumerate(CURRENCIES, start=1)}
+    db_manager.get_or_create_currency.return_value = Currency(
+        currency_id=currency_ids[Service.BASE_CURRENCY],
+        name="Euro",
+        iso_code=Service.BASE_CURRENCY,
+        symbol="€",
+    )
+    db_manager.get_rates_synced_at.return_value = None
+    # Rates as stored by the previous update, so every run computes deltas
+    db_manager.get_rates_from.return_value = [
+        GetRatesFromRow(
+            from_currency=currency_ids[Service.BASE_CURRENCY],
+            to_currency=currency_id,
+            iso_code=iso_code,
+            rate=1,
+            updated_at=datetime.now(tz=UTC),
+        )
+        for iso_code, currency_id in currency_ids.items()
+    ]
+    return db_manager
+
+
+async def main(latency: float) -> None:
+    logger.remove()
+    db_manager = make_db_manager()
+    requester = ReplayRatesRequester(FIXTURES_DIR, latency=latency, seed=0)
+    service = Service(
+        db_manager,
+        requester,
+        rates_cache=RatesCache(db_manager, Service.BASE_CURRENCY),
+    )
+
+    started = time.perf_counter()
+    for _ in range(UPDATES):
+        _ = await service.update_currency_rates()
+    elapsed = time.perf_counter() - started
+
+    assert db_manager.update_currency_rates.call_count == UPDATES
+    print(  # noqa: T201
+        f"{UPDATES} updates in {elapsed:.3f}s: "
+        f"{elapsed / UPDATES * 1_000_000:,.0f} us per update",
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 0))
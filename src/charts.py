@@ -0,0 +1,213 @@
+import asyncio
+import io
+import multiprocessing
+from collections.abc import Hashable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+
+from db.models import Category
+from dtos import CategoryMonthTotal
+from env import CHART_CACHE_SIZE, CHART_QUEUE_SIZE, CHART_WORKERS
+from exceptions import ChartQueueFullError
+from lru import LRUCache
+from misc import CategoryType
+
+# Categories drawn separately, the smaller ones are summed up as "Other"
+MAX_SERIES = 8
+
+
+@dataclass(frozen=True, slots=True)
+class Period:
+    # First days of the first and the last month, both included
+    first_month: date
+    last_month: date
+
+    @classmethod
+    def last_months(cls, months: int, today: date) -> "Period":
+        last_month = today.replace(day=1)
+        index = last_month.year * 12 + last_month.month - 1 - (months - 1)
+        return cls(date(index // 12, index % 12 + 1, 1), last_month)
+
+    def months(self) -> list[date]:
+        months: list[date] = []
+        month = self.first_month
+        while month <= self.last_month:
+            months.append(month)
+            year, index = divmod(month.month, 12)
+            month = date(month.year + year, index + 1, 1)
+        return months
+
+
+@dataclass(frozen=True, slots=True)
+class SpendingChart:
+    """Everything needed to draw a chart, sent to the rendering process."""
+
+    title: str
+    months: tuple[str, ...]
+    # (category name, spending per month), largest spending first
+    series: tuple[tuple[str, tuple[float, ...]], ...]
+
+
+def build_spending_chart(
+    totals: Sequence[CategoryMonthTotal],
+    categories: Mapping[int, Category],
+    period: Period,
+    iso_code: str,
+) -> SpendingChart | None:
+    """Spending per expense category and month, None if there is none."""
+    months = period.months()
+    positions = {month: i for i, month in enumerate(months)}
+    spending: dict[int, list[float]] = {}
+    for total in totals:
+        category = categories.get(total.category_id)
+        position = positions.get(total.month)
+        if (
+            category is None
+            or category.type != CategoryType.EXPENSE
+            or position is None
+        ):
+            continue
+        values = spending.setdefault(total.category_id, [0.0] * len(months))
+        # Expenses are withdrawals, i.e. negative
+        values[position] = -float(total.total)
+
+    ranked = sorted(spending.items(), key=lambda item: -sum(item[1]))
+    series = [
+        (categories[category_id].name, tuple(values))
+        for category_id, values in ranked[:MAX_SERIES]
+    ]
+    if len(ranked) > MAX_SERIES:
+        other = [
+            sum(month) for month in zip(*(v for _, v in ranked[MAX_SERIES:]))
+        ]
+        series.append(("Other", tuple(other)))
+    if not any(any(values) for _, values in series):
+        return None
+
+    return SpendingChart(
+        title=f"Spending per month, {iso_code}",
+        months=tuple(month.strftime("%b %Y") for month in months),
+        series=tuple(series),
+    )
+
+
+def render_spending_chart(chart: SpendingChart) -> bytes:
+    """Draw ``chart`` as a stacked bar chart PNG.
+
+    Runs in a worker process; matplotlib is imported there only so that
+    bot processes never load it.
+    """
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(8, 4.5), dpi=100, layout="constrained")
+    axes = figure.subplots()
+    bottoms = [0.0] * len(chart.months)
+    for name, values in chart.series:
+        _ = axes.bar(chart.months, values, bottom=bottoms, label=name)
+        bottoms = [b + v for b, v in zip(bottoms, values, strict=True)]
+    _ = axes.set_title(chart.title)
+    _ = axes.legend(loc="upper left", fontsize="small")
+    axes.tick_params(axis="x", labelrotation=45)
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    """Renders charts in a process pool so the event loop never blocks.
+
+    At most ``queue_size`` charts wait for or are being drawn, more
+    requests are refused with ``ChartQueueFullError`` instead of piling
+    up behind a slow pool.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = CHART_WORKERS,
+        queue_size: int = CHART_QUEUE_SIZE,
+    ) -> None:
+        self._max_workers = max_workers
+        self._queue_size = queue_size
+        self._pending = 0
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def render(self, chart: SpendingChart) -> bytes:
+        if self._pending >= self._queue_size:
+            msg = "Too many reports are being drawn, try again later"
+            raise ChartQueueFullError(msg)
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_pool(),
+                render_spending_chart,
+                chart,
+            )
+        finally:
+            self._pending -= 1
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Started on first use, so processes that never draw pay nothing
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self._max_workers,
+                # Forking a process with running threads is unsafe
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            # Waiting would block the event loop until a chart is drawn
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class ChartCache:
+    """Rendered charts per user, valid for one version of their data.
+
+    ``version`` is anything that changes with the data a chart is drawn
+    from, e.g. the user's ``ledger_version`` with the rates version.
+    Charts of an older version are never returned and are replaced by the
+    first chart stored for a newer one; ``invalidate`` drops them right
+    away when the user's transactions are written through this process.
+    """
+
+    def __init__(self, maxsize: int = CHART_CACHE_SIZE) -> None:
+        self._entries: LRUCache[int, tuple[Hashable, dict[Period, bytes]]] = (
+            LRUCache(maxsize)
+        )
+
+    def get(
+        self,
+        user_id: int,
+        period: Period,
+        version: Hashable,
+    ) -> bytes | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1].get(period)
+
+    def put(
+        self,
+        user_id: int,
+        period: Period,
+        version: Hashable,
+        image: bytes,
+    ) -> None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] != version:
+            entry = (version, {})
+            self._entries.put(user_id, entry)
+        entry[1][period] = image
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id)
@@ -1,18 +1,76 @@
+import tempfile
+import time
+from collections.abc import Coroutine
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
 from loguru import logger
-from sqlalchemy.ext.asyncio import AsyncEngine
-from telegram import Update
+from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+    Update,
+)
 from telegram.ext import (
     ContextTypes,
 )
 
-from db.manager import DBManager
+from charts import Period
+from csv_import import parse_mapping, read_statement
+from dtos import ImportProgress, TransactionSearchPage
+from env import (
+    IMPORT_PROGRESS_INTERVAL,
+    REPORT_MAX_MONTHS,
+    REPORT_MONTHS,
+)
+from exceptions import ChartQueueFullError, TaskTimeoutError
+from export import ExportFormat
+from offload import TaskOffloader
 from service import Service
 
 
+class ProgressMessage:
+    """Edits a reply with import progress, at most once per interval.
+
+    Telegram rate limits message edits, a large statement reports
+    progress far more often than it is worth showing.
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        interval: float = IMPORT_PROGRESS_INTERVAL,
+    ) -> None:
+        self._message = message
+        self._interval = interval
+        self._edited_at = time.monotonic()
+        self._imported = 0
+
+    async def report(self, progress: ImportProgress) -> None:
+        # Telegram refuses edits that leave the text as it is
+        if progress.imported == self._imported:
+            return
+        now = time.monotonic()
+        if now - self._edited_at < self._interval:
+            return
+
+        self._edited_at = now
+        self._imported = progress.imported
+        _ = await self._message.edit_text(
+            f"Imported {progress.imported} transactions so far...",
+        )
+
+
 class Controller:
-    def __init__(self, engine: AsyncEngine) -> None:
-        self._db_manager = DBManager(engine)
-        self._user_service = Service(self._db_manager)
+    def __init__(
+        self,
+        service: Service,
+        offloader: TaskOffloader | None = None,
+    ) -> None:
+        self._user_service = service
+        # Reports and exports run on taskiq workers when set
+        self._offloader = offloader
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.info("Received a start command")
@@ -20,4 +78,324 @@ class Controller:
         assert update.effective_chat is not None
         assert update.effective_user is not None
 
-        _ = await self._user_service.register_user(update.effective_user.id)
+        _ = await self._user_service.get_or_register_user(
+            update.effective_user.id,
+        )
+
+    async def add_expense(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+    ):
+        assert update.effective_user is not None
+        assert update.message is not None
+        assert update.message.text is not None
+
+        user_id = await self._user_service.get_or_register_user(
+            update.effective_user.id,
+        )
+        try:
+            transaction = (
+                await self._user_service.create_transaction_from_text(
+                    user_id,
+                    update.message.text,
+                )
+            )
+        except ValueError as e:
+            _ = await update.message.reply_text(str(e))
+            return
+
+        _ = await update.message.reply_text(
+            f"Saved {transaction.expense_amount} "
+            f"(transaction {transaction.transaction_id})",
+        )
+
+    async def import_statement(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+    ):
+        """Import a CSV bank statement sent as a document.
+
+        The caption may hold the column mapping as "field=value" lines.
+        The document is downloaded to a temporary file and read row by
+        row, so large statements are never held in memory.
+        """
+        assert update.effective_user is not None
+        assert update.message is not None
+        assert update.message.document is not None
+
+        user_id = await self._user_service.get_or_register_user(
+            update.effective_user.id,
+        )
+        reply = await update.message.reply_text("Importing the statement...")
+        try:
+            mapping = parse_mapping(update.message.caption or "")
+            file = await update.message.document.get_file()
+            with tempfile.TemporaryDirectory() as directory:
+                path = await file.download_to_drive(
+                    Path(directory) / "statement.csv",
+                )
+                # Rows are read lazily between the chunk writes
+                with path.open(encoding="utf-8-sig", newline="") as lines:
+                    progress = await self._user_service.import_statement(
+                        user_id,
+                        read_statement(lines, mapping),
+                        on_progress=ProgressMessage(reply).report,
+                    )
+        except ValueError as e:
+            _ = await reply.edit_text(str(e))
+            return
+
+        logger.info(
+            f"Imported {progress.imported} transactions for user {user_id}",
+        )
+        _ = await reply.edit_text(
+            f"Imported {progress.imported} transactions, "
+            f"skipped {progress.skipped} rows",
+        )
+
+    async def export(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Send all user transactions as a file, /export [csv|xlsx].
+
+        The file is written to a spooled temporary file that moves to disk
+        once it outgrows ``EXPORT_SPOOL_SIZE``. Offloaded exports are
+        written and uploaded by the worker, only the number of
+        transactions comes back.
+        """
+        assert update.effective_user is not None
+        assert update.message is not None
+
+        requested = context.args[0].lower() if context.args else "csv"
+        try:
+            export_format = ExportFormat(requested)
+        except ValueError:
+            formats = ", ".join(ExportFormat)
+            _ = await update.message.reply_text(
+                f"Unknown format {requested}, use one of: {formats}",
+            )
+            return
+
+        user_id = await self._user_service.get_or_register_user(
+            update.effective_user.id,
+        )
+        await self._respond(
+            context,
+            update,
+            self._send_export(update.message, user_id, export_format),
+        )
+
+    async def _send_export(
+        self,
+        message: Message,
+        user_id: int,
+        export_format: ExportFormat,
+    ) -> None:
+        try:
+            if self._offloader is None:
+                count = await self._user_service.send_export(
+                    user_id,
+                    export_format,
+                    lambda file, count: message.reply_document(
+                        file,
+                        filename=f"transactions.{export_format}",
+                        caption=f"{count} transactions",
+                    ),
+                )
+            else:
+                # Every export is sent anew, the result is not reused
+                count = await self._offloader.run(
+                    "export_transactions",
+                    None,
+                    user_id,
+                    message.chat_id,
+                    message.message_id,
+                    str(export_format),
+                    reuse=False,
+                )
+        except (ValueError, TaskTimeoutError) as e:
+            _ = await message.reply_text(str(e))
+            return
+
+        if count == 0:
+            _ = await message.reply_text(
+                "There are no transactions to export",
+            )
+
+    async def report(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Send a chart of spending per category, /report [months]."""
+        assert update.effective_user is not None
+        assert update.message is not None
+
+        requested = context.args[0] if context.args else str(REPORT_MONTHS)
+        if not requested.isdigit() or not (
+            1 <= int(requested) <= REPORT_MAX_MONTHS
+        ):
+            _ = await update.message.reply_text(
+                f"Pass a number of months from 1 to {REPORT_MAX_MONTHS}",
+            )
+            return
+
+        user_id = await self._user_service.get_or_register_user(
+            update.effective_user.id,
+        )
+        period = Period.last_months(
+            int(requested),
+            datetime.now(tz=UTC).date(),
+        )
+        await self._respond(
+            context,
+            update,
+            self._send_report(update.message, user_id, period),
+        )
+
+    async def _send_report(
+        self,
+        message: Message,
+        user_id: int,
+        period: Period,
+    ) -> None:
+        try:
+            image = await self._get_spending_chart(user_id, period)
+        except (ValueError, ChartQueueFullError, TaskTimeoutError) as e:
+            _ = await message.reply_text(str(e))
+            return
+
+        if image is None:
+            _ = await message.reply_text(
+                "There is no spending in this period",
+            )
+            return
+        _ = await message.reply_photo(image)
+
+    async def _get_spending_chart(
+        self,
+        user_id: int,
+        period: Period,
+    ) -> bytes | None:
+        if self._offloader is None:
+            return await self._user_service.get_spending_chart(
+                user_id,
+                period,
+            )
+
+        return await self._offloader.run(
+            "spending_chart",
+            await self._user_service.get_data_version(
+                user_id,
+                with_rates=True,
+            ),
+            user_id,
+            period.first_month.isoformat(),
+            period.last_month.isoformat(),
+        )
+
+    async def _respond(
+        self,
+        context: ContextTypes.DEFAULT_TYPE,
+        update: Update,
+        response: Coroutine[Any, Any, None],
+    ) -> None:
+        """Send a slow response, in the background if it is offloaded.
+
+        Workers may take a while to get to a task, the user's next
+        updates should not wait for it meanwhile.
+        """
+        if self._offloader is None:
+            await response
+            return
+        _ = context.application.create_task(response, update=update)
+
+    async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Send transactions with notes like the text, /search <text>."""
+        assert update.effective_user is not None
+        assert update.message is not None
+
+        user_id = await self._user_service.get_or_register_user(
+            update.effective_user.id,
+        )
+        await self._send_search_page(
+            update.message,
+            user_id,
+            " ".join(context.args or []),
+            None,
+        )
+
+    async def search_more(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+    ):
+        """Send the next page of a search, from its "More" button."""
+        query = update.callback_query
+        assert query is not None
+        assert query.data is not None
+        assert update.effective_user is not None
+        _ = await query.answer()
+
+        # The query is read back from the /search command the results
+        # reply to, so any bot process can serve the next page
+        results = query.message
+        command = (
+            results.reply_to_message if isinstance(results, Message) else None
+        )
+        if command is None or command.text is None:
+            return
+        _ = await results.edit_reply_markup(None)
+
+        user_id = await self._user_service.get_or_register_user(
+            update.effective_user.id,
+        )
+        _, _, text = command.text.partition(" ")
+        await self._send_search_page(
+            command,
+            user_id,
+            text,
+            query.data.removeprefix("search:"),
+        )
+
+    async def _send_search_page(
+        self,
+        command: Message,
+        user_id: int,
+        text: str,
+        cursor: str | None,
+    ) -> None:
+        try:
+            page = await self._user_service.search_transactions(
+                user_id,
+                text,
+                cursor,
+            )
+        except ValueError as e:
+            _ = await command.reply_text(str(e))
+            return
+
+        if not page.transactions:
+            _ = await command.reply_text("Nothing found")
+            return
+        markup = None
+        if page.cursor is not None:
+            markup = InlineKeyboardMarkup(
+                [
+                    [
+                        InlineKeyboardButton(
+                            "More",
+                            callback_data=f"search:{page.cursor}",
+                        ),
+                    ],
+                ],
+            )
+        _ = await command.reply_text(
+            self._format_search_page(page),
+            do_quote=True,
+            reply_markup=markup,
+        )
+
+    @staticmethod
+    def _format_search_page(page: TransactionSearchPage) -> str:
+        return "\n".join(
+            f"{row.date:%Y-%m-%d} {row.withdrawal_amount} {row.iso_code}, "
+            f"{row.category_name}: {row.note}"
+            for row in page.transactions
+        )
@@ -0,0 +1,120 @@
+from collections.abc import Sequence
+from decimal import Decimal
+
+import numpy as np
+import numpy.typing as npt
+
+from dtos import RatesSnapshot
+from exceptions import NotSupportedCurrencyError
+
+FloatArray = npt.NDArray[np.float64]
+IdArray = npt.NDArray[np.intp]
+
+
+class CrossRates:
+    """Any-to-any conversion derived from the rates of the base currency.
+
+    ``base_rates[currency_id]`` is how much of the currency one unit of the
+    base currency buys, NaN when there is no rate. The rate from ``a`` to
+    ``b`` is ``base_rates[b] / base_rates[a]``.
+    """
+
+    def __init__(
+        self,
+        base_rates: FloatArray,
+        currency_ids: dict[str, int],
+    ) -> None:
+        self._base_rates = base_rates
+        self._currency_ids = currency_ids
+        self._matrix: FloatArray | None = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: RatesSnapshot) -> "CrossRates":
+        currency_ids = dict(snapshot.currency_ids)
+        if snapshot.base_currency_id is not None:
+            currency_ids[snapshot.base_iso_code] = snapshot.base_currency_id
+
+        size = max(currency_ids.values(), default=0) + 1
+        base_rates = np.full(size, np.nan)
+        for iso_code, rate in snapshot.rates.items():
+            base_rates[snapshot.currency_ids[iso_code]] = float(rate)
+        if snapshot.base_currency_id is not None:
+            base_rates[snapshot.base_currency_id] = 1.0
+
+        return cls(base_rates, currency_ids)
+
+    @property
+    def base_rates(self) -> FloatArray:
+        return self._base_rates
+
+    def currency_id(self, iso_code: str) -> int:
+        currency_id = self._currency_ids.get(iso_code)
+        if currency_id is None:
+            msg = f"There is no rate for {iso_code} currency"
+            raise NotSupportedCurrencyError(msg)
+        return currency_id
+
+    def matrix(self) -> FloatArray:
+        """Matrix where ``matrix[a, b]`` is the rate from ``a`` to ``b``.
+
+        Built on first use and kept for the lifetime of the object.
+        """
+        if self._matrix is None:
+            self._matrix = np.outer(1 / self._base_rates, self._base_rates)
+        return self._matrix
+
+    def rate(self, from_currency_id: int, to_currency_id: int) -> float:
+        ids = np.array([from_currency_id, to_currency_id], dtype=np.intp)
+        self._check_ids(ids)
+        return float(self._base_rates[to_currency_id]) / float(
+            self._base_rates[from_currency_id],
+        )
+
+    def convert(
+        self,
+        amounts: npt.ArrayLike,
+        from_currency_ids: npt.ArrayLike,
+        to_currency_ids: npt.ArrayLike,
+    ) -> FloatArray:
+        """Convert every ``amounts[i]`` from one currency id to another.
+
+        ``from_currency_ids`` and ``to_currency_ids`` may be scalars, they are
+        broadcast against ``amounts``.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        from_ids = np.asarray(from_currency_ids, dtype=np.intp)
+        to_ids = np.asarray(to_currency_ids, dtype=np.intp)
+        self._check_ids(from_ids)
+        self._check_ids(to_ids)
+        rates = self._base_rates[to_ids] / self._base_rates[from_ids]
+        return amounts * rates
+
+    def _check_ids(self, ids: IdArray) -> None:
+        ids = np.atleast_1d(ids)
+        in_range = (ids >= 0) & (ids < self._base_rates.size)
+        known = in_range.copy()
+        known[in_range] = ~np.isnan(self._base_rates[ids[in_range]])
+        if not known.all():
+            unknown = sorted(set(ids[~known].tolist()))
+            msg = f"There are no rates for currencies with ids {unknown}"
+            raise NotSupportedCurrencyError(msg)
+
+
+def from_decimals(amounts: Sequence[Decimal]) -> FloatArray:
+    return np.fromiter(
+        (float(amount) for amount in amounts),
+        dtype=np.float64,
+        count=len(amounts),
+    )
+
+
+def to_decimals(values: FloatArray, places: int = 2) -> list[Decimal]:
+    """Round converted values to ``places`` and return them as Decimals.
+
+    Rounding happens on integer minor units. Values are first snapped to
+    six digits below the minor unit, so binary noise such as
+    ``100.49999999999999`` can't move a tie, and ties then round half to
+    even like ``Decimal`` does by default.
+    """
+    minor_units = np.rint(np.round(values * 10**places, 6)).astype(np.int64)
+    return [Decimal(value).scaleb(-places) for value in minor_units.tolist()]
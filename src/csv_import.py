@@ -0,0 +1,228 @@
+import csv
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from pydantic import ValidationError
+
+from dtos import ColumnMapping, UserRefData
+from exceptions import StatementImportError
+from expense_parser import CategoryMatcher, normalize_words
+
+
+@dataclass(frozen=True, slots=True)
+class StatementRow:
+    date: datetime
+    # Signed as in the statement, negative for spending
+    amount: Decimal
+    category: str | None
+    note: str | None
+    account: str | None
+
+
+@dataclass(slots=True)
+class TransactionBatch:
+    """Parallel arrays of transactions ready for one bulk insert."""
+
+    account_ids: list[int] = field(default_factory=list)
+    category_ids: list[int] = field(default_factory=list)
+    amounts: list[Decimal] = field(default_factory=list)
+    notes: list[str | None] = field(default_factory=list)
+    dates: list[datetime] = field(default_factory=list)
+    # account id -> sum of the batch amounts on it
+    balance_deltas: dict[int, Decimal] = field(default_factory=dict)
+    skipped: int = 0
+
+
+def parse_mapping(text: str) -> ColumnMapping:
+    """Read a mapping from "field=value" lines, e.g. a document caption.
+
+    Unset fields keep their defaults, an empty value drops an optional
+    column.
+    """
+    fields: dict[str, str | None] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        key, separator, value = line.partition("=")
+        if not separator:
+            msg = f"Expected field=value, got {line.strip()!r}"
+            raise StatementImportError(msg)
+        fields[key.strip().lower()] = value.strip() or None
+
+    unknown = fields.keys() - ColumnMapping.model_fields.keys()
+    if unknown:
+        msg = f"Unknown mapping fields: {', '.join(sorted(unknown))}"
+        raise StatementImportError(msg)
+
+    try:
+        return ColumnMapping.model_validate(fields)
+    except ValidationError as e:
+        msg = f"Invalid column mapping: {e.errors()[0]['msg']}"
+        raise StatementImportError(msg) from e
+
+
+def read_statement(
+    lines: Iterable[str],
+    mapping: ColumnMapping,
+) -> Iterator[StatementRow | None]:
+    """Parse a CSV statement lazily, one row per line read.
+
+    ``lines`` is typically an open file, so only the current row is held
+    in memory. Rows that cannot be parsed are yielded as None for the
+    caller to count.
+    """
+    reader = _records(csv.reader(lines, delimiter=mapping.delimiter))
+    header = next(reader, None)
+    if header is None:
+        msg = "The statement is empty"
+        raise StatementImportError(msg)
+
+    positions = {name.strip().casefold(): i for i, name in enumerate(header)}
+
+    def position(column: str | None, *, required: bool) -> int | None:
+        if column is None:
+            return None
+        index = positions.get(column.casefold())
+        if index is None and required:
+            msg = f"There is no {column!r} column in the statement"
+            raise StatementImportError(msg)
+        return index
+
+    date_at = position(mapping.date, required=True)
+    amount_at = position(mapping.amount, required=True)
+    category_at = position(mapping.category, required=False)
+    note_at = position(mapping.note, required=False)
+    account_at = position(mapping.account, required=False)
+    # Statements repeat a few hundred dates, strptime dominates otherwise
+    parse_date = lru_cache(maxsize=4096)(_parse_date)
+
+    for record in reader:
+        if not any(record):
+            continue
+        try:
+            row = StatementRow(
+                date=parse_date(_cell(record, date_at), mapping.date_format),
+                amount=_parse_amount(
+                    _cell(record, amount_at),
+                    decimal_comma=mapping.decimal_comma,
+                ),
+                category=_cell(record, category_at),
+                note=_cell(record, note_at),
+                account=_cell(record, account_at),
+            )
+        except (IndexError, ValueError, InvalidOperation):
+            yield None
+            continue
+        yield row
+
+
+def _records(reader: Iterator[list[str]]) -> Iterator[list[str]]:
+    # csv.Error is no ValueError, it would escape the import handler
+    try:
+        yield from reader
+    except csv.Error as e:
+        msg = f"The statement is not valid CSV: {e}"
+        raise StatementImportError(msg) from e
+
+
+def _cell(record: Sequence[str], index: int | None) -> str | None:
+    if index is None:
+        return None
+    return record[index].strip() or None
+
+
+def _parse_date(value: str | None, date_format: str) -> datetime:
+    if value is None:
+        msg = "Missing date"
+        raise ValueError(msg)
+    date = datetime.strptime(value, date_format)  # noqa: DTZ007
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=UTC)
+    return date
+
+
+def _parse_amount(value: str | None, *, decimal_comma: bool) -> Decimal:
+    if value is None:
+        msg = "Missing amount"
+        raise ValueError(msg)
+    value = value.replace(" ", "").replace("\N{NO-BREAK SPACE}", "")
+    if decimal_comma:
+        value = value.replace(".", "").replace(",", ".")
+    else:
+        value = value.replace(",", "")
+    amount = Decimal(value)
+    if not amount.is_finite():
+        msg = f"Invalid amount {value}"
+        raise ValueError(msg)
+    return amount
+
+
+class StatementResolver:
+    """Maps statement rows to the ids of a user's accounts and categories.
+
+    Categories are matched by name first, then by the words of the
+    category and note columns as in free-text expenses. Rows naming an
+    unknown account are skipped rather than booked on another one; rows
+    without an account go to ``default_account_id``.
+    """
+
+    def __init__(
+        self,
+        refdata: UserRefData,
+        matcher: CategoryMatcher,
+        default_account_id: int,
+    ) -> None:
+        self._matcher = matcher
+        self._default_account_id = default_account_id
+        self._categories = {
+            category.name.casefold(): category.category_id
+            for category in refdata.categories.values()
+        }
+        self._accounts = {
+            account.name.casefold(): account.account_id
+            for account in refdata.accounts.values()
+        }
+
+    def resolve(
+        self,
+        rows: Iterable[StatementRow | None],
+    ) -> TransactionBatch:
+        batch = TransactionBatch()
+        for row in rows:
+            if row is None:
+                batch.skipped += 1
+                continue
+
+            account_id = self._account_id(row.account)
+            category_id = self._category_id(row)
+            if account_id is None or category_id is None:
+                batch.skipped += 1
+                continue
+
+            batch.account_ids.append(account_id)
+            batch.category_ids.append(category_id)
+            batch.amounts.append(row.amount)
+            batch.notes.append(row.note)
+            batch.dates.append(row.date)
+            batch.balance_deltas[account_id] = (
+                batch.balance_deltas.get(account_id, Decimal(0)) + row.amount
+            )
+        return batch
+
+    def _account_id(self, name: str | None) -> int | None:
+        if name is None:
+            return self._default_account_id
+        return self._accounts.get(name.casefold())
+
+    def _category_id(self, row: StatementRow) -> int | None:
+        if row.category is not None:
+            category_id = self._categories.get(row.category.casefold())
+            if category_id is not None:
+                return category_id
+
+        text = f"{row.category or ''} {row.note or ''}"
+        match = self._matcher.match(normalize_words(text.split()))
+        return match.category_id if match is not None else None
@@ -1,59 +1,92 @@
+import time
+from collections.abc import AsyncIterator, Sequence
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import UTC, datetime
 from decimal import Decimal
 
+from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncEngine
 
 from db.models import (
     Account,
     Category,
     Currency,
-    Rate,
+    RateHistory,
     Transaction,
     UserAccount,
 )
 from db.queries import (
+    AdjustAccountBalanceRow,
     AsyncQuerier,
     CreateTransactionParams,
+    CreateTransactionsParams,
+    ExportTransactionsRow,
+    GetOrRegisterTelegramUserRow,
+    GetRateHistoryArraysRow,
+    GetRatesAsOfRow,
+    GetRatesFromRow,
+    GetUserLedgerArraysRow,
+    SearchTransactionsRow,
     UpdateTransactionParams,
 )
-from misc import DEFAULT_CATEGORIES, CategoryType
+from metrics import DB_TRANSACTION_SECONDS
+from misc import DEFAULT_ACCOUNT_NAME, DEFAULT_CATEGORIES, CategoryType
 
 
 # TODO: implement mechanism to use functions outside transaction
 class DBManager:
+    """Queries run in the transaction opened by the calling task.
+
+    The current transaction lives in a context variable, so concurrent
+    tasks sharing one manager (e.g. bot handlers) each get their own.
+    """
+
     def __init__(self, engine: AsyncEngine) -> None:
         self._engine = engine
-        self._querier = None
-        self._in_transaction = False
+        self._current_querier: ContextVar[AsyncQuerier | None] = ContextVar(
+            f"querier_{id(self)}",
+            default=None,
+        )
+
+    @property
+    def _querier(self) -> AsyncQuerier:
+        querier = self._current_querier.get()
+        if querier is None:
+            msg = "Database queries must run inside a transaction"
+            raise RuntimeError(msg)
+        return querier
 
     @asynccontextmanager
-    async def transaction(self):
-        async with self._engine.begin() as conn:
-            self._querier = AsyncQuerier(conn)
-            self._in_transaction = True
-            try:
-                yield
-            except Exception:
-                await conn.rollback()
-                raise
-            finally:
-                self._querier = None
-                self._in_transaction = False
+    async def transaction(self, name: str = "default"):
+        started = time.perf_counter()
+        try:
+            async with self._engine.begin() as conn:
+                token = self._current_querier.set(AsyncQuerier(conn))
+                try:
+                    yield
+                except Exception:
+                    await conn.rollback()
+                    raise
+                finally:
+                    self._current_querier.reset(token)
+        finally:
+            held = time.perf_counter() - started
+            DB_TRANSACTION_SECONDS.labels(name).observe(held)
+            logger.debug(f"Transaction {name} held for {held * 1000:.1f} ms")
 
     async def create_category(
         self,
         user_id: int,
         name: str,
         category_type: CategoryType,
-    ) -> Category:
-        category = await self._querier.create_category(
+    ) -> Category | None:
+        """Create a category, None if the user already has one so named."""
+        return await self._querier.create_category(
             user_id=user_id,
             name=name,
             type=category_type,
         )
-        assert category is not None
-        return category
 
     async def update_category(
         self,
@@ -140,6 +173,33 @@ class DBManager:
         assert user is not None
         return user
 
+    async def get_or_register_telegram_user(
+        self,
+        tg_id: int,
+        iso_code: str,
+    ) -> GetOrRegisterTelegramUserRow:
+        """Get the user of ``tg_id``, registering it with the defaults.
+
+        Registration happens in a single statement. If a concurrent call
+        registers the same id first, the statement returns nothing and is
+        run again to read the winner's row.
+        """
+        for _ in range(2):
+            user = await self._querier.get_or_register_telegram_user(
+                tg_id=tg_id,
+                iso_code=iso_code,
+                account_name=DEFAULT_ACCOUNT_NAME,
+                category_names=[c["name"] for c in DEFAULT_CATEGORIES],
+                category_types=[
+                    c["category_type"] for c in DEFAULT_CATEGORIES
+                ],
+            )
+            if user is not None:
+                return user
+
+        msg = f"Could not register Telegram user {tg_id}"
+        raise RuntimeError(msg)
+
     async def get_or_create_currency(
         self,
         iso_code: str,
@@ -158,14 +218,16 @@ class DBManager:
         return currency
 
     async def create_default_categories(self, user_id: int) -> list[Category]:
-        return [
-            await self.create_category(
+        categories = []
+        for category in DEFAULT_CATEGORIES:
+            created = await self.create_category(
                 user_id,
                 category["name"],
                 category["category_type"],
             )
-            for category in DEFAULT_CATEGORIES
-        ]
+            assert created is not None
+            categories.append(created)
+        return categories
 
     async def create_default_account(
         self,
@@ -174,43 +236,69 @@ class DBManager:
     ) -> Account:
         return await self.create_account(
             user_id,
-            "Default",
+            DEFAULT_ACCOUNT_NAME,
             Decimal(0),
             currency_id,
         )
 
     async def _get_querier(self) -> AsyncQuerier:
-        if self._querier is not None:
-            return self._querier
+        querier = self._current_querier.get()
+        if querier is not None:
+            return querier
 
         conn = await self._engine.connect()
         return AsyncQuerier(conn)
 
-    async def update_currency_rate(
+    async def create_currency_rates(
         self,
         from_currency_id: int,
-        to_currency_id: int,
-        rate_value: Decimal,
-    ) -> Rate:
-        existing_rate = await self._querier.get_rate(
+        to_currency_ids: Sequence[int],
+        rates: Sequence[Decimal],
+    ) -> None:
+        await self._querier.create_rates(
             from_currency=from_currency_id,
-            to_currency=to_currency_id,
+            to_currencies=list(to_currency_ids),
+            rates=list(rates),
         )
-        if existing_rate:
-            rate = await self._querier.update_rate(
-                from_currency=from_currency_id,
-                to_currency=to_currency_id,
-                rate=rate_value,
-            )
-        else:
-            rate = await self._querier.create_rate(
-                from_currency=from_currency_id,
-                to_currency=to_currency_id,
-                rate=rate_value,
-            )
 
-        assert rate is not None
-        return rate
+    async def update_currency_rates(
+        self,
+        from_currency_id: int,
+        to_currency_ids: Sequence[int],
+        rates: Sequence[Decimal],
+    ) -> None:
+        await self._querier.update_rates(
+            to_currencies=list(to_currency_ids),
+            rates=list(rates),
+            from_currency=from_currency_id,
+        )
+
+    async def get_rates_from(self, iso_code: str) -> list[GetRatesFromRow]:
+        return [
+            rate
+            async for rate in self._querier.get_rates_from(iso_code=iso_code)
+        ]
+
+    async def get_rates_version(self, iso_code: str) -> datetime | None:
+        return await self._querier.get_rates_version(iso_code=iso_code)
+
+    async def get_rates_synced_at(
+        self,
+        base_currency_id: int,
+    ) -> datetime | None:
+        return await self._querier.get_rate_sync_timestamp(
+            base_currency=base_currency_id,
+        )
+
+    async def set_rates_synced_at(
+        self,
+        base_currency_id: int,
+        provider_ts: datetime,
+    ) -> None:
+        await self._querier.upsert_rate_sync(
+            base_currency=base_currency_id,
+            provider_ts=provider_ts,
+        )
 
     async def get_account(
         self,
@@ -232,6 +320,54 @@ class DBManager:
         msg = "One argument should be passed"
         raise ValueError(msg)
 
+    async def append_rate_history(
+        self,
+        to_currency_ids: Sequence[int],
+        ts: datetime,
+        rates: Sequence[Decimal],
+    ) -> None:
+        await self._querier.create_rate_history(
+            to_currencies=list(to_currency_ids),
+            ts=ts,
+            rates=list(rates),
+        )
+
+    async def get_rate_as_of(
+        self,
+        iso_code: str,
+        ts: datetime,
+    ) -> RateHistory | None:
+        return await self._querier.get_rate_as_of(iso_code=iso_code, ts=ts)
+
+    async def get_rates_as_of(
+        self,
+        iso_code: str,
+        timestamps: Sequence[datetime],
+    ) -> list[GetRatesAsOfRow]:
+        return [
+            rate
+            async for rate in self._querier.get_rates_as_of(
+                timestamps=list(timestamps),
+                iso_code=iso_code,
+            )
+        ]
+
+    async def get_rate_history_arrays(
+        self,
+        currency_ids: Sequence[int],
+    ) -> GetRateHistoryArraysRow:
+        history = await self._querier.get_rate_history_arrays(
+            currency_ids=list(currency_ids),
+        )
+        assert history is not None
+        return history
+
+    async def get_accounts(self, user_id: int) -> list[Account]:
+        return [
+            account
+            async for account in self._querier.get_accounts(user_id=user_id)
+        ]
+
     async def update_account_balance(
         self,
         account_id: int,
@@ -244,6 +380,38 @@ class DBManager:
         assert account is not None
         return account
 
+    async def adjust_account_balance(
+        self,
+        account_id: int,
+        user_id: int,
+        delta: Decimal,
+    ) -> AdjustAccountBalanceRow | None:
+        """Add ``delta`` to the balance, None if the user has no such account.
+
+        The ownership check and the increment are one statement.
+        """
+        return await self._querier.adjust_account_balance(
+            delta=delta,
+            account_id=account_id,
+            user_id=user_id,
+        )
+
+    async def get_refdata_version(self, user_id: int) -> int | None:
+        return await self._querier.get_refdata_version(user_id=user_id)
+
+    async def bump_refdata_version(self, user_id: int) -> int:
+        version = await self._querier.bump_refdata_version(user_id=user_id)
+        assert version is not None
+        return version
+
+    async def get_ledger_version(self, user_id: int) -> int | None:
+        return await self._querier.get_ledger_version(user_id=user_id)
+
+    async def bump_ledger_version(self, user_id: int) -> int:
+        version = await self._querier.bump_ledger_version(user_id=user_id)
+        assert version is not None
+        return version
+
     async def create_transaction(
         self,
         user_id: int,
@@ -273,6 +441,31 @@ class DBManager:
         assert transaction is not None
         return transaction
 
+    async def create_transactions(
+        self,
+        user_id: int,
+        account_ids: Sequence[int],
+        category_ids: Sequence[int],
+        withdrawal_amounts: Sequence[Decimal],
+        expense_amounts: Sequence[Decimal],
+        notes: Sequence[str | None],
+        dates: Sequence[datetime],
+        state: str = "completed",
+    ) -> int:
+        """Insert parallel arrays of transactions in one statement."""
+        # Skip validating thousands of elements the caller already built
+        params = CreateTransactionsParams.model_construct(
+            user_id=user_id,
+            account_ids=list(account_ids),
+            category_ids=list(category_ids),
+            withdrawal_amounts=list(withdrawal_amounts),
+            expense_amounts=list(expense_amounts),
+            notes=list(notes),
+            state=state,
+            dates=list(dates),
+        )
+        return await self._querier.create_transactions(params)
+
     async def get_transaction_by_id(
         self,
         transaction_id: int,
@@ -320,6 +513,41 @@ class DBManager:
             )
         ]
 
+    def export_transactions(
+        self,
+        user_id: int,
+    ) -> AsyncIterator[ExportTransactionsRow]:
+        """Stream transactions in date order with names joined in.
+
+        Rows come from a server-side cursor, so they must be consumed
+        before the transaction they were requested in ends.
+        """
+        return self._querier.export_transactions(user_id=user_id)
+
+    async def search_transactions(
+        self,
+        user_id: int,
+        query: str,
+        after: tuple[float, int],
+        limit: int,
+    ) -> list[SearchTransactionsRow]:
+        """Transactions whose note fuzzily contains ``query``.
+
+        Best matches come first, ties broken by newest id; ``after`` is
+        the (score, transaction_id) of the last row of the previous page.
+        """
+        after_score, after_id = after
+        return [
+            row
+            async for row in self._querier.search_transactions(
+                query=query,
+                user_id=user_id,
+                after_score=after_score,
+                after_id=after_id,
+                page_size=limit,
+            )
+        ]
+
     async def get_user_categories(self, user_id: int) -> list[Category]:
         return [
             category
@@ -327,3 +555,11 @@ class DBManager:
                 user_id=user_id,
             )
         ]
+
+    async def get_user_ledger_arrays(
+        self,
+        user_id: int,
+    ) -> GetUserLedgerArraysRow:
+        ledger = await self._querier.get_user_ledger_arrays(user_id=user_id)
+        assert ledger is not None
+        return ledger
@@ -0,0 +1,13 @@
+-- migrate:up
+-- Append-only log of rates against the base currency, one row per
+-- currency and provider timestamp. The primary key is the
+-- (to_currency, ts) index used by as-of lookups.
+CREATE TABLE IF NOT EXISTS rate_history (
+    to_currency INTEGER REFERENCES currency(currency_id) ON DELETE CASCADE NOT NULL,
+    ts          TIMESTAMP WITH TIME ZONE NOT NULL,
+    rate        DECIMAL NOT NULL,
+    PRIMARY KEY (to_currency, ts)
+) WITH (fillfactor = 100);
+
+-- migrate:down
+DROP TABLE IF EXISTS rate_history;
@@ -0,0 +1,11 @@
+-- migrate:up
+-- Provider timestamp of the last rates applied per base currency, lets the
+-- worker skip polls that bring nothing new.
+CREATE TABLE IF NOT EXISTS rate_sync (
+    base_currency INTEGER PRIMARY KEY REFERENCES currency(currency_id) ON DELETE CASCADE,
+    provider_ts   TIMESTAMP WITH TIME ZONE NOT NULL,
+    synced_at     TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- migrate:down
+DROP TABLE IF EXISTS rate_sync;
@@ -0,0 +1,10 @@
+-- migrate:up
+-- Maps Telegram user ids to internal users, replaces user_account.user_tg_id
+CREATE TABLE IF NOT EXISTS telegram_identity (
+    tg_id      BIGINT PRIMARY KEY,
+    user_id    INTEGER UNIQUE NOT NULL REFERENCES user_account(user_id) ON DELETE CASCADE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- migrate:down
+DROP TABLE IF EXISTS telegram_identity;
@@ -0,0 +1,9 @@
+-- migrate:up
+-- Bumped whenever a user's categories or accounts change, lets bots keep
+-- them in memory and notice when their copy is stale.
+ALTER TABLE user_account
+ADD COLUMN refdata_version BIGINT NOT NULL DEFAULT 0;
+
+-- migrate:down
+ALTER TABLE user_account
+DROP COLUMN IF EXISTS refdata_version;
@@ -0,0 +1,8 @@
+-- migrate:up
+-- Lets exports stream a user's transactions in date order without
+-- sorting the whole history first.
+CREATE INDEX transaction_user_date_idx
+ON transaction (user_id, date, transaction_id);
+
+-- migrate:down
+DROP INDEX IF EXISTS transaction_user_date_idx;
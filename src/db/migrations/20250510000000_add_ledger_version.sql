@@ -0,0 +1,9 @@
+-- migrate:up
+-- Bumped whenever a user's transactions change, keys the rendered
+-- reports of that user.
+ALTER TABLE user_account
+ADD COLUMN ledger_version BIGINT NOT NULL DEFAULT 0;
+
+-- migrate:down
+ALTER TABLE user_account
+DROP COLUMN IF EXISTS ledger_version;
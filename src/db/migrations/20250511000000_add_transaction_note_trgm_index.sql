@@ -0,0 +1,10 @@
+-- migrate:up
+-- Fuzzy search over notes: trigram matching on note, with btree_gin
+-- letting the same index narrow down to one user's transactions.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+CREATE INDEX transaction_note_trgm_idx
+ON transaction USING gin (user_id, note gin_trgm_ops);
+
+-- migrate:down
+DROP INDEX IF EXISTS transaction_note_trgm_idx;
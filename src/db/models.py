@@ -37,6 +37,24 @@ class Rate(pydantic.BaseModel):
     updated_at: datetime.datetime
 
 
+class RateHistory(pydantic.BaseModel):
+    to_currency: int
+    ts: datetime.datetime
+    rate: decimal.Decimal
+
+
+class RateSync(pydantic.BaseModel):
+    base_currency: int
+    provider_ts: datetime.datetime
+    synced_at: datetime.datetime
+
+
+class TelegramIdentity(pydantic.BaseModel):
+    tg_id: int
+    user_id: int
+    created_at: datetime.datetime
+
+
 class Transaction(pydantic.BaseModel):
     transaction_id: int
     account_id: int
@@ -54,3 +72,5 @@ class UserAccount(pydantic.BaseModel):
     user_id: int
     balance: decimal.Decimal
     currency_id: int
+    refdata_version: int
+    ledger_version: int
@@ -5,7 +5,7 @@
 import datetime
 import decimal
 import pydantic
-from typing import AsyncIterator, Iterator, Optional
+from typing import AsyncIterator, Iterator, List, Optional
 
 import sqlalchemy
 import sqlalchemy.ext.asyncio
@@ -13,6 +13,42 @@ import sqlalchemy.ext.asyncio
 from db import models
 
 
+ADJUST_ACCOUNT_BALANCE = """-- name: adjust_account_balance \\:one
+UPDATE account
+SET balance = account.balance + :p1
+FROM user_account
+WHERE account.account_id = :p2
+  AND account.user_id = :p3
+  AND user_account.user_id = account.user_id
+RETURNING account.account_id, account.user_id, account.name, account.balance, account.currency_id, user_account.refdata_version
+"""
+
+
+class AdjustAccountBalanceRow(pydantic.BaseModel):
+    account_id: int
+    user_id: int
+    name: str
+    balance: decimal.Decimal
+    currency_id: int
+    refdata_version: int
+
+
+BUMP_LEDGER_VERSION = """-- name: bump_ledger_version \\:one
+UPDATE user_account
+SET ledger_version = ledger_version + 1
+WHERE user_id = :p1
+RETURNING ledger_version
+"""
+
+
+BUMP_REFDATA_VERSION = """-- name: bump_refdata_version \\:one
+UPDATE user_account
+SET refdata_version = refdata_version + 1
+WHERE user_id = :p1
+RETURNING refdata_version
+"""
+
+
 CREATE_ACCOUNT = """-- name: create_account \\:one
 INSERT INTO account(
     user_id, name, balance, currency_id
@@ -29,6 +65,7 @@ INSERT INTO category(
 ) VALUES (
     :p1, :p2, :p3
 )
+ON CONFLICT (user_id, name) DO NOTHING
 RETURNING category_id, user_id, name, type
 """
 
@@ -53,6 +90,27 @@ RETURNING rate_id, from_currency, to_currency, rate, updated_at
 """
 
 
+CREATE_RATE_HISTORY = """-- name: create_rate_history \\:exec
+INSERT INTO rate_history(
+    to_currency, ts, rate
+)
+SELECT unnest(CAST(:p1 AS integer[])),
+       CAST(:p2 AS timestamptz),
+       unnest(CAST(:p3 AS decimal[]))
+ON CONFLICT DO NOTHING
+"""
+
+
+CREATE_RATES = """-- name: create_rates \\:exec
+INSERT INTO rate(
+    from_currency, to_currency, rate
+)
+SELECT CAST(:p1 AS integer),
+       unnest(CAST(:p2 AS integer[])),
+       unnest(CAST(:p3 AS decimal[]))
+"""
+
+
 CREATE_TRANSACTION = """-- name: create_transaction \\:one
 INSERT INTO transaction(
     user_id, account_id, category_id, withdrawal_amount, expense_amount, note, state, date
@@ -74,16 +132,73 @@ class CreateTransactionParams(pydantic.BaseModel):
     date: datetime.datetime
 
 
+CREATE_TRANSACTIONS = """-- name: create_transactions \\:execrows
+INSERT INTO transaction(
+    user_id, account_id, category_id, withdrawal_amount, expense_amount, note, state, date
+)
+SELECT :p1,
+       unnest(CAST(:p2 AS integer[])),
+       unnest(CAST(:p3 AS integer[])),
+       unnest(CAST(:p4 AS decimal[])),
+       unnest(CAST(:p5 AS decimal[])),
+       unnest(CAST(:p6 AS varchar[])),
+       :p7,
+       unnest(CAST(:p8 AS timestamptz[]))
+"""
+
+
+class CreateTransactionsParams(pydantic.BaseModel):
+    user_id: int
+    account_ids: List[int]
+    category_ids: List[int]
+    withdrawal_amounts: List[decimal.Decimal]
+    expense_amounts: List[decimal.Decimal]
+    notes: List[Optional[str]]
+    state: str
+    dates: List[datetime.datetime]
+
+
 CREATE_USER = """-- name: create_user \\:one
 INSERT INTO user_account(
     currency_id
 ) VALUES (
     :p1
 )
-RETURNING user_id, balance, currency_id
+RETURNING user_id, balance, currency_id, refdata_version, ledger_version
+"""
+
+
+EXPORT_TRANSACTIONS = """-- name: export_transactions \\:many
+SELECT transaction.transaction_id,
+       transaction.date,
+       account.name AS account_name,
+       currency.iso_code,
+       category.name AS category_name,
+       category.type AS category_type,
+       transaction.withdrawal_amount,
+       transaction.expense_amount,
+       transaction.note
+FROM transaction
+JOIN account ON account.account_id = transaction.account_id
+JOIN currency ON currency.currency_id = account.currency_id
+JOIN category ON category.category_id = transaction.category_id
+WHERE transaction.user_id = :p1
+ORDER BY transaction.date, transaction.transaction_id
 """
 
 
+class ExportTransactionsRow(pydantic.BaseModel):
+    transaction_id: int
+    date: datetime.datetime
+    account_name: str
+    iso_code: str
+    category_name: str
+    category_type: str
+    withdrawal_amount: decimal.Decimal
+    expense_amount: decimal.Decimal
+    note: Optional[str]
+
+
 GET_ACCOUNT_BY_ID = """-- name: get_account_by_id \\:one
 SELECT account_id, user_id, name, balance, currency_id
 FROM account
@@ -122,12 +237,153 @@ WHERE iso_code = :p1
 """
 
 
+GET_LEDGER_VERSION = """-- name: get_ledger_version \\:one
+SELECT ledger_version FROM user_account
+WHERE user_id = :p1
+"""
+
+
+GET_OR_REGISTER_TELEGRAM_USER = """-- name: get_or_register_telegram_user \\:one
+WITH new_identity AS (
+    INSERT INTO telegram_identity(
+        tg_id, user_id
+    ) VALUES (
+        :p1, nextval(pg_get_serial_sequence('user_account', 'user_id'))
+    )
+    ON CONFLICT (tg_id) DO NOTHING
+    RETURNING user_id
+), new_user AS (
+    INSERT INTO user_account(
+        user_id, currency_id
+    )
+    SELECT new_identity.user_id, currency.currency_id
+    FROM new_identity, currency
+    WHERE currency.iso_code = :p2
+    RETURNING user_id, currency_id
+), new_account AS (
+    INSERT INTO account(
+        user_id, name, balance, currency_id
+    )
+    SELECT user_id, CAST(:p3 AS varchar), 0, currency_id
+    FROM new_user
+), new_categories AS (
+    INSERT INTO category(
+        user_id, name, type
+    )
+    SELECT new_user.user_id, defaults.name, defaults.type
+    FROM new_user,
+         unnest(
+             CAST(:p4 AS varchar[]),
+             CAST(:p5 AS varchar[])
+         ) AS defaults(name, type)
+)
+SELECT user_id, TRUE AS created FROM new_identity
+UNION ALL
+SELECT user_id, FALSE AS created FROM telegram_identity
+WHERE tg_id = :p1
+"""
+
+
+class GetOrRegisterTelegramUserRow(pydantic.BaseModel):
+    user_id: int
+    created: bool
+
+
 GET_RATE = """-- name: get_rate \\:one
 SELECT rate_id, from_currency, to_currency, rate, updated_at FROM rate
 WHERE from_currency = :p1 AND to_currency = :p2
 """
 
 
+GET_RATE_AS_OF = """-- name: get_rate_as_of \\:one
+SELECT to_currency, ts, rate FROM rate_history
+WHERE to_currency = (
+    SELECT currency_id FROM currency WHERE iso_code = :p1
+) AND ts <= :p2
+ORDER BY ts DESC
+LIMIT 1
+"""
+
+
+GET_RATE_HISTORY_ARRAYS = """-- name: get_rate_history_arrays \\:one
+SELECT
+    CAST(COALESCE(array_agg(to_currency ORDER BY to_currency, ts), '{}') AS integer[]) AS to_currencies,
+    CAST(COALESCE(array_agg(EXTRACT(EPOCH FROM ts) ORDER BY to_currency, ts), '{}') AS bigint[]) AS timestamps,
+    CAST(COALESCE(array_agg(rate ORDER BY to_currency, ts), '{}') AS float8[]) AS rates
+FROM rate_history
+WHERE to_currency = ANY(CAST(:p1 AS integer[]))
+"""
+
+
+class GetRateHistoryArraysRow(pydantic.BaseModel):
+    to_currencies: List[int]
+    timestamps: List[int]
+    rates: List[float]
+
+
+GET_RATE_SYNC_TIMESTAMP = """-- name: get_rate_sync_timestamp \\:one
+SELECT provider_ts
+FROM rate_sync
+WHERE base_currency = :p1
+"""
+
+
+GET_RATES_AS_OF = """-- name: get_rates_as_of \\:many
+SELECT requested.ts AS requested_ts, history.ts, history.rate
+FROM unnest(CAST(:p1 AS timestamptz[]))
+    WITH ORDINALITY AS requested(ts, position)
+LEFT JOIN LATERAL (
+    SELECT rate_history.ts, rate_history.rate
+    FROM rate_history
+    WHERE rate_history.to_currency = (
+        SELECT currency_id FROM currency WHERE iso_code = :p2
+    ) AND rate_history.ts <= requested.ts
+    ORDER BY rate_history.ts DESC
+    LIMIT 1
+) AS history ON true
+ORDER BY requested.position
+"""
+
+
+class GetRatesAsOfRow(pydantic.BaseModel):
+    requested_ts: datetime.datetime
+    ts: Optional[datetime.datetime]
+    rate: Optional[decimal.Decimal]
+
+
+GET_RATES_FROM = """-- name: get_rates_from \\:many
+SELECT rate.from_currency, rate.to_currency, currency.iso_code, rate.rate, rate.updated_at
+FROM rate
+JOIN currency ON currency.currency_id = rate.to_currency
+WHERE rate.from_currency = (
+    SELECT base.currency_id FROM currency AS base WHERE base.iso_code = :p1
+)
+"""
+
+
+class GetRatesFromRow(pydantic.BaseModel):
+    from_currency: int
+    to_currency: int
+    iso_code: str
+    rate: decimal.Decimal
+    updated_at: datetime.datetime
+
+
+GET_RATES_VERSION = """-- name: get_rates_version \\:one
+SELECT MAX(updated_at)::timestamptz AS version
+FROM rate
+WHERE from_currency = (
+    SELECT currency_id FROM currency WHERE iso_code = :p1
+)
+"""
+
+
+GET_REFDATA_VERSION = """-- name: get_refdata_version \\:one
+SELECT refdata_version FROM user_account
+WHERE user_id = :p1
+"""
+
+
 GET_TRANSACTION_BY_ID = """-- name: get_transaction_by_id \\:one
 SELECT transaction_id, account_id, category_id, user_id, withdrawal_amount, expense_amount, note, state, date, original_transaction_id
 FROM transaction
@@ -144,7 +400,7 @@ ORDER BY date DESC
 
 
 GET_USER = """-- name: get_user \\:one
-SELECT user_id, balance, currency_id FROM user_account
+SELECT user_id, balance, currency_id, refdata_version, ledger_version FROM user_account
 WHERE user_id = :p1
 """
 
@@ -155,6 +411,58 @@ WHERE user_id = :p1
 """
 
 
+GET_USER_LEDGER_ARRAYS = """-- name: get_user_ledger_arrays \\:one
+SELECT
+    CAST(COALESCE(array_agg(EXTRACT(EPOCH FROM transaction.date) ORDER BY transaction.date), '{}') AS bigint[]) AS dates,
+    CAST(COALESCE(array_agg(transaction.category_id ORDER BY transaction.date), '{}') AS integer[]) AS category_ids,
+    CAST(COALESCE(array_agg(account.currency_id ORDER BY transaction.date), '{}') AS integer[]) AS currency_ids,
+    CAST(COALESCE(array_agg(transaction.withdrawal_amount ORDER BY transaction.date), '{}') AS float8[]) AS amounts
+FROM transaction
+JOIN account ON account.account_id = transaction.account_id
+WHERE transaction.user_id = :p1
+"""
+
+
+class GetUserLedgerArraysRow(pydantic.BaseModel):
+    dates: List[int]
+    category_ids: List[int]
+    currency_ids: List[int]
+    amounts: List[float]
+
+
+SEARCH_TRANSACTIONS = """-- name: search_transactions \\:many
+SELECT transaction.transaction_id,
+       transaction.date,
+       account.name AS account_name,
+       currency.iso_code,
+       category.name AS category_name,
+       transaction.withdrawal_amount,
+       transaction.note,
+       word_similarity(:p1, transaction.note) AS score
+FROM transaction
+JOIN account ON account.account_id = transaction.account_id
+JOIN currency ON currency.currency_id = account.currency_id
+JOIN category ON category.category_id = transaction.category_id
+WHERE transaction.user_id = :p2
+  AND :p1 <% transaction.note
+  AND (word_similarity(:p1, transaction.note), transaction.transaction_id)
+      < (CAST(:p3 AS real), CAST(:p4 AS integer))
+ORDER BY score DESC, transaction.transaction_id DESC
+LIMIT :p5
+"""
+
+
+class SearchTransactionsRow(pydantic.BaseModel):
+    transaction_id: int
+    date: datetime.datetime
+    account_name: str
+    iso_code: str
+    category_name: str
+    withdrawal_amount: decimal.Decimal
+    note: Optional[str]
+    score: float
+
+
 UPDATE_ACCOUNT_BALANCE = """-- name: update_account_balance \\:one
 UPDATE account
 SET balance = :p2
@@ -173,12 +481,26 @@ RETURNING category_id, user_id, name, type
 
 UPDATE_RATE = """-- name: update_rate \\:one
 UPDATE rate
-SET rate = :p3
+SET rate = :p3,
+    updated_at = CURRENT_TIMESTAMP
 WHERE from_currency = :p1 AND to_currency = :p2
 RETURNING rate_id, from_currency, to_currency, rate, updated_at
 """
 
 
+UPDATE_RATES = """-- name: update_rates \\:exec
+UPDATE rate
+SET rate = fetched.rate,
+    updated_at = CURRENT_TIMESTAMP
+FROM (
+    SELECT unnest(CAST(:p1 AS integer[])) AS to_currency,
+           unnest(CAST(:p2 AS decimal[])) AS rate
+) AS fetched
+WHERE rate.from_currency = :p3
+  AND rate.to_currency = fetched.to_currency
+"""
+
+
 UPDATE_TRANSACTION = """-- name: update_transaction \\:one
 UPDATE transaction
 SET account_id = :p2,
@@ -203,10 +525,47 @@ class UpdateTransactionParams(pydantic.BaseModel):
     user_id: int
 
 
+UPSERT_RATE_SYNC = """-- name: upsert_rate_sync \\:exec
+INSERT INTO rate_sync(
+    base_currency, provider_ts
+) VALUES (
+    :p1, :p2
+)
+ON CONFLICT (base_currency) DO UPDATE
+SET provider_ts = EXCLUDED.provider_ts,
+    synced_at = CURRENT_TIMESTAMP
+"""
+
+
 class Querier:
     def __init__(self, conn: sqlalchemy.engine.Connection):
         self._conn = conn
 
+    def adjust_account_balance(self, *, delta: decimal.Decimal, account_id: int, user_id: int) -> Optional[AdjustAccountBalanceRow]:
+        row = self._conn.execute(sqlalchemy.text(ADJUST_ACCOUNT_BALANCE), {"p1": delta, "p2": account_id, "p3": user_id}).first()
+        if row is None:
+            return None
+        return AdjustAccountBalanceRow(
+            account_id=row[0],
+            user_id=row[1],
+            name=row[2],
+            balance=row[3],
+            currency_id=row[4],
+            refdata_version=row[5],
+        )
+
+    def bump_ledger_version(self, *, user_id: int) -> Optional[int]:
+        row = self._conn.execute(sqlalchemy.text(BUMP_LEDGER_VERSION), {"p1": user_id}).first()
+        if row is None:
+            return None
+        return row[0]
+
+    def bump_refdata_version(self, *, user_id: int) -> Optional[int]:
+        row = self._conn.execute(sqlalchemy.text(BUMP_REFDATA_VERSION), {"p1": user_id}).first()
+        if row is None:
+            return None
+        return row[0]
+
     def create_account(self, *, user_id: int, name: str, balance: decimal.Decimal, currency_id: int) -> Optional[models.Account]:
         row = self._conn.execute(sqlalchemy.text(CREATE_ACCOUNT), {
             "p1": user_id,
@@ -258,6 +617,12 @@ class Querier:
             updated_at=row[4],
         )
 
+    def create_rate_history(self, *, to_currencies: List[int], ts: datetime.datetime, rates: List[decimal.Decimal]) -> None:
+        self._conn.execute(sqlalchemy.text(CREATE_RATE_HISTORY), {"p1": to_currencies, "p2": ts, "p3": rates})
+
+    def create_rates(self, *, from_currency: int, to_currencies: List[int], rates: List[decimal.Decimal]) -> None:
+        self._conn.execute(sqlalchemy.text(CREATE_RATES), {"p1": from_currency, "p2": to_currencies, "p3": rates})
+
     def create_transaction(self, arg: CreateTransactionParams) -> Optional[models.Transaction]:
         row = self._conn.execute(sqlalchemy.text(CREATE_TRANSACTION), {
             "p1": arg.user_id,
@@ -284,6 +649,19 @@ class Querier:
             original_transaction_id=row[9],
         )
 
+    def create_transactions(self, arg: CreateTransactionsParams) -> int:
+        result = self._conn.execute(sqlalchemy.text(CREATE_TRANSACTIONS), {
+            "p1": arg.user_id,
+            "p2": arg.account_ids,
+            "p3": arg.category_ids,
+            "p4": arg.withdrawal_amounts,
+            "p5": arg.expense_amounts,
+            "p6": arg.notes,
+            "p7": arg.state,
+            "p8": arg.dates,
+        })
+        return result.rowcount
+
     def create_user(self, *, currency_id: int) -> Optional[models.UserAccount]:
         row = self._conn.execute(sqlalchemy.text(CREATE_USER), {"p1": currency_id}).first()
         if row is None:
@@ -292,8 +670,25 @@ class Querier:
             user_id=row[0],
             balance=row[1],
             currency_id=row[2],
+            refdata_version=row[3],
+            ledger_version=row[4],
         )
 
+    def export_transactions(self, *, user_id: int) -> Iterator[ExportTransactionsRow]:
+        result = self._conn.execute(sqlalchemy.text(EXPORT_TRANSACTIONS), {"p1": user_id})
+        for row in result:
+            yield ExportTransactionsRow(
+                transaction_id=row[0],
+                date=row[1],
+                account_name=row[2],
+                iso_code=row[3],
+                category_name=row[4],
+                category_type=row[5],
+                withdrawal_amount=row[6],
+                expense_amount=row[7],
+                note=row[8],
+            )
+
     def get_account_by_id(self, *, account_id: int) -> Optional[models.Account]:
         row = self._conn.execute(sqlalchemy.text(GET_ACCOUNT_BY_ID), {"p1": account_id}).first()
         if row is None:
@@ -362,6 +757,21 @@ class Querier:
             symbol=row[3],
         )
 
+    def get_ledger_version(self, *, user_id: int) -> Optional[int]:
+        row = self._conn.execute(sqlalchemy.text(GET_LEDGER_VERSION), {"p1": user_id}).first()
+        if row is None:
+            return None
+        return row[0]
+
+    def get_or_register_telegram_user(self, *, tg_id: int, iso_code: str, account_name: str, category_names: List[str], category_types: List[str]) -> Optional[GetOrRegisterTelegramUserRow]:
+        row = self._conn.execute(sqlalchemy.text(GET_OR_REGISTER_TELEGRAM_USER), {"p1": tg_id, "p2": iso_code, "p3": account_name, "p4": category_names, "p5": category_types}).first()
+        if row is None:
+            return None
+        return GetOrRegisterTelegramUserRow(
+            user_id=row[0],
+            created=row[1],
+        )
+
     def get_rate(self, *, from_currency: int, to_currency: int) -> Optional[models.Rate]:
         row = self._conn.execute(sqlalchemy.text(GET_RATE), {"p1": from_currency, "p2": to_currency}).first()
         if row is None:
@@ -374,6 +784,64 @@ class Querier:
             updated_at=row[4],
         )
 
+    def get_rate_as_of(self, *, iso_code: str, ts: datetime.datetime) -> Optional[models.RateHistory]:
+        row = self._conn.execute(sqlalchemy.text(GET_RATE_AS_OF), {"p1": iso_code, "p2": ts}).first()
+        if row is None:
+            return None
+        return models.RateHistory(
+            to_currency=row[0],
+            ts=row[1],
+            rate=row[2],
+        )
+
+    def get_rate_history_arrays(self, *, currency_ids: List[int]) -> Optional[GetRateHistoryArraysRow]:
+        row = self._conn.execute(sqlalchemy.text(GET_RATE_HISTORY_ARRAYS), {"p1": currency_ids}).first()
+        if row is None:
+            return None
+        return GetRateHistoryArraysRow(
+            to_currencies=row[0],
+            timestamps=row[1],
+            rates=row[2],
+        )
+
+    def get_rate_sync_timestamp(self, *, base_currency: int) -> Optional[datetime.datetime]:
+        row = self._conn.execute(sqlalchemy.text(GET_RATE_SYNC_TIMESTAMP), {"p1": base_currency}).first()
+        if row is None:
+            return None
+        return row[0]
+
+    def get_rates_as_of(self, *, timestamps: List[datetime.datetime], iso_code: str) -> Iterator[GetRatesAsOfRow]:
+        result = self._conn.execute(sqlalchemy.text(GET_RATES_AS_OF), {"p1": timestamps, "p2": iso_code})
+        for row in result:
+            yield GetRatesAsOfRow(
+                requested_ts=row[0],
+                ts=row[1],
+                rate=row[2],
+            )
+
+    def get_rates_from(self, *, iso_code: str) -> Iterator[GetRatesFromRow]:
+        result = self._conn.execute(sqlalchemy.text(GET_RATES_FROM), {"p1": iso_code})
+        for row in result:
+            yield GetRatesFromRow(
+                from_currency=row[0],
+                to_currency=row[1],
+                iso_code=row[2],
+                rate=row[3],
+                updated_at=row[4],
+            )
+
+    def get_rates_version(self, *, iso_code: str) -> Optional[datetime.datetime]:
+        row = self._conn.execute(sqlalchemy.text(GET_RATES_VERSION), {"p1": iso_code}).first()
+        if row is None:
+            return None
+        return row[0]
+
+    def get_refdata_version(self, *, user_id: int) -> Optional[int]:
+        row = self._conn.execute(sqlalchemy.text(GET_REFDATA_VERSION), {"p1": user_id}).first()
+        if row is None:
+            return None
+        return row[0]
+
     def get_transaction_by_id(self, *, transaction_id: int, user_id: int) -> Optional[models.Transaction]:
         row = self._conn.execute(sqlalchemy.text(GET_TRANSACTION_BY_ID), {"p1": transaction_id, "p2": user_id}).first()
         if row is None:
@@ -415,6 +883,8 @@ class Querier:
             user_id=row[0],
             balance=row[1],
             currency_id=row[2],
+            refdata_version=row[3],
+            ledger_version=row[4],
         )
 
     def get_user_categories(self, *, user_id: int) -> Iterator[models.Category]:
@@ -427,6 +897,31 @@ class Querier:
                 type=row[3],
             )
 
+    def get_user_ledger_arrays(self, *, user_id: int) -> Optional[GetUserLedgerArraysRow]:
+        row = self._conn.execute(sqlalchemy.text(GET_USER_LEDGER_ARRAYS), {"p1": user_id}).first()
+        if row is None:
+            return None
+        return GetUserLedgerArraysRow(
+            dates=row[0],
+            category_ids=row[1],
+            currency_ids=row[2],
+            amounts=row[3],
+        )
+
+    def search_transactions(self, *, query: str, user_id: int, after_score: float, after_id: int, page_size: int) -> Iterator[SearchTransactionsRow]:
+        result = self._conn.execute(sqlalchemy.text(SEARCH_TRANSACTIONS), {"p1": query, "p2": user_id, "p3": after_score, "p4": after_id, "p5": page_size})
+        for row in result:
+            yield SearchTransactionsRow(
+                transaction_id=row[0],
+                date=row[1],
+                account_name=row[2],
+                iso_code=row[3],
+                category_name=row[4],
+                withdrawal_amount=row[5],
+                note=row[6],
+                score=row[7],
+            )
+
     def update_account_balance(self, *, account_id: int, balance: decimal.Decimal) -> Optional[models.Account]:
         row = self._conn.execute(sqlalchemy.text(UPDATE_ACCOUNT_BALANCE), {"p1": account_id, "p2": balance}).first()
         if row is None:
@@ -462,6 +957,9 @@ class Querier:
             updated_at=row[4],
         )
 
+    def update_rates(self, *, to_currencies: List[int], rates: List[decimal.Decimal], from_currency: int) -> None:
+        self._conn.execute(sqlalchemy.text(UPDATE_RATES), {"p1": to_currencies, "p2": rates, "p3": from_currency})
+
     def update_transaction(self, arg: UpdateTransactionParams) -> Optional[models.Transaction]:
         row = self._conn.execute(sqlalchemy.text(UPDATE_TRANSACTION), {
             "p1": arg.transaction_id,
@@ -488,11 +986,39 @@ class Querier:
             original_transaction_id=row[9],
         )
 
+    def upsert_rate_sync(self, *, base_currency: int, provider_ts: datetime.datetime) -> None:
+        self._conn.execute(sqlalchemy.text(UPSERT_RATE_SYNC), {"p1": base_currency, "p2": provider_ts})
+
 
 class AsyncQuerier:
     def __init__(self, conn: sqlalchemy.ext.asyncio.AsyncConnection):
         self._conn = conn
 
+    async def adjust_account_balance(self, *, delta: decimal.Decimal, account_id: int, user_id: int) -> Optional[AdjustAccountBalanceRow]:
+        row = (await self._conn.execute(sqlalchemy.text(ADJUST_ACCOUNT_BALANCE), {"p1": delta, "p2": account_id, "p3": user_id})).first()
+        if row is None:
+            return None
+        return AdjustAccountBalanceRow(
+            account_id=row[0],
+            user_id=row[1],
+            name=row[2],
+            balance=row[3],
+            currency_id=row[4],
+            refdata_version=row[5],
+        )
+
+    async def bump_ledger_version(self, *, user_id: int) -> Optional[int]:
+        row = (await self._conn.execute(sqlalchemy.text(BUMP_LEDGER_VERSION), {"p1": user_id})).first()
+        if row is None:
+            return None
+        return row[0]
+
+    async def bump_refdata_version(self, *, user_id: int) -> Optional[int]:
+        row = (await self._conn.execute(sqlalchemy.text(BUMP_REFDATA_VERSION), {"p1": user_id})).first()
+        if row is None:
+            return None
+        return row[0]
+
     async def create_account(self, *, user_id: int, name: str, balance: decimal.Decimal, currency_id: int) -> Optional[models.Account]:
         row = (await self._conn.execute(sqlalchemy.text(CREATE_ACCOUNT), {
             "p1": user_id,
@@ -544,6 +1070,12 @@ class AsyncQuerier:
             updated_at=row[4],
         )
 
+    async def create_rate_history(self, *, to_currencies: List[int], ts: datetime.datetime, rates: List[decimal.Decimal]) -> None:
+        await self._conn.execute(sqlalchemy.text(CREATE_RATE_HISTORY), {"p1": to_currencies, "p2": ts, "p3": rates})
+
+    async def create_rates(self, *, from_currency: int, to_currencies: List[int], rates: List[decimal.Decimal]) -> None:
+        await self._conn.execute(sqlalchemy.text(CREATE_RATES), {"p1": from_currency, "p2": to_currencies, "p3": rates})
+
     async def create_transaction(self, arg: CreateTransactionParams) -> Optional[models.Transaction]:
         row = (await self._conn.execute(sqlalchemy.text(CREATE_TRANSACTION), {
             "p1": arg.user_id,
@@ -570,6 +1102,19 @@ class AsyncQuerier:
             original_transaction_id=row[9],
         )
 
+    async def create_transactions(self, arg: CreateTransactionsParams) -> int:
+        result = await self._conn.execute(sqlalchemy.text(CREATE_TRANSACTIONS), {
+            "p1": arg.user_id,
+            "p2": arg.account_ids,
+            "p3": arg.category_ids,
+            "p4": arg.withdrawal_amounts,
+            "p5": arg.expense_amounts,
+            "p6": arg.notes,
+            "p7": arg.state,
+            "p8": arg.dates,
+        })
+        return result.rowcount
+
     async def create_user(self, *, currency_id: int) -> Optional[models.UserAccount]:
         row = (await self._conn.execute(sqlalchemy.text(CREATE_USER), {"p1": currency_id})).first()
         if row is None:
@@ -578,8 +1123,25 @@ class AsyncQuerier:
             user_id=row[0],
             balance=row[1],
             currency_id=row[2],
+            refdata_version=row[3],
+            ledger_version=row[4],
         )
 
+    async def export_transactions(self, *, user_id: int) -> AsyncIterator[ExportTransactionsRow]:
+        result = await self._conn.stream(sqlalchemy.text(EXPORT_TRANSACTIONS), {"p1": user_id})
+        async for row in result:
+            yield ExportTransactionsRow(
+                transaction_id=row[0],
+                date=row[1],
+                account_name=row[2],
+                iso_code=row[3],
+                category_name=row[4],
+                category_type=row[5],
+                withdrawal_amount=row[6],
+                expense_amount=row[7],
+                note=row[8],
+            )
+
     async def get_account_by_id(self, *, account_id: int) -> Optional[models.Account]:
         row = (await self._conn.execute(sqlalchemy.text(GET_ACCOUNT_BY_ID), {"p1": account_id})).first()
         if row is None:
@@ -648,6 +1210,21 @@ class AsyncQuerier:
             symbol=row[3],
         )
 
+    async def get_ledger_version(self, *, user_id: int) -> Optional[int]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_LEDGER_VERSION), {"p1": user_id})).first()
+        if row is None:
+            return None
+        return row[0]
+
+    async def get_or_register_telegram_user(self, *, tg_id: int, iso_code: str, account_name: str, category_names: List[str], category_types: List[str]) -> Optional[GetOrRegisterTelegramUserRow]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_OR_REGISTER_TELEGRAM_USER), {"p1": tg_id, "p2": iso_code, "p3": account_name, "p4": category_names, "p5": category_types})).first()
+        if row is None:
+            return None
+        return GetOrRegisterTelegramUserRow(
+            user_id=row[0],
+            created=row[1],
+        )
+
     async def get_rate(self, *, from_currency: int, to_currency: int) -> Optional[models.Rate]:
         row = (await self._conn.execute(sqlalchemy.text(GET_RATE), {"p1": from_currency, "p2": to_currency})).first()
         if row is None:
@@ -660,6 +1237,64 @@ class AsyncQuerier:
             updated_at=row[4],
         )
 
+    async def get_rate_as_of(self, *, iso_code: str, ts: datetime.datetime) -> Optional[models.RateHistory]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_RATE_AS_OF), {"p1": iso_code, "p2": ts})).first()
+        if row is None:
+            return None
+        return models.RateHistory(
+            to_currency=row[0],
+            ts=row[1],
+            rate=row[2],
+        )
+
+    async def get_rate_history_arrays(self, *, currency_ids: List[int]) -> Optional[GetRateHistoryArraysRow]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_RATE_HISTORY_ARRAYS), {"p1": currency_ids})).first()
+        if row is None:
+            return None
+        return GetRateHistoryArraysRow(
+            to_currencies=row[0],
+            timestamps=row[1],
+            rates=row[2],
+        )
+
+    async def get_rate_sync_timestamp(self, *, base_currency: int) -> Optional[datetime.datetime]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_RATE_SYNC_TIMESTAMP), {"p1": base_currency})).first()
+        if row is None:
+            return None
+        return row[0]
+
+    async def get_rates_as_of(self, *, timestamps: List[datetime.datetime], iso_code: str) -> AsyncIterator[GetRatesAsOfRow]:
+        result = await self._conn.stream(sqlalchemy.text(GET_RATES_AS_OF), {"p1": timestamps, "p2": iso_code})
+        async for row in result:
+            yield GetRatesAsOfRow(
+                requested_ts=row[0],
+                ts=row[1],
+                rate=row[2],
+            )
+
+    async def get_rates_from(self, *, iso_code: str) -> AsyncIterator[GetRatesFromRow]:
+        result = await self._conn.stream(sqlalchemy.text(GET_RATES_FROM), {"p1": iso_code})
+        async for row in result:
+            yield GetRatesFromRow(
+                from_currency=row[0],
+                to_currency=row[1],
+                iso_code=row[2],
+                rate=row[3],
+                updated_at=row[4],
+            )
+
+    async def get_rates_version(self, *, iso_code: str) -> Optional[datetime.datetime]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_RATES_VERSION), {"p1": iso_code})).first()
+        if row is None:
+            return None
+        return row[0]
+
+    async def get_refdata_version(self, *, user_id: int) -> Optional[int]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_REFDATA_VERSION), {"p1": user_id})).first()
+        if row is None:
+            return None
+        return row[0]
+
     async def get_transaction_by_id(self, *, transaction_id: int, user_id: int) -> Optional[models.Transaction]:
         row = (await self._conn.execute(sqlalchemy.text(GET_TRANSACTION_BY_ID), {"p1": transaction_id, "p2": user_id})).first()
         if row is None:
@@ -701,6 +1336,8 @@ class AsyncQuerier:
             user_id=row[0],
             balance=row[1],
             currency_id=row[2],
+            refdata_version=row[3],
+            ledger_version=row[4],
         )
 
     async def get_user_categories(self, *, user_id: int) -> AsyncIterator[models.Category]:
@@ -713,6 +1350,31 @@ class AsyncQuerier:
                 type=row[3],
             )
 
+    async def get_user_ledger_arrays(self, *, user_id: int) -> Optional[GetUserLedgerArraysRow]:
+        row = (await self._conn.execute(sqlalchemy.text(GET_USER_LEDGER_ARRAYS), {"p1": user_id})).first()
+        if row is None:
+            return None
+        return GetUserLedgerArraysRow(
+            dates=row[0],
+            category_ids=row[1],
+            currency_ids=row[2],
+            amounts=row[3],
+        )
+
+    async def search_transactions(self, *, query: str, user_id: int, after_score: float, after_id: int, page_size: int) -> AsyncIterator[SearchTransactionsRow]:
+        result = await self._conn.stream(sqlalchemy.text(SEARCH_TRANSACTIONS), {"p1": query, "p2": user_id, "p3": after_score, "p4": after_id, "p5": page_size})
+        async for row in result:
+            yield SearchTransactionsRow(
+                transaction_id=row[0],
+                date=row[1],
+                account_name=row[2],
+                iso_code=row[3],
+                category_name=row[4],
+                withdrawal_amount=row[5],
+                note=row[6],
+                score=row[7],
+            )
+
     async def update_account_balance(self, *, account_id: int, balance: decimal.Decimal) -> Optional[models.Account]:
         row = (await self._conn.execute(sqlalchemy.text(UPDATE_ACCOUNT_BALANCE), {"p1": account_id, "p2": balance})).first()
         if row is None:
@@ -748,6 +1410,9 @@ class AsyncQuerier:
             updated_at=row[4],
         )
 
+    async def update_rates(self, *, to_currencies: List[int], rates: List[decimal.Decimal], from_currency: int) -> None:
+        await self._conn.execute(sqlalchemy.text(UPDATE_RATES), {"p1": to_currencies, "p2": rates, "p3": from_currency})
+
     async def update_transaction(self, arg: UpdateTransactionParams) -> Optional[models.Transaction]:
         row = (await self._conn.execute(sqlalchemy.text(UPDATE_TRANSACTION), {
             "p1": arg.transaction_id,
@@ -773,3 +1438,6 @@ class AsyncQuerier:
             date=row[8],
             original_transaction_id=row[9],
         )
+
+    async def upsert_rate_sync(self, *, base_currency: int, provider_ts: datetime.datetime) -> None:
+        await self._conn.execute(sqlalchemy.text(UPSERT_RATE_SYNC), {"p1": base_currency, "p2": provider_ts})
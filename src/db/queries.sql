@@ -18,10 +18,72 @@ INSERT INTO user_account(
 )
 RETURNING *;
 
+-- name: GetOrRegisterTelegramUser :one
+-- The identity row reserves the user id, so of two concurrent calls only
+-- the one that inserted it creates the user. The loser sees no row from
+-- either branch under its statement snapshot and has to run again.
+WITH new_identity AS (
+    INSERT INTO telegram_identity(
+        tg_id, user_id
+    ) VALUES (
+        @tg_id, nextval(pg_get_serial_sequence('user_account', 'user_id'))
+    )
+    ON CONFLICT (tg_id) DO NOTHING
+    RETURNING user_id
+), new_user AS (
+    INSERT INTO user_account(
+        user_id, currency_id
+    )
+    SELECT new_identity.user_id, currency.currency_id
+    FROM new_identity, currency
+    WHERE currency.iso_code = @iso_code
+    RETURNING user_id, currency_id
+), new_account AS (
+    INSERT INTO account(
+        user_id, name, balance, currency_id
+    )
+    SELECT user_id, CAST(@account_name AS varchar), 0, currency_id
+    FROM new_user
+), new_categories AS (
+    INSERT INTO category(
+        user_id, name, type
+    )
+    SELECT new_user.user_id, defaults.name, defaults.type
+    FROM new_user,
+         unnest(
+             CAST(@category_names AS varchar[]),
+             CAST(@category_types AS varchar[])
+         ) AS defaults(name, type)
+)
+SELECT user_id, TRUE AS created FROM new_identity
+UNION ALL
+SELECT user_id, FALSE AS created FROM telegram_identity
+WHERE tg_id = @tg_id;
+
 -- name: GetUser :one
 SELECT * FROM user_account
 WHERE user_id = $1;
 
+-- name: GetRefdataVersion :one
+SELECT refdata_version FROM user_account
+WHERE user_id = $1;
+
+-- name: GetLedgerVersion :one
+SELECT ledger_version FROM user_account
+WHERE user_id = $1;
+
+-- name: BumpLedgerVersion :one
+UPDATE user_account
+SET ledger_version = ledger_version + 1
+WHERE user_id = $1
+RETURNING ledger_version;
+
+-- name: BumpRefdataVersion :one
+UPDATE user_account
+SET refdata_version = refdata_version + 1
+WHERE user_id = $1
+RETURNING refdata_version;
+
 -- name: GetAccounts :many
 SELECT * FROM account
 WHERE user_id = $1;
@@ -40,6 +102,7 @@ INSERT INTO category(
 ) VALUES (
     $1, $2, $3
 )
+ON CONFLICT (user_id, name) DO NOTHING
 RETURNING *;
 
 -- name: GetUserCategories :many
@@ -60,10 +123,147 @@ WHERE from_currency = $1 AND to_currency = $2;
 
 -- name: UpdateRate :one
 UPDATE rate
-SET rate = $3
+SET rate = $3,
+    updated_at = CURRENT_TIMESTAMP
 WHERE from_currency = $1 AND to_currency = $2
 RETURNING *;
 
+-- name: CreateRates :exec
+INSERT INTO rate(
+    from_currency, to_currency, rate
+)
+SELECT CAST(@from_currency AS integer),
+       unnest(CAST(@to_currencies AS integer[])),
+       unnest(CAST(@rates AS decimal[]));
+
+-- name: UpdateRates :exec
+UPDATE rate
+SET rate = fetched.rate,
+    updated_at = CURRENT_TIMESTAMP
+FROM (
+    SELECT unnest(CAST(@to_currencies AS integer[])) AS to_currency,
+           unnest(CAST(@rates AS decimal[])) AS rate
+) AS fetched
+WHERE rate.from_currency = @from_currency
+  AND rate.to_currency = fetched.to_currency;
+
+-- name: GetRatesFrom :many
+SELECT rate.from_currency, rate.to_currency, currency.iso_code, rate.rate, rate.updated_at
+FROM rate
+JOIN currency ON currency.currency_id = rate.to_currency
+WHERE rate.from_currency = (
+    SELECT base.currency_id FROM currency AS base WHERE base.iso_code = $1
+);
+
+-- name: GetRatesVersion :one
+SELECT MAX(updated_at)::timestamptz AS version
+FROM rate
+WHERE from_currency = (
+    SELECT currency_id FROM currency WHERE iso_code = $1
+);
+
+-- name: GetRateSyncTimestamp :one
+SELECT provider_ts
+FROM rate_sync
+WHERE base_currency = $1;
+
+-- name: UpsertRateSync :exec
+INSERT INTO rate_sync(
+    base_currency, provider_ts
+) VALUES (
+    $1, $2
+)
+ON CONFLICT (base_currency) DO UPDATE
+SET provider_ts = EXCLUDED.provider_ts,
+    synced_at = CURRENT_TIMESTAMP;
+
+-- name: CreateRateHistory :exec
+INSERT INTO rate_history(
+    to_currency, ts, rate
+)
+SELECT unnest(CAST(@to_currencies AS integer[])),
+       CAST(@ts AS timestamptz),
+       unnest(CAST(@rates AS decimal[]))
+ON CONFLICT DO NOTHING;
+
+-- name: GetRateAsOf :one
+SELECT * FROM rate_history
+WHERE to_currency = (
+    SELECT currency_id FROM currency WHERE iso_code = @iso_code
+) AND ts <= @ts
+ORDER BY ts DESC
+LIMIT 1;
+
+-- name: GetRatesAsOf :many
+SELECT requested.ts AS requested_ts, history.ts, history.rate
+FROM unnest(CAST(@timestamps AS timestamptz[]))
+    WITH ORDINALITY AS requested(ts, position)
+LEFT JOIN LATERAL (
+    SELECT rate_history.ts, rate_history.rate
+    FROM rate_history
+    WHERE rate_history.to_currency = (
+        SELECT currency_id FROM currency WHERE iso_code = @iso_code
+    ) AND rate_history.ts <= requested.ts
+    ORDER BY rate_history.ts DESC
+    LIMIT 1
+) AS history ON true
+ORDER BY requested.position;
+
+-- name: ExportTransactions :many
+SELECT transaction.transaction_id,
+       transaction.date,
+       account.name AS account_name,
+       currency.iso_code,
+       category.name AS category_name,
+       category.type AS category_type,
+       transaction.withdrawal_amount,
+       transaction.expense_amount,
+       transaction.note
+FROM transaction
+JOIN account ON account.account_id = transaction.account_id
+JOIN currency ON currency.currency_id = account.currency_id
+JOIN category ON category.category_id = transaction.category_id
+WHERE transaction.user_id = $1
+ORDER BY transaction.date, transaction.transaction_id;
+
+-- name: SearchTransactions :many
+SELECT transaction.transaction_id,
+       transaction.date,
+       account.name AS account_name,
+       currency.iso_code,
+       category.name AS category_name,
+       transaction.withdrawal_amount,
+       transaction.note,
+       word_similarity(@query, transaction.note) AS score
+FROM transaction
+JOIN account ON account.account_id = transaction.account_id
+JOIN currency ON currency.currency_id = account.currency_id
+JOIN category ON category.category_id = transaction.category_id
+WHERE transaction.user_id = @user_id
+  AND @query <% transaction.note
+  AND (word_similarity(@query, transaction.note), transaction.transaction_id)
+      < (CAST(@after_score AS real), CAST(@after_id AS integer))
+ORDER BY score DESC, transaction.transaction_id DESC
+LIMIT @page_size;
+
+-- name: GetUserLedgerArrays :one
+SELECT
+    CAST(COALESCE(array_agg(EXTRACT(EPOCH FROM transaction.date) ORDER BY transaction.date), '{}') AS bigint[]) AS dates,
+    CAST(COALESCE(array_agg(transaction.category_id ORDER BY transaction.date), '{}') AS integer[]) AS category_ids,
+    CAST(COALESCE(array_agg(account.currency_id ORDER BY transaction.date), '{}') AS integer[]) AS currency_ids,
+    CAST(COALESCE(array_agg(transaction.withdrawal_amount ORDER BY transaction.date), '{}') AS float8[]) AS amounts
+FROM transaction
+JOIN account ON account.account_id = transaction.account_id
+WHERE transaction.user_id = $1;
+
+-- name: GetRateHistoryArrays :one
+SELECT
+    CAST(COALESCE(array_agg(to_currency ORDER BY to_currency, ts), '{}') AS integer[]) AS to_currencies,
+    CAST(COALESCE(array_agg(EXTRACT(EPOCH FROM ts) ORDER BY to_currency, ts), '{}') AS bigint[]) AS timestamps,
+    CAST(COALESCE(array_agg(rate ORDER BY to_currency, ts), '{}') AS float8[]) AS rates
+FROM rate_history
+WHERE to_currency = ANY(CAST(@currency_ids AS integer[]));
+
 -- name: UpdateCategory :one
 UPDATE category
 SET name = $2
@@ -86,6 +286,19 @@ INSERT INTO transaction(
 )
 RETURNING *;
 
+-- name: CreateTransactions :execrows
+INSERT INTO transaction(
+    user_id, account_id, category_id, withdrawal_amount, expense_amount, note, state, date
+)
+SELECT @user_id,
+       unnest(CAST(@account_ids AS integer[])),
+       unnest(CAST(@category_ids AS integer[])),
+       unnest(CAST(@withdrawal_amounts AS decimal[])),
+       unnest(CAST(@expense_amounts AS decimal[])),
+       unnest(CAST(@notes AS varchar[])),
+       @state,
+       unnest(CAST(@dates AS timestamptz[]));
+
 -- name: GetTransactions :many
 SELECT *
 FROM transaction
@@ -108,6 +321,17 @@ SET balance = $2
 WHERE account_id = $1
 RETURNING *;
 
+-- name: AdjustAccountBalance :one
+-- Checks that the account belongs to the user and returns the user's
+-- current refdata version along with the new balance.
+UPDATE account
+SET balance = account.balance + @delta
+FROM user_account
+WHERE account.account_id = @account_id
+  AND account.user_id = @user_id
+  AND user_account.user_id = account.user_id
+RETURNING account.account_id, account.user_id, account.name, account.balance, account.currency_id, user_account.refdata_version;
+
 -- name: GetAccountById :one
 SELECT *
 FROM account
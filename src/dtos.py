@@ -1,7 +1,83 @@
-from pydantic import BaseModel
+from datetime import date, datetime
+from decimal import Decimal
+
+from pydantic import BaseModel, Field
+
+from db.models import Account, Category
+from db.queries import SearchTransactionsRow
 
 
 class Rates(BaseModel):
     source_iso_code: str
     timestamp: int
-    data: dict[str, float]
+    data: dict[str, Decimal]
+
+
+class NormalizedRates(BaseModel):
+    provider_ts: datetime
+    # Parallel arrays of rates against the base currency, supported
+    # currencies only
+    iso_codes: list[str]
+    rates: list[Decimal]
+
+
+class RatesSnapshot(BaseModel):
+    base_iso_code: str
+    base_currency_id: int | None
+    version: datetime | None
+    # iso code -> amount of that currency for one unit of the base currency
+    rates: dict[str, Decimal]
+    currency_ids: dict[str, int]
+
+
+class CategoryMonthTotal(BaseModel):
+    category_id: int
+    month: date
+    total: Decimal
+
+
+class UserRefData(BaseModel):
+    user_id: int
+    version: int
+    # Insertion ordered as the database returned them. Account balances
+    # are as of loading and must not be used for arithmetic.
+    categories: dict[int, Category]
+    accounts: dict[int, Account]
+
+
+class ParsedExpense(BaseModel):
+    # As typed, without sign
+    amount: Decimal
+    # Marked as income with a leading "+"
+    income: bool
+    # Currencies the typed symbol or code may stand for, most likely
+    # first; empty if none was typed
+    iso_codes: tuple[str, ...]
+    category_id: int
+    note: str | None
+
+
+class ColumnMapping(BaseModel):
+    """Where a bank CSV export keeps each transaction field."""
+
+    # Header names, optional columns may be missing from the file
+    date: str = "date"
+    amount: str = "amount"
+    category: str | None = "category"
+    note: str | None = "note"
+    account: str | None = "account"
+    date_format: str = "%Y-%m-%d"
+    delimiter: str = Field(",", min_length=1, max_length=1)
+    # 1.234,56 instead of 1,234.56
+    decimal_comma: bool = False
+
+
+class ImportProgress(BaseModel):
+    imported: int = 0
+    skipped: int = 0
+
+
+class TransactionSearchPage(BaseModel):
+    transactions: list[SearchTransactionsRow]
+    # Pass back to get the next page, None on the last one
+    cursor: str | None
@@ -1,7 +1,83 @@
 import os
+from decimal import Decimal
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 CURRENCY_URL = os.getenv("CURRENCY_URL", "")
 CURRENCY_API_KEY = os.getenv("CURRENCY_API_KEY", "")
 TG_TOKEN = os.getenv("TG_TOKEN", "")
 REDIS_URL = os.getenv("REDIS_URL", "")
+RATES_CACHE_TTL = float(os.getenv("RATES_CACHE_TTL", "60"))
+CURRENCY_CONNECT_TIMEOUT = float(os.getenv("CURRENCY_CONNECT_TIMEOUT", "3"))
+CURRENCY_READ_TIMEOUT = float(os.getenv("CURRENCY_READ_TIMEOUT", "10"))
+CURRENCY_RETRIES = int(os.getenv("CURRENCY_RETRIES", "3"))
+# Comma separated, API keys in the same order as URLs
+CURRENCY_FALLBACK_URLS = [
+    url for url in os.getenv("CURRENCY_FALLBACK_URLS", "").split(",") if url
+]
+CURRENCY_FALLBACK_API_KEYS = [
+    key
+    for key in os.getenv("CURRENCY_FALLBACK_API_KEYS", "").split(",")
+    if key
+]
+CURRENCY_HEDGE_DELAY = float(os.getenv("CURRENCY_HEDGE_DELAY", "1"))
+# Relative change below which a fetched rate does not overwrite the stored one
+RATES_EPSILON = Decimal(os.getenv("RATES_EPSILON", "0"))
+# Binary rates snapshot shared by the worker and bots on the same host
+RATES_SNAPSHOT_PATH = os.getenv("RATES_SNAPSHOT_PATH", "")
+# Bot handlers running at once; keep below the database pool size
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "8"))
+# Public URL Telegram posts updates to; the bot polls when it is not set
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")  # noqa: S104
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+# Updates accepted but not yet handled before the webhook answers 503
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "256"))
+# Telegram id -> user id mappings kept in memory by each bot process
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+# Users whose categories and accounts each bot process keeps in memory
+REFDATA_CACHE_SIZE = int(os.getenv("REFDATA_CACHE_SIZE", "10000"))
+# Seconds before a cached copy is checked against the database again
+REFDATA_CACHE_TTL = float(os.getenv("REFDATA_CACHE_TTL", "60"))
+# Statement rows written per transaction when importing a CSV
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Seconds between progress message edits while importing
+IMPORT_PROGRESS_INTERVAL = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "2"))
+# Exports up to this size stay in memory, larger ones spill to disk
+EXPORT_SPOOL_SIZE = int(os.getenv("EXPORT_SPOOL_SIZE", str(1024 * 1024)))
+# Telegram rejects bot uploads above 50 MB
+EXPORT_MAX_SIZE = int(os.getenv("EXPORT_MAX_SIZE", str(50 * 1000 * 1000)))
+# Processes drawing /report charts, started on the first report
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "1"))
+# Charts waiting for or being drawn before new reports are refused
+CHART_QUEUE_SIZE = int(os.getenv("CHART_QUEUE_SIZE", "8"))
+# Users whose rendered charts each bot process keeps in memory
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "256"))
+# Months shown by /report without an argument, and the most it accepts
+REPORT_MONTHS = int(os.getenv("REPORT_MONTHS", "6"))
+REPORT_MAX_MONTHS = int(os.getenv("REPORT_MAX_MONTHS", "24"))
+# Telegram send limits: messages per second overall, per private chat
+# (with a short burst) and per group or channel
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_CHAT_BURST = int(os.getenv("SEND_CHAT_BURST", "3"))
+SEND_GROUP_RATE = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))
+# Retries of a request Telegram answered with 429
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+# Messages per second each worker process sends, on top of the bot's
+# SEND_GLOBAL_RATE: the buckets are not shared, keep their sum within
+# Telegram's per-bot limit
+WORKER_SEND_GLOBAL_RATE = float(os.getenv("WORKER_SEND_GLOBAL_RATE", "1"))
+# Chats whose send rate each bot process tracks
+SEND_CHAT_BUCKETS = int(os.getenv("SEND_CHAT_BUCKETS", "10000"))
+# Transactions per /search page; shorter queries match almost anything
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "10"))
+SEARCH_MIN_QUERY_LENGTH = int(os.getenv("SEARCH_MIN_QUERY_LENGTH", "3"))
+# Seconds the bot waits for an offloaded task, and keeps its result
+TASK_RESULT_TIMEOUT = float(os.getenv("TASK_RESULT_TIMEOUT", "300"))
+TASK_RESULT_TTL = int(os.getenv("TASK_RESULT_TTL", str(24 * 60 * 60)))
+# Seconds a scheduled task's lease lasts without renewal, a stalled or
+# dead run blocks the next ones at most that long
+SINGLE_FLIGHT_TTL = float(os.getenv("SINGLE_FLIGHT_TTL", "60"))
+# Port serving Prometheus metrics of the bot or the worker, 0 to disable
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
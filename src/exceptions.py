@@ -2,6 +2,10 @@ class NotSupportedCurrencyError(ValueError):
     pass
 
 
+class InvalidRatesError(ValueError):
+    """Raised when the rates provider answers with unusable data."""
+
+
 class CategoryDuplicateError(ValueError):
     pass
 
@@ -20,3 +24,31 @@ class AccountDuplicateError(ValueError):
 
 class TransactionNotFoundError(ValueError):
     """Raised when a transaction is not found or doesn't belong to the user."""
+
+
+class ExpenseParseError(ValueError):
+    """Raised when a free-text expense has no amount or no category."""
+
+
+class StatementImportError(ValueError):
+    """Raised when a CSV statement or its column mapping is unusable."""
+
+
+class ExportFormatError(ValueError):
+    """Raised when transactions cannot be exported in the asked format."""
+
+
+class ExportTooLargeError(ValueError):
+    """Raised when an export outgrows what Telegram accepts."""
+
+
+class TransactionSearchError(ValueError):
+    """Raised when a search query is too short or its cursor is invalid."""
+
+
+class ChartQueueFullError(RuntimeError):
+    """Raised when too many charts are already waiting to be drawn."""
+
+
+class TaskTimeoutError(RuntimeError):
+    """Raised when no worker finished an offloaded task in time."""
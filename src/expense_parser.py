@@ -0,0 +1,237 @@
+import re
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any
+
+from currencies import CURRENCIES
+from db.models import Category
+from dtos import ParsedExpense, UserRefData
+from env import REFDATA_CACHE_SIZE
+from exceptions import ExpenseParseError
+from lru import LRUCache
+from misc import CATEGORY_ALIASES
+
+# sign, prefix (symbol or iso code), number, suffix
+_AMOUNT = re.compile(r"([+-]?)(\D*?)(\d+(?:[.,]\d+)*)(\D*)")
+_THOUSANDS_GROUP = 3
+_PUNCTUATION = ".,;:!?\"'()"
+# Trie nodes map a word to the next node, the match ending at a node is
+# stored under a key no word can have
+_END = ""
+
+
+def _iso_codes_by_symbol() -> dict[str, tuple[str, ...]]:
+    # CURRENCIES is ordered by how widely a currency is used, so the
+    # first currency using a symbol is the most likely one
+    iso_codes: dict[str, tuple[str, ...]] = {}
+    for iso_code, currency in CURRENCIES.items():
+        symbol = currency["symbol"]
+        iso_codes[symbol] = (*iso_codes.get(symbol, ()), iso_code)
+    return iso_codes
+
+
+_ISO_CODES_BY_SYMBOL = _iso_codes_by_symbol()
+
+
+def resolve_currency(token: str, *, attached: bool = False) -> tuple[str, ...]:
+    """Currencies a symbol or iso code may stand for, most likely first.
+
+    Iso codes written as separate words must be uppercase, many of them
+    are also words ("2 cup coffee", "all", "top"). Codes ``attached`` to
+    the amount, as in "12usd", may be of any case.
+    """
+    iso_code = token.upper() if attached else token
+    if iso_code in CURRENCIES:
+        return (iso_code,)
+    return _ISO_CODES_BY_SYMBOL.get(token, ())
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryMatch:
+    category_id: int
+    # Word span of the match in the text
+    start: int
+    end: int
+    is_alias: bool
+
+
+class CategoryMatcher:
+    """Finds category names and aliases in a list of words.
+
+    Names and aliases are compiled into a trie keyed by casefolded words,
+    so matching costs one dict lookup per word of the text and of the
+    longest phrase, however many categories the user has. Names win over
+    aliases, then longer phrases, then the leftmost one.
+    """
+
+    def __init__(
+        self,
+        categories: Iterable[Category],
+        aliases: Mapping[str, Sequence[str]] = CATEGORY_ALIASES,
+    ) -> None:
+        self._root: dict[str, Any] = {}
+        categories = list(categories)
+        for category in categories:
+            self._add(category.name, (category.category_id, False))
+        for category in categories:
+            for alias in aliases.get(category.name.casefold(), ()):
+                self._add(alias, (category.category_id, True))
+
+    def _add(self, phrase: str, value: tuple[int, bool]) -> None:
+        words = normalize_words(phrase.split())
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        # The first category to claim a phrase keeps it
+        _ = node.setdefault(_END, value)
+
+    def match(self, words: Sequence[str]) -> CategoryMatch | None:
+        best: CategoryMatch | None = None
+        for start in range(len(words)):
+            node = self._root
+            for end in range(start, len(words)):
+                node = node.get(words[end])
+                if node is None:
+                    break
+                value = node.get(_END)
+                if value is None:
+                    continue
+                candidate = CategoryMatch(value[0], start, end + 1, value[1])
+                if best is None or _rank(candidate) > _rank(best):
+                    best = candidate
+        return best
+
+
+def _rank(match: CategoryMatch) -> tuple[bool, int, int]:
+    return (not match.is_alias, match.end - match.start, -match.start)
+
+
+def normalize_words(tokens: Iterable[str]) -> list[str]:
+    return [token.strip(_PUNCTUATION).casefold() for token in tokens]
+
+
+def _parse_number(number: str) -> Decimal | None:
+    """Parse "1,234.56", "1.234,56", "1,234" or "12,50", None if invalid.
+
+    The last separator is the decimal one when it is the only one of its
+    kind and either follows another kind, a leading zero, or is not
+    followed by exactly three digits. The other ones group thousands.
+    """
+    *integer, last = re.split(r"[.,]", number)
+    separators = re.sub(r"\d", "", number)
+    fraction = ""
+    if (
+        separators
+        and separators.count(separators[-1]) == 1
+        and (
+            len(set(separators)) > 1
+            or integer[0] == "0"
+            or len(last) != _THOUSANDS_GROUP
+        )
+    ):
+        fraction = last
+        separators = separators[:-1]
+    else:
+        integer.append(last)
+
+    if len(set(separators)) > 1 or any(
+        len(group) != _THOUSANDS_GROUP for group in integer[1:]
+    ):
+        return None
+    if separators and len(integer[0]) > _THOUSANDS_GROUP:
+        return None
+    return Decimal("".join(integer) + (f".{fraction}" if fraction else ""))
+
+
+def _find_amount(
+    tokens: Sequence[str],
+) -> tuple[int, Decimal, bool, tuple[str, ...]] | None:
+    """Index, amount, income sign and attached currencies of the amount."""
+    for index, token in enumerate(tokens):
+        parsed = _AMOUNT.fullmatch(token)
+        if parsed is None:
+            continue
+        sign, prefix, number, suffix = parsed.groups()
+        if prefix and suffix:
+            continue
+        attached = prefix or suffix
+        iso_codes = (
+            resolve_currency(attached, attached=True) if attached else ()
+        )
+        if attached and not iso_codes:
+            continue
+        amount = _parse_number(number)
+        if amount is None:
+            continue
+        return index, amount, sign == "+", iso_codes
+    return None
+
+
+def parse_expense(text: str, matcher: CategoryMatcher) -> ParsedExpense:
+    """Parse e.g. "12.50 coffee restaurant" or "+500€ salary".
+
+    The first number is the amount. A currency may be attached to it or
+    be the word right before or after it, and the remaining words are
+    matched against the categories. Words that are neither amount,
+    currency nor the matched category become the note.
+    """
+    tokens = text.split()
+    found = _find_amount(tokens)
+    if found is None:
+        msg = "There is no amount in the message"
+        raise ExpenseParseError(msg)
+    index, amount, income, iso_codes = found
+
+    used = {index}
+    if not iso_codes:
+        for neighbour in (index + 1, index - 1):
+            if 0 <= neighbour < len(tokens):
+                iso_codes = resolve_currency(tokens[neighbour])
+                if iso_codes:
+                    used.add(neighbour)
+                    break
+
+    rest = [token for i, token in enumerate(tokens) if i not in used]
+    category = matcher.match(normalize_words(rest))
+    if category is None:
+        msg = "There is no known category in the message"
+        raise ExpenseParseError(msg)
+
+    note = " ".join(
+        rest[: category.start] + rest[category.end :],
+    )
+    return ParsedExpense(
+        amount=amount,
+        income=income,
+        iso_codes=iso_codes,
+        category_id=category.category_id,
+        note=note or None,
+    )
+
+
+class ExpenseParser:
+    """Parses free-text expenses with a compiled matcher per user.
+
+    Matchers are rebuilt only when the user's ``refdata_version`` moves,
+    i.e. when their categories change.
+    """
+
+    def __init__(self, maxsize: int = REFDATA_CACHE_SIZE) -> None:
+        self._matchers: LRUCache[int, tuple[int, CategoryMatcher]] = LRUCache(
+            maxsize,
+        )
+
+    def parse(self, refdata: UserRefData, text: str) -> ParsedExpense:
+        return parse_expense(text, self.matcher(refdata))
+
+    def matcher(self, refdata: UserRefData) -> CategoryMatcher:
+        cached = self._matchers.get(refdata.user_id)
+        if cached is not None and cached[0] == refdata.version:
+            return cached[1]
+
+        matcher = CategoryMatcher(refdata.categories.values())
+        self._matchers.put(refdata.user_id, (refdata.version, matcher))
+        return matcher
@@ -0,0 +1,113 @@
+import csv
+import io
+from collections.abc import AsyncIterable
+from datetime import UTC, datetime
+from enum import StrEnum, auto
+from typing import IO
+
+from db.queries import ExportTransactionsRow
+from exceptions import ExportFormatError
+
+try:
+    import openpyxl
+except ImportError:  # installed with the xlsx extra
+    openpyxl = None
+
+HEADER = (
+    "date",
+    "account",
+    "currency",
+    "category",
+    "category_type",
+    "withdrawal_amount",
+    "expense_amount",
+    "note",
+)
+
+# Spreadsheets run cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class ExportFormat(StrEnum):
+    CSV = auto()
+    XLSX = auto()
+
+
+async def write_export(
+    rows: AsyncIterable[ExportTransactionsRow],
+    file: IO[bytes],
+    export_format: ExportFormat,
+) -> int:
+    """Write ``rows`` as they arrive, returns how many were written.
+
+    Neither writer keeps rows in memory: CSV lines go straight to
+    ``file`` and XLSX rows to openpyxl's write-only sheet, which spools
+    them to disk until the workbook is saved. Text that a spreadsheet
+    would run as a formula is prefixed with a quote.
+    """
+    if export_format == ExportFormat.XLSX:
+        return await _write_xlsx(rows, file)
+    return await _write_csv(rows, file)
+
+
+async def _write_csv(
+    rows: AsyncIterable[ExportTransactionsRow],
+    file: IO[bytes],
+) -> int:
+    text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(text)
+        writer.writerow(HEADER)
+        count = 0
+        async for row in rows:
+            writer.writerow(_fields(row, row.date.isoformat()))
+            count += 1
+    finally:
+        # Leave the underlying file open for the caller
+        text.flush()
+        _ = text.detach()
+    return count
+
+
+async def _write_xlsx(
+    rows: AsyncIterable[ExportTransactionsRow],
+    file: IO[bytes],
+) -> int:
+    if openpyxl is None:
+        msg = "XLSX export is not available, use CSV"
+        raise ExportFormatError(msg)
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Transactions")
+    sheet.append(HEADER)
+    count = 0
+    async for row in rows:
+        # Excel has no time zones, dates are written in UTC
+        date = row.date.astimezone(UTC).replace(tzinfo=None)
+        sheet.append(_fields(row, date))
+        count += 1
+    workbook.save(file)
+    return count
+
+
+def _fields(
+    row: ExportTransactionsRow,
+    date: datetime | str,
+) -> tuple[object, ...]:
+    return (
+        date,
+        _text(row.account_name),
+        row.iso_code,
+        _text(row.category_name),
+        row.category_type,
+        row.withdrawal_amount,
+        row.expense_amount,
+        _text(row.note),
+    )
+
+
+def _text(value: str | None) -> str | None:
+    # Names and notes come from users and bank statements
+    if value is not None and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
@@ -0,0 +1,153 @@
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from cross_rates import to_decimals
+from db.queries import GetRateHistoryArraysRow, GetUserLedgerArraysRow
+from dtos import CategoryMonthTotal
+from exceptions import NotSupportedCurrencyError
+
+# Timestamps are unix seconds and fit into the low 32 bits until 2106, so an
+# (id, timestamp) pair packs into one sortable int64 key.
+_KEY_SHIFT = 32
+
+
+class LedgerArrays(NamedTuple):
+    """Transactions of a user as parallel arrays."""
+
+    dates: npt.NDArray[np.int64]
+    category_ids: npt.NDArray[np.int64]
+    currency_ids: npt.NDArray[np.int64]
+    amounts: npt.NDArray[np.float64]
+
+    @classmethod
+    def from_row(cls, row: GetUserLedgerArraysRow) -> "LedgerArrays":
+        return cls(
+            np.asarray(row.dates, dtype=np.int64),
+            np.asarray(row.category_ids, dtype=np.int64),
+            np.asarray(row.currency_ids, dtype=np.int64),
+            np.asarray(row.amounts, dtype=np.float64),
+        )
+
+
+class RateHistoryArrays(NamedTuple):
+    """Rates against the base currency sorted by (currency id, timestamp)."""
+
+    currency_ids: npt.NDArray[np.int64]
+    timestamps: npt.NDArray[np.int64]
+    rates: npt.NDArray[np.float64]
+
+    @classmethod
+    def from_row(cls, row: GetRateHistoryArraysRow) -> "RateHistoryArrays":
+        return cls(
+            np.asarray(row.to_currencies, dtype=np.int64),
+            np.asarray(row.timestamps, dtype=np.int64),
+            np.asarray(row.rates, dtype=np.float64),
+        )
+
+
+def _pack(
+    currency_ids: npt.NDArray[np.int64],
+    timestamps: npt.NDArray[np.int64],
+) -> npt.NDArray[np.int64]:
+    return (currency_ids << _KEY_SHIFT) | timestamps
+
+
+def rates_as_of(
+    history: RateHistoryArrays,
+    currency_ids: npt.NDArray[np.int64],
+    timestamps: npt.NDArray[np.int64],
+    base_currency_id: int,
+) -> npt.NDArray[np.float64]:
+    """Rate of ``currency_ids[i]`` in effect at ``timestamps[i]``.
+
+    A moment before the first known rate of a currency falls back to that
+    first rate. The base currency always has rate 1.
+    """
+    keys = _pack(history.currency_ids, history.timestamps)
+    positions = np.searchsorted(
+        keys,
+        _pack(currency_ids, timestamps),
+        side="right",
+    )
+    first_positions = np.searchsorted(
+        keys,
+        currency_ids << _KEY_SHIFT,
+        side="left",
+    )
+    positions = np.maximum(positions - 1, first_positions)
+
+    in_bounds = positions < keys.size
+    found = np.zeros(currency_ids.shape, dtype=bool)
+    found[in_bounds] = (
+        history.currency_ids[positions[in_bounds]] == currency_ids[in_bounds]
+    )
+
+    rates = np.full(currency_ids.shape, np.nan)
+    rates[found] = history.rates[positions[found]]
+    rates[currency_ids == base_currency_id] = 1.0
+
+    missing = np.isnan(rates)
+    if missing.any():
+        unknown = sorted(set(currency_ids[missing].tolist()))
+        msg = f"There is no rate history for currencies with ids {unknown}"
+        raise NotSupportedCurrencyError(msg)
+    return rates
+
+
+def convert_ledger(
+    ledger: LedgerArrays,
+    history: RateHistoryArrays,
+    base_currency_id: int,
+    to_currency_id: int,
+) -> npt.NDArray[np.float64]:
+    """Amounts of the ledger in ``to_currency_id`` at each transaction date."""
+    from_rates = rates_as_of(
+        history,
+        ledger.currency_ids,
+        ledger.dates,
+        base_currency_id,
+    )
+    to_rates = rates_as_of(
+        history,
+        np.full_like(ledger.currency_ids, to_currency_id),
+        ledger.dates,
+        base_currency_id,
+    )
+    return ledger.amounts * (to_rates / from_rates)
+
+
+def totals_by_category_month(
+    ledger: LedgerArrays,
+    converted: npt.NDArray[np.float64],
+    places: int = 2,
+) -> list[CategoryMonthTotal]:
+    months = ledger.dates.astype("datetime64[s]").astype("datetime64[M]")
+    month_numbers = months.astype(np.int64)
+    # Months since the epoch are non-negative for any real transaction
+    keys = (ledger.category_ids << _KEY_SHIFT) | month_numbers
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    totals = np.bincount(
+        inverse,
+        weights=converted,
+        minlength=unique_keys.size,
+    )
+
+    category_ids = (unique_keys >> _KEY_SHIFT).tolist()
+    first_days = (
+        (unique_keys & ((1 << _KEY_SHIFT) - 1))
+        .astype("datetime64[M]")
+        .astype(date)
+        .tolist()
+    )
+    return [
+        CategoryMonthTotal(category_id=category_id, month=month, total=total)
+        for category_id, month, total in zip(
+            category_ids,
+            first_days,
+            to_decimals(totals, places),
+            strict=True,
+        )
+    ]
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int) -> None:
+        if maxsize < 1:
+            msg = "maxsize must be a positive integer"
+            raise ValueError(msg)
+        self._maxsize = maxsize
+        self._entries: OrderedDict[K, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        """Return whether ``key`` is cached, without marking it as used."""
+        return key in self._entries
+
+    def get(self, key: K) -> V | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            _ = self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        return self._entries.pop(key, None)
@@ -1,18 +1,117 @@
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable, Coroutine
+from pathlib import Path
+from typing import Any
 
 from loguru import logger
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import create_async_engine
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
+    CallbackQueryHandler,
     CommandHandler,
+    MessageHandler,
+    filters,
 )
 
+from charts import ChartRenderer
 from controller import Controller
-from env import DATABASE_URL, TG_TOKEN
+from db.manager import DBManager
+from env import (
+    BOT_CONCURRENT_UPDATES,
+    DATABASE_URL,
+    RATES_SNAPSHOT_PATH,
+    REDIS_URL,
+    TG_TOKEN,
+    WEBHOOK_URL,
+)
+from metrics import serve_metrics
+from offload import TaskOffloader
+from rate_limiter import SendRateLimiter
+from rates_cache import RatesCache
+from rates_channel import RatesSubscriber
+from rates_file import RatesFileReader, RatesFileWatcher
+from requesters import ExchangeRatesRequester
+from service import Service
+from update_processor import UserOrderedUpdateProcessor
+from webhook import WebhookServer
 
 logging.basicConfig(level=logging.INFO)
 
 
+class BackgroundTasks:
+    """Coroutines that run for the lifetime of the application."""
+
+    def __init__(self) -> None:
+        self._jobs: list[Callable[[], Coroutine[Any, Any, None]]] = []
+        self._startups: list[Callable[[], Awaitable[None]]] = []
+        self._cleanups: list[Callable[[], Awaitable[None]]] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(
+        self,
+        job: Callable[[], Coroutine[Any, Any, None]],
+        cleanup: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self._jobs.append(job)
+        if cleanup is not None:
+            self._cleanups.append(cleanup)
+
+    def on_start(self, startup: Callable[[], Awaitable[None]]) -> None:
+        self._startups.append(startup)
+
+    def on_stop(self, cleanup: Callable[[], Awaitable[None]]) -> None:
+        self._cleanups.append(cleanup)
+
+    def install(self, builder: ApplicationBuilder) -> None:
+        _ = builder.post_init(self._start).post_shutdown(self._stop)
+
+    async def _start(self, _: Application) -> None:
+        for startup in self._startups:
+            await startup()
+        for job in self._jobs:
+            self._tasks.add(asyncio.create_task(job()))
+
+    async def _stop(self, _: Application) -> None:
+        for task in self._tasks:
+            _ = task.cancel()
+        for cleanup in self._cleanups:
+            await cleanup()
+
+
+def subscribe_to_rates(tasks: BackgroundTasks, cache: RatesCache) -> None:
+    """Keep ``cache`` in sync with snapshots published by the worker."""
+    redis = Redis.from_url(REDIS_URL)
+    subscriber = RatesSubscriber(redis, cache)
+    tasks.add(subscriber.run, redis.aclose)
+
+
+def offload_to_workers(tasks: BackgroundTasks) -> TaskOffloader:
+    """Run reports and exports on the taskiq workers."""
+    # Imported only here, the broker cannot be built without REDIS_URL
+    from worker.broker import broker
+
+    tasks.on_start(broker.startup)
+    tasks.on_stop(broker.shutdown)
+    return TaskOffloader(broker)
+
+
+def watch_rates_file(tasks: BackgroundTasks, cache: RatesCache) -> None:
+    """Serve rates from the worker's file, starting with the current one."""
+    watcher = RatesFileWatcher(
+        RatesFileReader(Path(RATES_SNAPSHOT_PATH)),
+        cache,
+    )
+    try:
+        _ = watcher.load()
+    except (OSError, ValueError):
+        # The bot starts anyway, rates then come from Redis or Postgres
+        logger.exception("Failed to map rates file")
+    tasks.add(watcher.run)
+
+
 if __name__ == "__main__":
     if not TG_TOKEN:
         msg = "You need to set up TG bot token..."
@@ -24,14 +123,70 @@ if __name__ == "__main__":
 
     logger.warning(DATABASE_URL)
     engine = create_async_engine(DATABASE_URL, echo=True)
-    controller = Controller(engine)
-    app = ApplicationBuilder().token(TG_TOKEN).build()
+    db_manager = DBManager(engine)
+    rates_cache = RatesCache(db_manager, Service.BASE_CURRENCY)
+    chart_renderer = ChartRenderer()
+    requester = ExchangeRatesRequester()
+    service = Service(
+        db_manager,
+        requester,
+        rates_cache,
+        chart_renderer=chart_renderer,
+    )
+    background_tasks = BackgroundTasks()
+    offloader = offload_to_workers(background_tasks) if REDIS_URL else None
+    controller = Controller(service, offloader)
+
+    builder = (
+        ApplicationBuilder()
+        .token(TG_TOKEN)
+        .concurrent_updates(
+            UserOrderedUpdateProcessor(BOT_CONCURRENT_UPDATES),
+        )
+        .rate_limiter(SendRateLimiter())
+    )
+    background_tasks.on_stop(chart_renderer.close)
+    background_tasks.on_stop(requester.aclose)
+    if RATES_SNAPSHOT_PATH:
+        watch_rates_file(background_tasks, rates_cache)
+    if REDIS_URL:
+        subscribe_to_rates(background_tasks, rates_cache)
+    background_tasks.install(builder)
+    if WEBHOOK_URL:
+        # Updates come from the webhook server, not from polling
+        _ = builder.updater(None)
+    app = builder.build()
     start_handler = CommandHandler("start", controller.start)
+    export_handler = CommandHandler("export", controller.export)
+    report_handler = CommandHandler("report", controller.report)
+    search_handler = CommandHandler("search", controller.search)
+    search_more_handler = CallbackQueryHandler(
+        controller.search_more,
+        pattern="^search:",
+    )
+    expense_handler = MessageHandler(
+        filters.TEXT & ~filters.COMMAND,
+        controller.add_expense,
+    )
+    statement_handler = MessageHandler(
+        filters.Document.FileExtension("csv"),
+        controller.import_statement,
+    )
 
     app.add_handler(start_handler)
+    app.add_handler(export_handler)
+    app.add_handler(report_handler)
+    app.add_handler(search_handler)
+    app.add_handler(search_more_handler)
+    app.add_handler(expense_handler)
+    app.add_handler(statement_handler)
 
+    serve_metrics()
     logger.info("Starting the server...")
     try:
-        app.run_polling()
+        if WEBHOOK_URL:
+            asyncio.run(WebhookServer(app).serve())
+        else:
+            app.run_polling()
     except KeyboardInterrupt:
         logger.info("Stopping the server")
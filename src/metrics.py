@@ -0,0 +1,87 @@
+import os
+
+from loguru import logger
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+    start_http_server,
+)
+
+from env import METRICS_PORT
+
+DB_TRANSACTION_SECONDS = Histogram(
+    "db_transaction_seconds",
+    "Time a database connection is held by a transaction.",
+    ["name"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+BOT_SEND_QUEUE_DEPTH = Gauge(
+    "bot_send_queue_depth",
+    "Bot API requests waiting for the send rate limiter.",
+    ["priority"],
+)
+
+BOT_SEND_WAIT_SECONDS = Histogram(
+    "bot_send_wait_seconds",
+    "Time a bot API request waited for the send rate limiter.",
+    ["priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+BOT_SEND_RETRIES = Counter(
+    "bot_send_retries",
+    "Bot API requests retried after Telegram answered 429.",
+    ["priority"],
+)
+
+SINGLE_FLIGHT_RUNS = Counter(
+    "single_flight_runs",
+    "Runs of single-flight tasks by outcome: completed, skipped because "
+    "another run was active, or stopped after losing the lease.",
+    ["name", "outcome"],
+)
+
+TASK_QUEUE_LAG_SECONDS = Histogram(
+    "task_queue_lag_seconds",
+    "Time from sending a taskiq task to a worker starting it.",
+    ["task_name"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+TASK_DURATION_SECONDS = Histogram(
+    "task_duration_seconds",
+    "Time a worker spent executing a taskiq task.",
+    ["task_name"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+TASK_RUNS = Counter(
+    "task_runs",
+    "Executed taskiq tasks by outcome: success or failure.",
+    ["task_name", "outcome"],
+)
+
+
+def serve_metrics(port: int = METRICS_PORT) -> None:
+    """Expose the metrics over HTTP on ``port``, not at all if it is 0.
+
+    With PROMETHEUS_MULTIPROC_DIR set, as for workers running several
+    processes, the first process to bind the port serves the metrics of
+    all of them.
+    """
+    if not port:
+        return
+
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    try:
+        _ = start_http_server(port, registry=registry)
+    except OSError as e:
+        logger.debug(f"Metrics are served by another process: {e}")
@@ -23,3 +23,19 @@ DEFAULT_CATEGORIES: list[DefaultCategory] = [
     {"name": "Shopping", "category_type": CategoryType.EXPENSE},
     {"name": "Salary", "category_type": CategoryType.INCOME},
 ]
+
+DEFAULT_ACCOUNT_NAME = "Default"
+
+# Words that pick a default category in free-text expenses, keyed by the
+# casefolded category name
+CATEGORY_ALIASES: dict[str, list[str]] = {
+    "groceries": ["food", "supermarket", "grocery", "market"],
+    "restaurant": ["coffee", "cafe", "lunch", "dinner", "breakfast", "bar"],
+    "leisure": ["cinema", "movie", "concert", "games", "hobby"],
+    "transport": ["taxi", "bus", "metro", "train", "fuel", "parking"],
+    "health": ["pharmacy", "doctor", "medicine", "dentist"],
+    "gifts": ["gift", "present"],
+    "family": ["kids", "school"],
+    "shopping": ["clothes", "shoes", "electronics"],
+    "salary": ["paycheck", "wage", "bonus"],
+}
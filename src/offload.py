@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import uuid
+from collections.abc import Hashable
+from typing import Any
+
+from loguru import logger
+from taskiq import AsyncBroker
+from taskiq.exceptions import TaskiqResultTimeoutError
+from taskiq.kicker import AsyncKicker
+
+from env import TASK_RESULT_TIMEOUT
+from exceptions import TaskTimeoutError
+
+
+def task_key(task_name: str, version: Hashable, *args: object) -> str:
+    """Task id naming the result of ``task_name`` for these inputs.
+
+    ``version`` must change whenever the data the task reads does, the
+    same id then always stands for the same result.
+    """
+    digest = hashlib.sha256(repr((args, version)).encode()).hexdigest()
+    return f"{task_name}:{digest}"
+
+
+class TaskOffloader:
+    """Runs heavy computations on taskiq workers, reusing their results.
+
+    Tasks are kicked by name, so the bot never imports the code they run.
+    Their id is a ``task_key``: a result the result backend still keeps
+    for the same inputs is returned without kicking the task again, and
+    identical calls waiting in this process share one task. Tasks run
+    with ``reuse=False`` get a fresh id and are always kicked, for those
+    with side effects or results too large to keep.
+    """
+
+    def __init__(
+        self,
+        broker: AsyncBroker,
+        timeout: float = TASK_RESULT_TIMEOUT,
+        check_interval: float = 0.2,
+    ) -> None:
+        self._broker = broker
+        self._timeout = timeout
+        self._check_interval = check_interval
+        self._running: dict[str, asyncio.Future[Any]] = {}
+
+    async def run(
+        self,
+        task_name: str,
+        version: Hashable,
+        *args: object,
+        reuse: bool = True,
+    ) -> Any:  # noqa: ANN401
+        """Return ``task_name(*args)``, raising what the task raised.
+
+        Raises ``TaskTimeoutError`` if no worker finishes it within the
+        timeout.
+        """
+        if not reuse:
+            return await self._kick(uuid.uuid4().hex, task_name, args)
+
+        key = task_key(task_name, version, *args)
+        running = self._running.get(key)
+        if running is None:
+            running = asyncio.ensure_future(self._run(key, task_name, args))
+            self._running[key] = running
+            running.add_done_callback(lambda _: self._running.pop(key, None))
+        # Shielded, a caller that gives up must not cancel the others
+        return await asyncio.shield(running)
+
+    async def _run(
+        self,
+        key: str,
+        task_name: str,
+        args: tuple[object, ...],
+    ) -> Any:  # noqa: ANN401
+        backend = self._broker.result_backend
+        if await backend.is_result_ready(key):
+            result = await backend.get_result(key)
+            # Failures may be transient, only successes are reused
+            if not result.is_err:
+                logger.debug(f"Reusing the result of {key}")
+                return result.return_value
+
+        return await self._kick(key, task_name, args)
+
+    async def _kick(
+        self,
+        key: str,
+        task_name: str,
+        args: tuple[object, ...],
+    ) -> Any:  # noqa: ANN401
+        task = (
+            await AsyncKicker(task_name, self._broker, {})
+            .with_task_id(key)
+            .kiq(*args)
+        )
+        try:
+            result = await task.wait_result(
+                check_interval=self._check_interval,
+                timeout=self._timeout,
+            )
+        except TaskiqResultTimeoutError:
+            msg = "The workers are busy, try again later"
+            raise TaskTimeoutError(msg) from None
+        return result.raise_for_error().return_value
@@ -0,0 +1,229 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import Callable, Coroutine
+from datetime import timedelta
+from enum import IntEnum
+from typing import Any, override
+
+from loguru import logger
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from env import (
+    SEND_CHAT_BUCKETS,
+    SEND_CHAT_BURST,
+    SEND_CHAT_RATE,
+    SEND_GLOBAL_RATE,
+    SEND_GROUP_RATE,
+    SEND_MAX_RETRIES,
+)
+from lru import LRUCache
+from metrics import (
+    BOT_SEND_QUEUE_DEPTH,
+    BOT_SEND_RETRIES,
+    BOT_SEND_WAIT_SECONDS,
+)
+
+JSONResult = bool | dict[str, Any] | list[dict[str, Any]]
+
+
+class Priority(IntEnum):
+    """Order in which queued sends go out, lower first.
+
+    Pass it as ``rate_limit_args`` of a bot method, e.g.
+    ``bot.send_message(chat_id, text, rate_limit_args=Priority.BROADCAST)``;
+    sends without one are interactive.
+    """
+
+    INTERACTIVE = 0
+    BROADCAST = 1
+
+
+class TokenBucket:
+    """Token bucket kept as the time it will next be full (GCRA).
+
+    ``rate`` tokens are added per second, up to ``burst``.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self._interval = 1 / rate
+        self._tolerance = (burst - 1) * self._interval
+        # Theoretical arrival time of the next token
+        self._tat = 0.0
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available."""
+        return max(self._tat - self._tolerance - now, 0.0)
+
+    def take(self, now: float) -> None:
+        self._tat = max(self._tat, now) + self._interval
+
+    def reserve(self, now: float) -> float:
+        """Take the next token, returns how long to wait before using it.
+
+        Reservations queue up in call order without any waiting caller
+        holding a lock.
+        """
+        delay = self.delay(now)
+        self.take(now)
+        return delay
+
+
+class SendRateLimiter(BaseRateLimiter[int]):
+    """Paces every bot API request sent to a chat.
+
+    A request first waits for its chat's bucket (``chat_rate`` per
+    second in private chats, ``group_rate`` in groups and channels), then
+    queues for the global bucket, which hands out tokens in ``Priority``
+    order. Requests without a chat (getUpdates, getMe, ...) pass through.
+    When Telegram answers 429 anyway, all sends pause for ``retry_after``
+    and the request is retried up to ``max_retries`` times.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = SEND_GLOBAL_RATE,
+        global_burst: int | None = None,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: int = SEND_CHAT_BURST,
+        group_rate: float = SEND_GROUP_RATE,
+        max_retries: int = SEND_MAX_RETRIES,
+        max_chats: int = SEND_CHAT_BUCKETS,
+    ) -> None:
+        # A second's worth of sends may go out at once by default
+        self._global = TokenBucket(
+            global_rate,
+            global_burst or max(int(global_rate), 1),
+        )
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._group_rate = group_rate
+        self._max_retries = max_retries
+        # Idle chats are forgotten, their buckets are full again anyway
+        self._chats: LRUCache[int | str, TokenBucket] = LRUCache(max_chats)
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._order = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._paused_until = 0.0
+        self._dispatcher: asyncio.Task[None] | None = None
+
+    @override
+    async def initialize(self) -> None:
+        self._start_dispatcher()
+
+    @override
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            _ = self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, waiter in self._waiters:
+            _ = waiter.cancel()
+        self._waiters.clear()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @override
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, JSONResult]],
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: int | None,
+    ) -> JSONResult:
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            return await callback(*args, **kwargs)
+
+        priority = Priority(rate_limit_args or Priority.INTERACTIVE)
+        retries = 0
+        while True:
+            await self._acquire(chat_id, priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if retries >= self._max_retries:
+                    raise
+                retries += 1
+                delay = _seconds(e.retry_after)
+                logger.warning(
+                    f"Telegram asked to retry {endpoint} in {delay}s",
+                )
+                BOT_SEND_RETRIES.labels(priority.name.lower()).inc()
+                # Flood control is per bot, holding back only this chat
+                # would run straight into it again
+                self._paused_until = max(
+                    self._paused_until,
+                    time.monotonic() + delay,
+                )
+
+    async def _acquire(self, chat_id: int | str, priority: Priority) -> None:
+        label = priority.name.lower()
+        started = time.monotonic()
+        BOT_SEND_QUEUE_DEPTH.labels(label).inc()
+        try:
+            delay = self._chat_bucket(chat_id).reserve(started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(
+                self._waiters,
+                (priority, next(self._order), waiter),
+            )
+            self._start_dispatcher()
+            self._wakeup.set()
+            await waiter
+        finally:
+            BOT_SEND_QUEUE_DEPTH.labels(label).dec()
+        BOT_SEND_WAIT_SECONDS.labels(label).observe(
+            time.monotonic() - started,
+        )
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Private chats have positive ids, groups negative ones and
+            # channels may be given by @username
+            if isinstance(chat_id, int) and chat_id > 0:
+                bucket = TokenBucket(self._chat_rate, self._chat_burst)
+            else:
+                bucket = TokenBucket(self._group_rate)
+            self._chats.put(chat_id, bucket)
+        return bucket
+
+    def _start_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._waiters:
+                self._wakeup.clear()
+                _ = await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            delay = max(self._paused_until - now, self._global.delay(now))
+            if delay > 0:
+                # Whatever is queued meanwhile competes for the next token
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, waiter = heapq.heappop(self._waiters)
+            # Requests cancelled while queued do not use up a token
+            if waiter.done():
+                continue
+            self._global.take(now)
+            waiter.set_result(None)
+
+
+def _seconds(retry_after: float | timedelta) -> float:
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Callable
+
+from loguru import logger
+
+from cross_rates import CrossRates
+from db.manager import DBManager
+from dtos import RatesSnapshot
+from env import RATES_CACHE_TTL
+
+
+class RatesCache:
+    """In-process copy of the rates stored against the base currency.
+
+    Reads are served from memory. Once ``ttl`` seconds have passed the
+    cache asks the database for ``MAX(rate.updated_at)`` and reloads the
+    rates only if that value has advanced.
+    """
+
+    def __init__(
+        self,
+        db_manager: DBManager,
+        base_iso_code: str,
+        ttl: float = RATES_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._db_manager = db_manager
+        self._base_iso_code = base_iso_code
+        self._ttl = ttl
+        self._clock = clock
+        self._snapshot: RatesSnapshot | None = None
+        self._cross_rates: CrossRates | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> RatesSnapshot | None:
+        return self._snapshot
+
+    def is_fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and self._clock() - self._checked_at < self._ttl
+        )
+
+    async def get(self) -> RatesSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and self.is_fresh():
+            return snapshot
+
+        async with self._lock:
+            # Another caller may have refreshed while we were waiting
+            if self._snapshot is not None and self.is_fresh():
+                return self._snapshot
+            return await self.refresh()
+
+    async def get_cross_rates(self) -> CrossRates:
+        snapshot = await self.get()
+        if self._cross_rates is None:
+            self._cross_rates = CrossRates.from_snapshot(snapshot)
+        return self._cross_rates
+
+    async def refresh(self) -> RatesSnapshot:
+        async with self._db_manager.transaction():
+            version = await self._db_manager.get_rates_version(
+                self._base_iso_code,
+            )
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                rows = await self._db_manager.get_rates_from(
+                    self._base_iso_code,
+                )
+                snapshot = RatesSnapshot(
+                    base_iso_code=self._base_iso_code,
+                    base_currency_id=rows[0].from_currency if rows else None,
+                    version=version,
+                    rates={row.iso_code: row.rate for row in rows},
+                    currency_ids={
+                        row.iso_code: row.to_currency for row in rows
+                    },
+                )
+                logger.info(f"Loaded {len(rows)} rates, version {version}")
+
+        self.swap(snapshot)
+        return snapshot
+
+    def swap(
+        self,
+        snapshot: RatesSnapshot,
+        cross_rates: CrossRates | None = None,
+    ) -> None:
+        """Serve ``snapshot``, with ``cross_rates`` built from it if given."""
+        if cross_rates is not None:
+            self._cross_rates = cross_rates
+        elif snapshot is not self._snapshot:
+            self._cross_rates = None
+        self._snapshot = snapshot
+        self._checked_at = self._clock()
+
+    def invalidate(self) -> None:
+        self._checked_at = float("-inf")
@@ -0,0 +1,92 @@
+import asyncio
+import zlib
+
+from loguru import logger
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from dtos import RatesSnapshot
+from rates_cache import RatesCache
+
+SNAPSHOT_KEY = "rates:snapshot"
+INVALIDATION_CHANNEL = "rates:invalidate"
+RECONNECT_DELAY = 5
+
+
+def encode_snapshot(snapshot: RatesSnapshot) -> bytes:
+    return zlib.compress(snapshot.model_dump_json().encode())
+
+
+def decode_snapshot(blob: bytes) -> RatesSnapshot:
+    return RatesSnapshot.model_validate_json(zlib.decompress(blob))
+
+
+class RatesPublisher:
+    """Shares freshly written rates with every bot replica through Redis."""
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+
+    async def publish(self, snapshot: RatesSnapshot) -> None:
+        version = snapshot.version.isoformat() if snapshot.version else ""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            _ = pipe.set(SNAPSHOT_KEY, encode_snapshot(snapshot))
+            _ = pipe.publish(INVALIDATION_CHANNEL, version)
+            _ = await pipe.execute()
+        logger.info(f"Published rates snapshot, version {version}")
+
+
+class RatesSubscriber:
+    """Swaps the local ``RatesCache`` whenever the worker publishes rates."""
+
+    def __init__(self, redis: Redis, cache: RatesCache) -> None:
+        self._redis = redis
+        self._cache = cache
+
+    async def load(self) -> bool:
+        """Swap in the published snapshot, False if it is absent or stale.
+
+        A snapshot that cannot be decoded is logged and skipped, the cache
+        keeps its rates until the next publish.
+        """
+        blob = await self._redis.get(SNAPSHOT_KEY)
+        if blob is None:
+            return False
+
+        try:
+            snapshot = decode_snapshot(blob)
+        except (zlib.error, ValidationError):
+            logger.exception("Skipping a rates snapshot that is corrupt")
+            return False
+
+        current = self._cache.snapshot
+        if (
+            current is not None
+            and current.version is not None
+            and snapshot.version is not None
+            and snapshot.version < current.version
+        ):
+            return False
+
+        self._cache.swap(snapshot)
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await self._listen()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _listen(self) -> None:
+        """Follow the invalidation channel until the connection is lost."""
+        try:
+            async with self._redis.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Catch up on anything published while we were not
+                # subscribed
+                _ = await self.load()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        _ = await self.load()
+        except RedisError:
+            logger.exception("Lost rates subscription, reconnecting...")
@@ -0,0 +1,203 @@
+import asyncio
+import mmap
+import os
+import struct
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from cross_rates import CrossRates, FloatArray
+from dtos import RatesSnapshot
+from rates_cache import RatesCache
+
+MAGIC = b"EXRATES\0"
+LAYOUT_VERSION = 1
+POLL_INTERVAL = 1
+
+# magic, layout version, rate vector size, index entries, base iso code,
+# base currency id (-1 if unknown), version in microseconds since the
+# epoch (-1 if unknown). Padded so that the rate vector is 8-byte aligned.
+_HEADER = struct.Struct("<8sIII4si4xq")
+# iso code, currency id
+_INDEX_ENTRY = struct.Struct("<4si")
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def write_rates_file(path: Path, snapshot: RatesSnapshot) -> None:
+    """Atomically replace ``path`` with the binary form of ``snapshot``.
+
+    The file is a header, the rate vector of ``CrossRates`` as
+    little-endian float64 indexed by currency id, and the iso code ->
+    currency id index. It is written next to ``path`` and renamed over
+    it, so readers either see the old file or the complete new one.
+    """
+    base_rates = CrossRates.from_snapshot(snapshot).base_rates
+    version_us = -1
+    if snapshot.version is not None:
+        version_us = (snapshot.version - _EPOCH) // timedelta(microseconds=1)
+
+    header = _HEADER.pack(
+        MAGIC,
+        LAYOUT_VERSION,
+        base_rates.size,
+        len(snapshot.currency_ids),
+        snapshot.base_iso_code.encode(),
+        -1 if snapshot.base_currency_id is None else snapshot.base_currency_id,
+        version_us,
+    )
+    index = b"".join(
+        _INDEX_ENTRY.pack(iso_code.encode(), currency_id)
+        for iso_code, currency_id in snapshot.currency_ids.items()
+    )
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as f:
+        _ = f.write(header)
+        _ = f.write(base_rates.astype("<f8").tobytes())
+        _ = f.write(index)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+class MappedRates:
+    """Read-only view over a memory-mapped rates file.
+
+    ``base_rates`` points straight into the mapping, so every process
+    mapping the same file shares one copy of the rates in the page cache.
+    The mapping lives as long as the object and the arrays taken from it.
+    """
+
+    def __init__(self, buffer: mmap.mmap) -> None:
+        if len(buffer) < _HEADER.size:
+            msg = "Rates file is truncated"
+            raise ValueError(msg)
+
+        (
+            magic,
+            layout_version,
+            size,
+            index_size,
+            base_iso_code,
+            base_currency_id,
+            version_us,
+        ) = _HEADER.unpack_from(buffer)
+        if magic != MAGIC or layout_version != LAYOUT_VERSION:
+            msg = "Not a rates file or unsupported layout"
+            raise ValueError(msg)
+
+        index_offset = _HEADER.size + size * 8
+        if len(buffer) != index_offset + index_size * _INDEX_ENTRY.size:
+            msg = "Rates file is truncated"
+            raise ValueError(msg)
+
+        self.base_iso_code = base_iso_code.rstrip(b"\0").decode()
+        self.base_currency_id = (
+            None if base_currency_id == -1 else base_currency_id
+        )
+        self.version = (
+            None
+            if version_us == -1
+            else _EPOCH + timedelta(microseconds=version_us)
+        )
+        self.base_rates: FloatArray = np.frombuffer(
+            buffer,
+            dtype="<f8",
+            count=size,
+            offset=_HEADER.size,
+        )
+        self.currency_ids = {
+            iso_code.rstrip(b"\0").decode(): currency_id
+            for iso_code, currency_id in _INDEX_ENTRY.iter_unpack(
+                buffer[index_offset:],
+            )
+        }
+
+    def to_snapshot(self) -> RatesSnapshot:
+        # repr gives the shortest string that round-trips, i.e. the rate
+        # as the provider sent it for anything up to 15 significant digits
+        return RatesSnapshot(
+            base_iso_code=self.base_iso_code,
+            base_currency_id=self.base_currency_id,
+            version=self.version,
+            rates={
+                iso_code: Decimal(repr(float(self.base_rates[currency_id])))
+                for iso_code, currency_id in self.currency_ids.items()
+            },
+            currency_ids=self.currency_ids,
+        )
+
+    def cross_rates(self) -> CrossRates:
+        currency_ids = dict(self.currency_ids)
+        if self.base_currency_id is not None:
+            currency_ids[self.base_iso_code] = self.base_currency_id
+        return CrossRates(self.base_rates, currency_ids)
+
+
+class RatesFileReader:
+    """Maps the rates file again whenever it has been replaced."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._file_id: tuple[int, int] | None = None
+
+    def load(self) -> MappedRates | None:
+        """Map the file if it changed since the last load, else None."""
+        try:
+            f = self._path.open("rb")
+        except FileNotFoundError:
+            return None
+
+        with f:
+            stat = os.fstat(f.fileno())
+            file_id = (stat.st_ino, stat.st_mtime_ns)
+            if file_id == self._file_id:
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        mapped = MappedRates(buffer)
+        self._file_id = file_id
+        return mapped
+
+
+class RatesFileWatcher:
+    """Swaps the local ``RatesCache`` whenever the worker rewrites the file."""
+
+    def __init__(
+        self,
+        reader: RatesFileReader,
+        cache: RatesCache,
+        interval: float = POLL_INTERVAL,
+    ) -> None:
+        self._reader = reader
+        self._cache = cache
+        self._interval = interval
+
+    def load(self) -> bool:
+        mapped = self._reader.load()
+        if mapped is None:
+            return False
+
+        current = self._cache.snapshot
+        if (
+            current is not None
+            and current.version is not None
+            and mapped.version is not None
+            and mapped.version < current.version
+        ):
+            return False
+
+        self._cache.swap(mapped.to_snapshot(), mapped.cross_rates())
+        logger.info(f"Mapped rates file, version {mapped.version}")
+        return True
+
+    async def run(self) -> None:
+        while True:
+            try:
+                _ = self.load()
+            except (OSError, ValueError):
+                logger.exception("Failed to map rates file")
+            await asyncio.sleep(self._interval)
@@ -0,0 +1,100 @@
+import time
+from collections.abc import Callable
+
+from db.manager import DBManager
+from db.models import Account, Category
+from dtos import UserRefData
+from env import REFDATA_CACHE_SIZE, REFDATA_CACHE_TTL
+from lru import LRUCache
+
+
+class RefDataCache:
+    """In-process copy of each user's categories and accounts.
+
+    Entries carry the user's ``refdata_version``, which every write to
+    categories or accounts bumps. Writes made through this process
+    invalidate the entry right away; writes made elsewhere are noticed
+    when a later write statement reports a newer version (see
+    ``validate``), or at the latest ``ttl`` seconds after the entry was
+    last checked, when one read compares the version with the database.
+    Categories and accounts are never deleted, so a cached
+    one always still belongs to its user; an id missing from the cache
+    reloads the entry once in case it was created elsewhere.
+    """
+
+    def __init__(
+        self,
+        db_manager: DBManager,
+        maxsize: int = REFDATA_CACHE_SIZE,
+        ttl: float = REFDATA_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._db_manager = db_manager
+        self._ttl = ttl
+        self._clock = clock
+        # user id -> when the entry was last checked, the entry
+        self._entries: LRUCache[int, tuple[float, UserRefData]] = LRUCache(
+            maxsize,
+        )
+
+    async def get(self, user_id: int) -> UserRefData:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return await self.load(user_id)
+
+        checked_at, refdata = entry
+        if self._clock() - checked_at < self._ttl:
+            return refdata
+
+        async with self._db_manager.transaction("get_refdata_version"):
+            version = await self._db_manager.get_refdata_version(user_id)
+        if version != refdata.version:
+            return await self.load(user_id)
+        self._entries.put(user_id, (self._clock(), refdata))
+        return refdata
+
+    async def get_category(
+        self,
+        user_id: int,
+        category_id: int,
+    ) -> Category | None:
+        category = (await self.get(user_id)).categories.get(category_id)
+        if category is None:
+            category = (await self.load(user_id)).categories.get(category_id)
+        return category
+
+    async def get_account(
+        self,
+        user_id: int,
+        account_id: int,
+    ) -> Account | None:
+        account = (await self.get(user_id)).accounts.get(account_id)
+        if account is None:
+            account = (await self.load(user_id)).accounts.get(account_id)
+        return account
+
+    async def load(self, user_id: int) -> UserRefData:
+        async with self._db_manager.transaction("load_refdata"):
+            version = await self._db_manager.get_refdata_version(user_id)
+            categories = await self._db_manager.get_user_categories(user_id)
+            accounts = await self._db_manager.get_accounts(user_id)
+
+        refdata = UserRefData(
+            user_id=user_id,
+            version=version or 0,
+            categories={c.category_id: c for c in categories},
+            accounts={a.account_id: a for a in accounts},
+        )
+        # Unknown users are not cached so that they cannot evict real ones
+        if version is not None:
+            self._entries.put(user_id, (self._clock(), refdata))
+        return refdata
+
+    def validate(self, user_id: int, version: int) -> None:
+        """Drop the entry if the database has moved past its version."""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1].version != version:
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id)
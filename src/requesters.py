@@ -1,11 +1,38 @@
+import asyncio
+import json
+import random
+import statistics
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable, Sequence
+from decimal import Decimal
+from pathlib import Path
 from typing import override
 
 import httpx
+from loguru import logger
 
 from db.models import Currency
 from dtos import Rates
-from env import CURRENCY_API_KEY, CURRENCY_URL
+from env import (
+    CURRENCY_API_KEY,
+    CURRENCY_CONNECT_TIMEOUT,
+    CURRENCY_FALLBACK_API_KEYS,
+    CURRENCY_FALLBACK_URLS,
+    CURRENCY_HEDGE_DELAY,
+    CURRENCY_READ_TIMEOUT,
+    CURRENCY_RETRIES,
+    CURRENCY_URL,
+)
+
+RETRY_BACKOFF = 0.5
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Latencies of the primary provider used to estimate its p95
+LATENCY_WINDOW = 100
+MIN_LATENCY_SAMPLES = 20
+# With one other answer there is no telling which of the two is off
+MIN_CROSS_CHECK_ANSWERS = 2
 
 
 class RatesRequester(ABC):
@@ -13,30 +40,345 @@ class RatesRequester(ABC):
     async def fetch(self, base_currency: Currency) -> Rates:
         pass
 
+    async def aclose(self) -> None:  # noqa: B027
+        """Release connections held by the requester."""
+
 
 class ExchangeRatesRequester(RatesRequester):
-    def __init__(self, client: httpx.AsyncClient | None = None) -> None:
-        self._client = client or httpx.AsyncClient()
+    """Rates from an exchangeratesapi-compatible endpoint.
+
+    The requester owns one ``httpx.AsyncClient`` for its whole lifetime so
+    that connections are kept alive between fetches; call ``aclose`` once
+    it is no longer needed. Connection errors, timeouts and retryable
+    statuses are retried up to ``retries`` times with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        url: str = CURRENCY_URL,
+        api_key: str = CURRENCY_API_KEY,
+        retries: int = CURRENCY_RETRIES,
+        backoff: float = RETRY_BACKOFF,
+    ) -> None:
+        self._client = client or self._make_client()
+        self._url = url
+        self._api_key = api_key
+        self._retries = retries
+        self._backoff = backoff
+
+    @staticmethod
+    def _make_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(
+                CURRENCY_READ_TIMEOUT,
+                connect=CURRENCY_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=10,
+                max_keepalive_connections=5,
+                keepalive_expiry=60,
+            ),
+        )
+
+    @override
+    async def fetch(self, base_currency: Currency) -> Rates:
+        return decode_rates(await self.fetch_raw(base_currency))
+
+    async def fetch_raw(self, base_currency: Currency) -> bytes:
+        """Body of the provider response, as it was sent."""
+        response = await self._get(
+            params={
+                "access_key": self._api_key,
+                "base": base_currency.iso_code,
+            },
+        )
+        return response.content
+
+    @override
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _get(self, params: dict[str, str]) -> httpx.Response:
+        for attempt in range(self._retries + 1):
+            is_last = attempt == self._retries
+            try:
+                response = await self._client.get(self._url, params=params)
+            except httpx.TransportError as e:
+                if is_last:
+                    raise
+                logger.warning(f"Rates request failed: {e!r}, retrying...")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or is_last:
+                    return response.raise_for_status()
+                logger.warning(
+                    f"Rates request returned {response.status_code}, "
+                    "retrying...",
+                )
+
+            await asyncio.sleep(self._backoff * 2**attempt)
+
+        msg = "Retries must not be negative"
+        raise ValueError(msg)
+
+
+# We are not handling success=False in response
+def decode_rates(content: bytes) -> Rates:
+    """Decode a provider response, rates are parsed straight to Decimal.
+
+    Numbers are never round-tripped through float, so rates keep every
+    digit the provider sent. The rates are not validated here, that is
+    left to the normalization step that reads them anyway.
+    """
+    response = json.loads(content, parse_float=Decimal, parse_int=Decimal)
+    return Rates.model_construct(
+        source_iso_code=response["base"],
+        timestamp=int(response["timestamp"]),
+        data=response["rates"],
+    )
+
+
+class HedgedRatesRequester(RatesRequester):
+    """Rates from the first of several providers to answer.
+
+    Providers are tried in order. The next one is fired when the current
+    ones are slower than the primary provider's p95 latency (or
+    ``hedge_delay`` until enough latencies are collected), or right away
+    when one of them fails. The first answer wins and is cross-checked
+    against the answers of other providers that arrive within
+    ``cross_check_timeout``: rates deviating from the median of all
+    answers by more than ``outlier_threshold`` are dropped, as long as at
+    least two other providers answered for them. Only hedges already in
+    flight take part in the check unless ``cross_check`` asks more
+    providers every time. A primary outrun by a hedge counts as having
+    taken as long as the winner, so its p95 does not drift down.
+    """
+
+    def __init__(
+        self,
+        requesters: Sequence[RatesRequester],
+        *,
+        hedge_delay: float = CURRENCY_HEDGE_DELAY,
+        outlier_threshold: float = 0.05,
+        cross_check: bool = False,
+        cross_check_timeout: float = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not requesters:
+            msg = "At least one rates requester is required"
+            raise ValueError(msg)
+
+        self._requesters = list(requesters)
+        self._initial_hedge_delay = hedge_delay
+        self._outlier_threshold = Decimal(str(outlier_threshold))
+        self._cross_check = cross_check
+        self._cross_check_timeout = cross_check_timeout
+        self._clock = clock
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def hedge_delay(self) -> float:
+        if len(self._latencies) < MIN_LATENCY_SAMPLES:
+            return self._initial_hedge_delay
+        return statistics.quantiles(self._latencies, n=20)[-1]
 
     @override
     async def fetch(self, base_currency: Currency) -> Rates:
-        async with self._client:
-            response = await self._client.get(
-                CURRENCY_URL,
-                params={
-                    "access_key": CURRENCY_API_KEY,
-                    "base": base_currency.iso_code,
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
-
-        return await self._format_response(data)
-
-    # We are not handling success=False in response
-    async def _format_response(self, response: dict) -> Rates:
-        return Rates(
-            source_iso_code=response["base"],
-            timestamp=response["timestamp"],
-            data=response["rates"],
+        started = self._clock()
+        waiting = iter(enumerate(self._requesters))
+        pending: dict[asyncio.Task[Rates], int] = {}
+
+        def start_next() -> bool:
+            index, requester = next(waiting, (None, None))
+            if requester is None:
+                return False
+            task = asyncio.create_task(requester.fetch(base_currency))
+            pending[task] = index
+            return True
+
+        _ = start_next()
+        errors: list[Exception] = []
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if start_next():
+                        logger.info("Rates provider is slow, hedging...")
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        rates = task.result()
+                    except Exception as e:
+                        logger.warning(
+                            f"Rates provider #{index} failed: {e!r}",
+                        )
+                        errors.append(e)
+                        _ = start_next()
+                        continue
+
+                    # A primary still running was at least this slow
+                    if index == 0 or 0 in pending.values():
+                        self._latencies.append(self._clock() - started)
+                    return await self._cross_check_rates(
+                        rates,
+                        pending,
+                        start_next,
+                    )
+        finally:
+            for task in pending:
+                _ = task.cancel()
+
+        raise errors[-1]
+
+    @override
+    async def aclose(self) -> None:
+        for requester in self._requesters:
+            await requester.aclose()
+
+    async def _cross_check_rates(
+        self,
+        rates: Rates,
+        pending: dict[asyncio.Task[Rates], int],
+        start_next: Callable[[], bool],
+    ) -> Rates:
+        while self._cross_check and len(pending) < MIN_CROSS_CHECK_ANSWERS:
+            if not start_next():
+                break
+        if len(pending) < MIN_CROSS_CHECK_ANSWERS:
+            return rates
+
+        done, _ = await asyncio.wait(
+            pending,
+            timeout=self._cross_check_timeout,
+        )
+        others = [
+            task.result()
+            for task in done
+            if not task.cancelled() and task.exception() is None
+        ]
+        if len(others) < MIN_CROSS_CHECK_ANSWERS:
+            return rates
+
+        checked: dict[str, Decimal] = {}
+        for iso_code, rate in rates.data.items():
+            answers = [o.data[iso_code] for o in others if iso_code in o.data]
+            if len(answers) < MIN_CROSS_CHECK_ANSWERS:
+                checked[iso_code] = rate
+                continue
+            median = statistics.median([rate, *answers])
+            if median > 0 and abs(rate - median) > (
+                self._outlier_threshold * median
+            ):
+                logger.warning(
+                    f"{iso_code} rate {rate} deviates from other providers "
+                    f"({median}), skipping it...",
+                )
+                continue
+            checked[iso_code] = rate
+
+        return rates.model_copy(update={"data": checked})
+
+
+class RecordingRatesRequester(RatesRequester):
+    """Saves every provider response under ``directory`` for replaying.
+
+    Files are named ``<base iso code>-<sequence number>.json`` and hold the
+    response body exactly as the provider sent it.
+    """
+
+    def __init__(
+        self,
+        requester: ExchangeRatesRequester,
+        directory: Path,
+    ) -> None:
+        self._requester = requester
+        self._directory = directory
+
+    @override
+    async def fetch(self, base_currency: Currency) -> Rates:
+        content = await self._requester.fetch_raw(base_currency)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        iso_code = base_currency.iso_code
+        sequence = len(list(self._directory.glob(f"{iso_code}-*.json")))
+        path = self._directory / f"{iso_code}-{sequence:04d}.json"
+        _ = path.write_bytes(content)
+        logger.info(f"Recorded rates response to {path}")
+        return decode_rates(content)
+
+    @override
+    async def aclose(self) -> None:
+        await self._requester.aclose()
+
+
+class ReplayRatesRequester(RatesRequester):
+    """Replays responses saved by ``RecordingRatesRequester``, no network.
+
+    Responses for a base currency are served in file name order and start
+    over once exhausted. Every fetch waits ``latency`` seconds plus a
+    uniform jitter of up to ``jitter`` seconds either way; ``seed`` makes
+    that jitter reproducible.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        latency: float = 0,
+        jitter: float = 0,
+        seed: int | None = None,
+    ) -> None:
+        self._directory = directory
+        self._latency = latency
+        self._jitter = jitter
+        self._random = random.Random(seed)
+        self._responses: dict[str, list[bytes]] = {}
+        self._served: dict[str, int] = {}
+
+    @override
+    async def fetch(self, base_currency: Currency) -> Rates:
+        responses = self._load(base_currency.iso_code)
+        served = self._served.get(base_currency.iso_code, 0)
+        self._served[base_currency.iso_code] = served + 1
+
+        delay = self._latency + self._random.uniform(
+            -self._jitter,
+            self._jitter,
+        )
+        await asyncio.sleep(max(delay, 0))
+        return decode_rates(responses[served % len(responses)])
+
+    def _load(self, iso_code: str) -> list[bytes]:
+        responses = self._responses.get(iso_code)
+        if responses is None:
+            responses = [
+                path.read_bytes()
+                for path in sorted(self._directory.glob(f"{iso_code}-*.json"))
+            ]
+            if not responses:
+                msg = f"No recorded {iso_code} rates in {self._directory}"
+                raise FileNotFoundError(msg)
+            self._responses[iso_code] = responses
+        return responses
+
+
+def make_rates_requester() -> RatesRequester:
+    """Build a requester for ``CURRENCY_URL`` hedged with the fallbacks."""
+    primary = ExchangeRatesRequester()
+    if not CURRENCY_FALLBACK_URLS:
+        return primary
+
+    fallbacks = [
+        ExchangeRatesRequester(url=url, api_key=api_key)
+        for url, api_key in zip(
+            CURRENCY_FALLBACK_URLS,
+            CURRENCY_FALLBACK_API_KEYS,
+            strict=True,
         )
+    ]
+    return HedgedRatesRequester([primary, *fallbacks])
@@ -1,21 +1,67 @@
+import tempfile
+from collections.abc import (
+    Awaitable,
+    Callable,
+    Hashable,
+    Iterable,
+    Sequence,
+)
 from datetime import UTC, datetime
 from decimal import Decimal
 from enum import StrEnum, auto
+from itertools import islice
+from typing import IO
 
+import numpy as np
 from loguru import logger
 
+from charts import ChartCache, ChartRenderer, Period, build_spending_chart
+from cross_rates import CrossRates, from_decimals, to_decimals
+from csv_import import StatementResolver, StatementRow
 from currencies import CURRENCIES
 from db.manager import DBManager
 from db.models import Account, Category, Currency, Transaction, UserAccount
-from dtos import Rates
+from db.queries import AdjustAccountBalanceRow
+from dtos import (
+    CategoryMonthTotal,
+    ImportProgress,
+    NormalizedRates,
+    Rates,
+    RatesSnapshot,
+    TransactionSearchPage,
+)
+from env import (
+    EXPORT_MAX_SIZE,
+    EXPORT_SPOOL_SIZE,
+    IMPORT_CHUNK_SIZE,
+    RATES_EPSILON,
+    SEARCH_MIN_QUERY_LENGTH,
+    SEARCH_PAGE_SIZE,
+    USER_CACHE_SIZE,
+)
 from exceptions import (
     AccountDuplicateError,
     AccountNotFoundError,
     CategoryDuplicateError,
+    ExportTooLargeError,
+    InvalidRatesError,
     NotExistingCategoryError,
+    NotSupportedCurrencyError,
     TransactionNotFoundError,
+    TransactionSearchError,
 )
-from misc import CategoryType
+from expense_parser import ExpenseParser
+from export import ExportFormat, write_export
+from ledger import (
+    LedgerArrays,
+    RateHistoryArrays,
+    convert_ledger,
+    totals_by_category_month,
+)
+from lru import LRUCache
+from misc import DEFAULT_ACCOUNT_NAME, CategoryType
+from rates_cache import RatesCache
+from refdata_cache import RefDataCache
 from requesters import RatesRequester
 
 
@@ -25,18 +71,59 @@ class TransactionState(StrEnum):
 
 class Service:
     BASE_CURRENCY = "EUR"
+    DEFAULT_USER_CURRENCY = "USD"
 
     def __init__(
         self,
         db_manager: DBManager,
         requester: RatesRequester,
+        rates_cache: RatesCache | None = None,
+        rates_epsilon: Decimal = RATES_EPSILON,
+        user_cache_size: int = USER_CACHE_SIZE,
+        refdata_cache: RefDataCache | None = None,
+        expense_parser: ExpenseParser | None = None,
+        chart_renderer: ChartRenderer | None = None,
+        chart_cache: ChartCache | None = None,
     ) -> None:
         self._db_manager = db_manager
         self._rates_requester = requester
+        self._rates_epsilon = rates_epsilon
+        # Telegram id -> user id, the mapping never changes once created
+        self._user_ids: LRUCache[int, int] = LRUCache(user_cache_size)
+        self._rates_cache = rates_cache or RatesCache(
+            db_manager,
+            self.BASE_CURRENCY,
+        )
+        self._refdata = refdata_cache or RefDataCache(db_manager)
+        self._expense_parser = expense_parser or ExpenseParser()
+        self._chart_renderer = chart_renderer or ChartRenderer()
+        self._charts = chart_cache or ChartCache()
+
+    async def get_or_register_user(self, tg_id: int) -> int:
+        """Resolve the user id of a Telegram user, registering it if new.
+
+        Known ids are answered from memory without touching the database.
+        """
+        user_id = self._user_ids.get(tg_id)
+        if user_id is not None:
+            return user_id
+
+        async with self._db_manager.transaction("get_or_register_user"):
+            user = await self._db_manager.get_or_register_telegram_user(
+                tg_id,
+                self.DEFAULT_USER_CURRENCY,
+            )
+        if user.created:
+            logger.info(f"Registered user {user.user_id}")
+
+        self._user_ids.put(tg_id, user.user_id)
+        return user.user_id
 
     async def register_user(self) -> UserAccount:
         async with self._db_manager.transaction():
-            currency = await self._db_manager.get_currency("USD")
+            currency = await self._db_manager.get_currency(
+                self.DEFAULT_USER_CURRENCY,
+            )
             user = await self._db_manager.create_user(
                 currency_id=currency.currency_id,
             )
@@ -54,18 +141,18 @@ class Service:
         category_type: CategoryType,
     ) -> Category:
         async with self._db_manager.transaction():
-            category = await self._db_manager.get_category(
-                name=name,
-                user_id=user_id,
-            )
-            if category is not None:
-                raise CategoryDuplicateError
-
-            return await self._db_manager.create_category(
+            # The unique (user_id, name) constraint is checked by the insert
+            category = await self._db_manager.create_category(
                 user_id,
                 name,
                 category_type,
             )
+            if category is None:
+                raise CategoryDuplicateError
+            _ = await self._db_manager.bump_refdata_version(user_id)
+
+        self._refdata.invalidate(user_id)
+        return category
 
     async def edit_category(
         self,
@@ -73,24 +160,32 @@ class Service:
         category_id: int,
         new_name: str,
     ) -> Category:
-        async with self._db_manager.transaction():
-            category = await self._db_manager.get_category(
-                category_id=category_id,
-                user_id=user_id,
-            )
-            if category is None:
-                raise NotExistingCategoryError
+        if await self._refdata.get_category(user_id, category_id) is None:
+            raise NotExistingCategoryError
 
-            return await self._db_manager.update_category(
+        async with self._db_manager.transaction():
+            category = await self._db_manager.update_category(
                 category_id,
                 new_name,
             )
+            _ = await self._db_manager.bump_refdata_version(user_id)
+
+        self._refdata.invalidate(user_id)
+        return category
 
     async def fetch_currency_rates(self, base_currency: Currency) -> Rates:
         return await self._rates_requester.fetch(base_currency)
 
-    async def update_currency_rates(self) -> None:
-        async with self._db_manager.transaction():
+    async def update_currency_rates(self) -> bool:
+        """Store the provider's latest rates, returns whether any were new.
+
+        The provider is called outside of any transaction, only the final
+        write holds a database connection. Polls that bring the provider
+        timestamp already applied write nothing, and only rates that moved
+        by more than the relative ``rates_epsilon`` are rewritten and
+        appended to the history.
+        """
+        async with self._db_manager.transaction("get_base_currency"):
             base_currency_info = CURRENCIES[self.BASE_CURRENCY]
             base_currency = await self._db_manager.get_or_create_currency(
                 self.BASE_CURRENCY,
@@ -98,18 +193,101 @@ class Service:
                 base_currency_info["symbol"],
             )
 
-            rates = await self.fetch_currency_rates(base_currency)
+        rates = await self.fetch_currency_rates(base_currency)
+        normalized = self.normalize_rates(rates)
 
-            for iso_code, rate in rates.data.items():
-                currency_info = CURRENCIES.get(iso_code)
+        updated_count = await self._write_rates(base_currency, normalized)
+        if updated_count is None:
+            logger.info(
+                f"Rates as of {normalized.provider_ts} are already applied, "
+                "skipping...",
+            )
+            return False
+
+        logger.info(
+            f"Applied rates as of {normalized.provider_ts}, "
+            f"{updated_count} of them changed",
+        )
+        if updated_count:
+            self._rates_cache.invalidate()
+        return True
+
+    @classmethod
+    def normalize_rates(cls, rates: Rates) -> NormalizedRates:
+        """Keep valid rates of supported currencies as parallel arrays."""
+        if rates.source_iso_code != cls.BASE_CURRENCY:
+            msg = (
+                f"Got rates against {rates.source_iso_code}, "
+                f"expected {cls.BASE_CURRENCY}"
+            )
+            raise InvalidRatesError(msg)
+
+        iso_codes: list[str] = []
+        rate_values: list[Decimal] = []
+        for iso_code, rate in rates.data.items():
+            if iso_code not in CURRENCIES:
+                logger.warning(
+                    "Got a rate for unsupported "
+                    f"{iso_code} currency, skipping it...",
+                )
+                continue
 
-                if not currency_info:
-                    logger.warning(
-                        "Got a rate for unsupported "
-                        f"{iso_code} currency, skipping it...",
-                    )
+            if (
+                not isinstance(rate, Decimal)
+                or not rate.is_finite()
+                or rate <= 0
+            ):
+                logger.warning(
+                    f"Got invalid rate {rate} for {iso_code}, skipping it...",
+                )
+                continue
+
+            iso_codes.append(iso_code)
+            rate_values.append(rate)
+
+        return NormalizedRates.model_construct(
+            provider_ts=datetime.fromtimestamp(rates.timestamp, tz=UTC),
+            iso_codes=iso_codes,
+            rates=rate_values,
+        )
+
+    async def _write_rates(
+        self,
+        base_currency: Currency,
+        normalized: NormalizedRates,
+    ) -> int | None:
+        """Write changed rates, returns their number or None if stale."""
+        async with self._db_manager.transaction("write_rates"):
+            synced_at = await self._db_manager.get_rates_synced_at(
+                base_currency.currency_id,
+            )
+            if synced_at is not None and normalized.provider_ts <= synced_at:
+                return None
+
+            stored_rates = {
+                row.iso_code: row
+                for row in await self._db_manager.get_rates_from(
+                    self.BASE_CURRENCY,
+                )
+            }
+            changed_currency_ids: list[int] = []
+            changed_rates: list[Decimal] = []
+            new_currency_ids: list[int] = []
+            new_rates: list[Decimal] = []
+
+            for iso_code, rate_value in zip(
+                normalized.iso_codes,
+                normalized.rates,
+                strict=True,
+            ):
+                stored_rate = stored_rates.get(iso_code)
+                if stored_rate is not None:
+                    if self._rate_changed(stored_rate.rate, rate_value):
+                        changed_currency_ids.append(stored_rate.to_currency)
+                        changed_rates.append(rate_value)
                     continue
 
+                currency_info = CURRENCIES[iso_code]
                 target_currency = (
                     await self._db_manager.get_or_create_currency(
                         iso_code,
@@ -117,13 +295,261 @@ class Service:
                         currency_info["symbol"],
                     )
                 )
+                new_currency_ids.append(target_currency.currency_id)
+                new_rates.append(rate_value)
 
-                _ = await self._db_manager.update_currency_rate(
+            if changed_currency_ids:
+                await self._db_manager.update_currency_rates(
+                    base_currency.currency_id,
+                    changed_currency_ids,
+                    changed_rates,
+                )
+            if new_currency_ids:
+                await self._db_manager.create_currency_rates(
                     base_currency.currency_id,
-                    target_currency.currency_id,
-                    Decimal(str(rate)),
+                    new_currency_ids,
+                    new_rates,
                 )
 
+            history_currency_ids = changed_currency_ids + new_currency_ids
+            if history_currency_ids:
+                await self._db_manager.append_rate_history(
+                    history_currency_ids,
+                    normalized.provider_ts,
+                    changed_rates + new_rates,
+                )
+            await self._db_manager.set_rates_synced_at(
+                base_currency.currency_id,
+                normalized.provider_ts,
+            )
+
+        return len(history_currency_ids)
+
+    def _rate_changed(self, stored: Decimal, fetched: Decimal) -> bool:
+        return abs(fetched - stored) > self._rates_epsilon * abs(stored)
+
+    async def convert(
+        self,
+        amount: Decimal,
+        from_iso_code: str,
+        to_iso_code: str,
+    ) -> Decimal:
+        """Convert ``amount`` with the latest rates, as exact decimals.
+
+        Rates mapped from the worker's rates file are float64 and keep
+        only about 15 significant digits of the provider's rates.
+        """
+        if from_iso_code == to_iso_code:
+            return amount
+
+        snapshot = await self._rates_cache.get()
+        from_rate = self._get_base_rate(snapshot, from_iso_code)
+        to_rate = self._get_base_rate(snapshot, to_iso_code)
+        return amount * to_rate / from_rate
+
+    async def get_rate_as_of(
+        self,
+        iso_code: str,
+        at: datetime,
+    ) -> Decimal | None:
+        """Rate from the base currency to ``iso_code`` in effect at ``at``."""
+        if iso_code == self.BASE_CURRENCY:
+            return Decimal(1)
+
+        async with self._db_manager.transaction():
+            history = await self._db_manager.get_rate_as_of(iso_code, at)
+        return history.rate if history else None
+
+    async def get_rates_as_of(
+        self,
+        iso_code: str,
+        timestamps: Sequence[datetime],
+    ) -> list[Decimal | None]:
+        """Batch version of ``get_rate_as_of``, one rate per timestamp."""
+        if iso_code == self.BASE_CURRENCY:
+            return [Decimal(1)] * len(timestamps)
+
+        async with self._db_manager.transaction():
+            rows = await self._db_manager.get_rates_as_of(
+                iso_code,
+                timestamps,
+            )
+        return [row.rate for row in rows]
+
+    async def get_category_month_totals(
+        self,
+        user_id: int,
+        to_iso_code: str | None = None,
+    ) -> list[CategoryMonthTotal]:
+        """Withdrawals per category and month at historical rates.
+
+        Every transaction is converted with the rate in effect on its date
+        into ``to_iso_code``, or into the user's currency by default.
+        """
+        async with self._db_manager.transaction():
+            user = await self._db_manager.get_user(user_id)
+            to_currency_id = user.currency_id
+            if to_iso_code is not None:
+                to_currency = await self._db_manager.get_currency(to_iso_code)
+                if to_currency is None:
+                    msg = f"{to_iso_code} currency is not supported"
+                    raise NotSupportedCurrencyError(msg)
+                to_currency_id = to_currency.currency_id
+
+            ledger = LedgerArrays.from_row(
+                await self._db_manager.get_user_ledger_arrays(user_id),
+            )
+            if ledger.dates.size == 0:
+                return []
+
+            base_currency = await self._db_manager.get_currency(
+                self.BASE_CURRENCY,
+            )
+            if base_currency is None:
+                msg = "Currency rates were never loaded"
+                raise NotSupportedCurrencyError(msg)
+
+            currency_ids = {
+                to_currency_id,
+                *np.unique(ledger.currency_ids).tolist(),
+            }
+            history = RateHistoryArrays.from_row(
+                await self._db_manager.get_rate_history_arrays(
+                    sorted(currency_ids),
+                ),
+            )
+
+        converted = convert_ledger(
+            ledger,
+            history,
+            base_currency.currency_id,
+            to_currency_id,
+        )
+        return totals_by_category_month(ledger, converted)
+
+    async def get_spending_chart(
+        self,
+        user_id: int,
+        period: Period,
+    ) -> bytes | None:
+        """PNG of spending per category and month, None without spending.
+
+        Charts are cached for the user's current ledger, categories and
+        rates versions, so asking again costs two primary key lookups.
+        Drawing happens in the renderer's process pool.
+        """
+        async with self._db_manager.transaction("get_data_version"):
+            ledger_version = await self._db_manager.get_ledger_version(
+                user_id,
+            )
+            refdata_version = await self._db_manager.get_refdata_version(
+                user_id,
+            )
+        # Categories written by other processes, e.g. by the bot when this
+        # is a worker, are not in the cached copy yet
+        if refdata_version is not None:
+            self._refdata.validate(user_id, refdata_version)
+        snapshot = await self._rates_cache.get()
+        # Totals are converted at historical rates, new rates move them
+        version = (ledger_version, refdata_version, snapshot.version)
+        image = self._charts.get(user_id, period, version)
+        if image is not None:
+            return image
+
+        async with self._db_manager.transaction("get_user"):
+            user = await self._db_manager.get_user(user_id)
+        totals = await self.get_category_month_totals(user_id)
+        refdata = await self._refdata.get(user_id)
+        chart = build_spending_chart(
+            totals,
+            refdata.categories,
+            period,
+            self._iso_codes_by_id(snapshot).get(user.currency_id, ""),
+        )
+        if chart is None:
+            return None
+
+        image = await self._chart_renderer.render(chart)
+        self._charts.put(user_id, period, version, image)
+        return image
+
+    async def get_data_version(
+        self,
+        user_id: int,
+        *,
+        with_rates: bool = False,
+    ) -> tuple[Hashable, ...]:
+        """Version of everything the user's reports and exports show.
+
+        It changes with every write to the user's transactions, accounts
+        or categories and, ``with_rates``, with every rates update.
+        """
+        async with self._db_manager.transaction("get_data_version"):
+            ledger_version = await self._db_manager.get_ledger_version(
+                user_id,
+            )
+            refdata_version = await self._db_manager.get_refdata_version(
+                user_id,
+            )
+        if not with_rates:
+            return (ledger_version, refdata_version)
+        snapshot = await self._rates_cache.get()
+        return (ledger_version, refdata_version, snapshot.version)
+
+    async def get_rates_snapshot(self) -> RatesSnapshot:
+        return await self._rates_cache.get()
+
+    async def get_cross_rates(self) -> CrossRates:
+        return await self._rates_cache.get_cross_rates()
+
+    async def convert_user_transactions(
+        self,
+        user_id: int,
+        to_iso_code: str,
+        places: int = 2,
+    ) -> list[Decimal]:
+        """Withdrawal amounts of all user transactions in ``to_iso_code``.
+
+        The result is in the same order as
+        ``DBManager.get_user_transactions``.
+        """
+        cross_rates = await self.get_cross_rates()
+        to_currency_id = cross_rates.currency_id(to_iso_code)
+
+        async with self._db_manager.transaction():
+            accounts = await self._db_manager.get_accounts(user_id)
+            transactions = await self._db_manager.get_user_transactions(
+                user_id,
+            )
+
+        account_currencies = {
+            account.account_id: account.currency_id for account in accounts
+        }
+        from_currency_ids = np.fromiter(
+            (account_currencies[t.account_id] for t in transactions),
+            dtype=np.intp,
+            count=len(transactions),
+        )
+        amounts = from_decimals([t.withdrawal_amount for t in transactions])
+
+        converted = cross_rates.convert(
+            amounts,
+            from_currency_ids,
+            to_currency_id,
+        )
+        return to_decimals(converted, places)
+
+    @staticmethod
+    def _get_base_rate(snapshot: RatesSnapshot, iso_code: str) -> Decimal:
+        if iso_code == snapshot.base_iso_code:
+            return Decimal(1)
+
+        rate = snapshot.rates.get(iso_code)
+        if rate is None:
+            msg = f"There is no rate for {iso_code} currency"
+            raise NotSupportedCurrencyError(msg)
+        return rate
+
     async def create_transaction(
         self,
         user_id: int,
@@ -135,23 +561,9 @@ class Service:
         state: str = TransactionState.VISIBLE,
         date: datetime | None = None,
     ) -> Transaction:
-        async with self._db_manager.transaction():
-            account = await self._db_manager.get_account(
-                user_id=user_id,
-                account_id=account_id,
-            )
-            if account is None:
-                msg = f"Account with ID {account_id} not found"
-                raise AccountNotFoundError(msg)
-
-            category = await self._db_manager.get_category(
-                user_id=user_id,
-                category_id=category_id,
-            )
-            if category is None:
-                msg = f"Category with ID {category_id} not found"
-                raise NotExistingCategoryError(msg)
+        await self._check_ownership(user_id, account_id, category_id)
 
+        async with self._db_manager.transaction():
             transaction = await self._db_manager.create_transaction(
                 user_id,
                 account_id,
@@ -164,14 +576,287 @@ class Service:
             )
 
             # expense will be with - sign, top up with + sign
-            new_balance = account.balance + withdrawal_amount
-
-            _ = await self._db_manager.update_account_balance(
+            account = await self._adjust_balance(
                 account_id,
-                new_balance,
+                user_id,
+                withdrawal_amount,
+            )
+            _ = await self._db_manager.bump_ledger_version(user_id)
+
+        self._refdata.validate(user_id, account.refdata_version)
+        self._charts.invalidate(user_id)
+        return transaction
+
+    async def create_transaction_from_text(
+        self,
+        user_id: int,
+        text: str,
+    ) -> Transaction:
+        """Create a transaction from a message like "12.50$ coffee".
+
+        The account is the first one in the typed currency, else the
+        default one; the amount is converted into the account currency
+        when they differ. Expense categories withdraw, income categories
+        and amounts typed with a leading "+" top up.
+        """
+        refdata = await self._refdata.get(user_id)
+        expense = self._expense_parser.parse(refdata, text)
+        category = refdata.categories[expense.category_id]
+
+        iso_codes = self._iso_codes_by_id(await self._rates_cache.get())
+
+        picked = self._pick_account(
+            list(refdata.accounts.values()),
+            iso_codes,
+            expense.iso_codes,
+        )
+        if picked is None:
+            msg = f"User {user_id} has no accounts"
+            raise AccountNotFoundError(msg)
+        account, matched_iso_code = picked
+
+        account_iso_code = iso_codes.get(account.currency_id)
+        withdrawal_amount = expense.amount
+        # A symbol like "$" may stand for the account currency even when
+        # it is not the most likely one
+        if expense.iso_codes and matched_iso_code is None:
+            if account_iso_code is None:
+                msg = "Currency rates were never loaded"
+                raise NotSupportedCurrencyError(msg)
+            withdrawal_amount = (
+                await self.convert(
+                    expense.amount,
+                    expense.iso_codes[0],
+                    account_iso_code,
+                )
+            ).quantize(Decimal("0.01"))
+
+        sign = (
+            1 if expense.income or category.type == CategoryType.INCOME else -1
+        )
+        return await self.create_transaction(
+            user_id,
+            account.account_id,
+            category.category_id,
+            sign * withdrawal_amount,
+            sign * expense.amount,
+            expense.note,
+        )
+
+    async def import_statement(
+        self,
+        user_id: int,
+        rows: Iterable[StatementRow | None],
+        on_progress: Callable[[ImportProgress], Awaitable[None]] | None = None,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> ImportProgress:
+        """Write statement rows as transactions, ``chunk_size`` at a time.
+
+        Rows are consumed lazily, so memory stays bounded by the chunk
+        size however long the statement is. Each chunk is one transaction
+        with a single bulk insert and one balance adjustment per account.
+        Rows that could not be parsed (None) or mapped to an account and a
+        category are counted as skipped.
+        """
+        refdata = await self._refdata.get(user_id)
+        picked = self._pick_account(list(refdata.accounts.values()), {}, ())
+        if picked is None:
+            msg = f"User {user_id} has no accounts"
+            raise AccountNotFoundError(msg)
+        default_account, _ = picked
+        resolver = StatementResolver(
+            refdata,
+            self._expense_parser.matcher(refdata),
+            default_account.account_id,
+        )
+
+        progress = ImportProgress()
+        rows = iter(rows)
+        while chunk := list(islice(rows, chunk_size)):
+            batch = resolver.resolve(chunk)
+            progress.skipped += batch.skipped
+            if batch.account_ids:
+                async with self._db_manager.transaction("import_statement"):
+                    progress.imported += (
+                        await self._db_manager.create_transactions(
+                            user_id,
+                            batch.account_ids,
+                            batch.category_ids,
+                            batch.amounts,
+                            batch.amounts,
+                            batch.notes,
+                            batch.dates,
+                            TransactionState.VISIBLE,
+                        )
+                    )
+                    for account_id, delta in batch.balance_deltas.items():
+                        account = await self._adjust_balance(
+                            account_id,
+                            user_id,
+                            delta,
+                        )
+                    _ = await self._db_manager.bump_ledger_version(user_id)
+                self._refdata.validate(user_id, account.refdata_version)
+                self._charts.invalidate(user_id)
+
+            if on_progress is not None:
+                await on_progress(progress)
+        return progress
+
+    async def export_transactions(
+        self,
+        user_id: int,
+        file: IO[bytes],
+        export_format: ExportFormat,
+    ) -> int:
+        """Write all user transactions into ``file``, returns their number.
+
+        Rows are streamed from the database straight into the writer, so
+        memory does not grow with the length of the history.
+        """
+        async with self._db_manager.transaction("export_transactions"):
+            return await write_export(
+                self._db_manager.export_transactions(user_id),
+                file,
+                export_format,
             )
 
-            return transaction
+    async def send_export(
+        self,
+        user_id: int,
+        export_format: ExportFormat,
+        upload: Callable[[IO[bytes], int], Awaitable[object]],
+    ) -> int:
+        """Export user transactions and pass the file to ``upload``.
+
+        The file is spooled to disk once it outgrows ``EXPORT_SPOOL_SIZE``
+        and handed over with the number of transactions, nothing is
+        uploaded without any. Returns that number.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as file:
+            count = await self.export_transactions(
+                user_id,
+                file,
+                export_format,
+            )
+            if count == 0:
+                return 0
+            if file.tell() > EXPORT_MAX_SIZE:
+                msg = "The export is too large to be sent"
+                raise ExportTooLargeError(msg)
+
+            _ = file.seek(0)
+            _ = await upload(file, count)
+        return count
+
+    async def search_transactions(
+        self,
+        user_id: int,
+        query: str,
+        cursor: str | None = None,
+        page_size: int = SEARCH_PAGE_SIZE,
+    ) -> TransactionSearchPage:
+        """Transactions with notes similar to ``query``, best match first.
+
+        Pages are fetched by keyset from the trigram index on notes, so
+        later pages cost as much as the first one; ``cursor`` comes from
+        the previous page.
+        """
+        query = " ".join(query.split())
+        if len(query) < SEARCH_MIN_QUERY_LENGTH:
+            msg = f"Type at least {SEARCH_MIN_QUERY_LENGTH} characters"
+            raise TransactionSearchError(msg)
+        # Similarities are at most 1, any score sorts after the start
+        after = (2.0, 0) if cursor is None else self._parse_cursor(cursor)
+
+        async with self._db_manager.transaction("search_transactions"):
+            rows = await self._db_manager.search_transactions(
+                user_id,
+                query,
+                after,
+                # One more row tells whether there is a next page
+                page_size + 1,
+            )
+        if len(rows) <= page_size:
+            return TransactionSearchPage(transactions=rows, cursor=None)
+
+        last = rows[page_size - 1]
+        return TransactionSearchPage(
+            transactions=rows[:page_size],
+            cursor=f"{last.score!r}:{last.transaction_id}",
+        )
+
+    @staticmethod
+    def _parse_cursor(cursor: str) -> tuple[float, int]:
+        score, _, transaction_id = cursor.partition(":")
+        try:
+            return float(score), int(transaction_id)
+        except ValueError:
+            msg = "This search has expired, search again"
+            raise TransactionSearchError(msg) from None
+
+    @staticmethod
+    def _iso_codes_by_id(snapshot: RatesSnapshot) -> dict[int, str]:
+        iso_codes = {
+            currency_id: iso_code
+            for iso_code, currency_id in snapshot.currency_ids.items()
+        }
+        if snapshot.base_currency_id is not None:
+            iso_codes[snapshot.base_currency_id] = snapshot.base_iso_code
+        return iso_codes
+
+    @staticmethod
+    def _pick_account(
+        accounts: list[Account],
+        iso_codes: dict[int, str],
+        typed_iso_codes: Sequence[str],
+    ) -> tuple[Account, str | None] | None:
+        """Account for a typed currency and the iso code it matched.
+
+        Falls back to the default account, or the first one, with no
+        matched iso code.
+        """
+        for iso_code in typed_iso_codes:
+            for account in accounts:
+                if iso_codes.get(account.currency_id) == iso_code:
+                    return account, iso_code
+
+        for account in accounts:
+            if account.name == DEFAULT_ACCOUNT_NAME:
+                return account, None
+        return (accounts[0], None) if accounts else None
+
+    async def _check_ownership(
+        self,
+        user_id: int,
+        account_id: int,
+        category_id: int,
+    ) -> None:
+        # Categories and accounts never change owner, so cached copies are
+        # enough to tell whether they belong to the user
+        if await self._refdata.get_account(user_id, account_id) is None:
+            msg = f"Account with ID {account_id} not found"
+            raise AccountNotFoundError(msg)
+
+        if await self._refdata.get_category(user_id, category_id) is None:
+            msg = f"Category with ID {category_id} not found"
+            raise NotExistingCategoryError(msg)
+
+    async def _adjust_balance(
+        self,
+        account_id: int,
+        user_id: int,
+        delta: Decimal,
+    ) -> AdjustAccountBalanceRow:
+        account = await self._db_manager.adjust_account_balance(
+            account_id,
+            user_id,
+            delta,
+        )
+        if account is None:
+            msg = f"Account with ID {account_id} not found"
+            raise AccountNotFoundError(msg)
+        return account
 
     async def create_account(
         self,
@@ -192,12 +877,16 @@ class Service:
                 )
                 raise AccountDuplicateError(msg)
 
-            return await self._db_manager.create_account(
+            account = await self._db_manager.create_account(
                 user_id=user_id,
                 name=name,
                 balance=Decimal(initial_balance),
                 currency_id=currency_id,
             )
+            _ = await self._db_manager.bump_refdata_version(user_id)
+
+        self._refdata.invalidate(user_id)
+        return account
 
     async def edit_transaction(
         self,
@@ -210,6 +899,9 @@ class Service:
         note: str | None,
         date: datetime,
     ) -> Transaction:
+        await self._check_ownership(user_id, account_id, category_id)
+
+        account = None
         async with self._db_manager.transaction():
             original_transaction = (
                 await self._db_manager.get_transaction_by_id(
@@ -222,67 +914,35 @@ class Service:
                 msg = f"Transaction with ID {transaction_id} not found"
                 raise TransactionNotFoundError(msg)
 
-            account = await self._db_manager.get_account(
-                user_id,
-                account_id=account_id,
-            )
-            if account is None:
-                msg = f"Account with ID {account_id} not found"
-                raise AccountNotFoundError(msg)
-
-            category = await self._db_manager.get_category(
-                user_id=user_id,
-                category_id=category_id,
-            )
-            if category is None:
-                msg = f"Category with ID {category_id} not found"
-                raise NotExistingCategoryError(msg)
-
             # If account was changed, update both account balances
             if account_id != original_transaction.account_id:
                 # Restore balance of the original account
-                original_account = await self._db_manager.get_account(
+                _ = await self._db_manager.adjust_account_balance(
+                    original_transaction.account_id,
                     user_id,
-                    account_id=original_transaction.account_id,
+                    -original_transaction.withdrawal_amount,
                 )
-
-                if original_account:
-                    new_original_balance = (
-                        original_account.balance
-                        - original_transaction.withdrawal_amount
-                    )
-                    await self._db_manager.update_account_balance(
-                        original_account.account_id,
-                        new_original_balance,
-                    )
-
                 # Update the new account balance with the withdrawal amount
-                new_account_balance = account.balance + Decimal(
-                    withdrawal_amount
-                )
-                await self._db_manager.update_account_balance(
+                account = await self._adjust_balance(
                     account_id,
-                    new_account_balance,
+                    user_id,
+                    Decimal(withdrawal_amount),
                 )
             # If only the withdrawal amount changed but account is the same
             elif (
                 Decimal(withdrawal_amount)
                 != original_transaction.withdrawal_amount
             ):
-                # Calculate the difference in the withdrawal amount
-                withdrawal_diff = (
-                    Decimal(withdrawal_amount)
-                    - original_transaction.withdrawal_amount
-                )
                 # Update the account balance with the difference
-                new_balance = account.balance + withdrawal_diff
-                await self._db_manager.update_account_balance(
+                account = await self._adjust_balance(
                     account_id,
-                    new_balance,
+                    user_id,
+                    Decimal(withdrawal_amount)
+                    - original_transaction.withdrawal_amount,
                 )
 
             # Update the transaction with new values
-            return await self._db_manager.update_transaction(
+            transaction = await self._db_manager.update_transaction(
                 transaction_id=transaction_id,
                 user_id=user_id,
                 account_id=account_id,
@@ -292,9 +952,13 @@ class Service:
                 note=note,
                 date=date,
             )
+            _ = await self._db_manager.bump_ledger_version(user_id)
 
+        if account is not None:
+            self._refdata.validate(user_id, account.refdata_version)
+        self._charts.invalidate(user_id)
+        return transaction
 
     async def get_user_categories(self, user_id: int) -> list[Category]:
-        async with self._db_manager.transaction():
-            return await self._db_manager.get_user_categories(user_id)
-
+        refdata = await self._refdata.get(user_id)
+        return list(refdata.categories.values())
@@ -0,0 +1,88 @@
+import asyncio
+from collections.abc import Awaitable
+from typing import Any, override
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Updates admitted per running slot, the rest wait in the application
+PENDING_UPDATES_PER_SLOT = 8
+
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Runs updates of different users concurrently, one user at a time.
+
+    At most ``max_running_updates`` handlers run at once. Updates from the
+    same user (or chat, for updates without one) are handled strictly in
+    the order they arrived, so e.g. two edits of one transaction are
+    never applied out of order. An update waiting for an earlier one from
+    its user does not take a running slot, so a single chatty user cannot
+    stall everyone else; such updates count against
+    ``max_concurrent_updates`` instead, which bounds how many updates are
+    admitted at all.
+    """
+
+    def __init__(
+        self,
+        max_running_updates: int,
+        max_concurrent_updates: int | None = None,
+    ) -> None:
+        if max_running_updates < 1:
+            msg = "max_running_updates must be a positive integer"
+            raise ValueError(msg)
+        if max_concurrent_updates is None:
+            max_concurrent_updates = (
+                max_running_updates * PENDING_UPDATES_PER_SLOT
+            )
+        super().__init__(max_concurrent_updates)
+        self._max_running_updates = max_running_updates
+        self._running = asyncio.Semaphore(max_running_updates)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiting: dict[int, int] = {}
+
+    @property
+    def max_running_updates(self) -> int:
+        return self._max_running_updates
+
+    @override
+    async def do_process_update(
+        self,
+        update: object,
+        coroutine: Awaitable[Any],
+    ) -> None:
+        key = self._ordering_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        # asyncio.Lock wakes waiters in FIFO order and updates reach this
+        # point in the order the application received them
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock, self._running:
+                await coroutine
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+    @override
+    async def initialize(self) -> None:
+        pass
+
+    @override
+    async def shutdown(self) -> None:
+        pass
+
+    @staticmethod
+    def _ordering_key(update: object) -> int | None:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
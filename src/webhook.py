@@ -0,0 +1,161 @@
+import asyncio
+import hmac
+import signal
+from collections.abc import Sequence
+from urllib.parse import urlsplit
+
+from aiohttp import web
+from loguru import logger
+from telegram import Update
+from telegram.ext import Application
+
+from env import (
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_QUEUE_SIZE,
+    WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_URL,
+)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"  # noqa: S105
+
+
+class WebhookServer:
+    """Receives updates POSTed by Telegram and hands them to ``app``.
+
+    Requests without the secret token are refused with 403. Accepted
+    updates go through the application's update processor exactly as
+    polled ones do, so handlers work the same in both modes. At most
+    ``queue_size`` updates may be waiting or in progress; beyond that the
+    server answers 503 and Telegram delivers the update again later.
+    """
+
+    def __init__(
+        self,
+        app: Application,
+        *,
+        url: str = WEBHOOK_URL,
+        secret_token: str = WEBHOOK_SECRET_TOKEN,
+        listen: str = WEBHOOK_LISTEN,
+        port: int = WEBHOOK_PORT,
+        queue_size: int = WEBHOOK_QUEUE_SIZE,
+    ) -> None:
+        if not secret_token:
+            msg = "Webhook mode needs a secret token"
+            raise ValueError(msg)
+
+        self._app = app
+        self._url = url
+        self._secret_token = secret_token.encode()
+        self._listen = listen
+        self._port = port
+        self._queue_size = queue_size
+        self._pending = 0
+        self._runner: web.AppRunner | None = None
+
+        self._web_app = web.Application()
+        _ = self._web_app.router.add_post(
+            urlsplit(url).path or "/",
+            self._handle,
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def address(self) -> tuple[str, int]:
+        assert self._runner is not None
+        host, port = self._runner.addresses[0][:2]
+        return host, port
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self._web_app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._listen, self._port).start()
+        host, port = self.address
+        logger.info(f"Listening for webhook updates on {host}:{port}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def serve(
+        self,
+        stop_signals: Sequence[int] = (
+            signal.SIGINT,
+            signal.SIGTERM,
+            signal.SIGABRT,
+        ),
+    ) -> None:
+        """Run the application in webhook mode until a stop signal.
+
+        Mirrors ``Application.run_polling``: lifecycle hooks are called
+        the same way and updates accepted before shutdown are finished
+        by ``Application.stop``. Telegram does not resend updates it got
+        200 for, so ``stop_signals`` stop the server instead of killing
+        the process.
+        """
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for stop_signal in stop_signals:
+            loop.add_signal_handler(stop_signal, stopping.set)
+        try:
+            await self._serve(stopping)
+        finally:
+            for stop_signal in stop_signals:
+                _ = loop.remove_signal_handler(stop_signal)
+
+    async def _serve(self, stopping: asyncio.Event) -> None:
+        async with self._app:
+            if self._app.post_init is not None:
+                await self._app.post_init(self._app)
+            await self._app.start()
+            await self.start()
+            _ = await self._app.bot.set_webhook(
+                self._url,
+                secret_token=self._secret_token.decode(),
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=min(self._queue_size, 100),
+            )
+            try:
+                _ = await stopping.wait()
+                logger.info("Stopping the webhook server...")
+            finally:
+                await self.stop()
+                await self._app.stop()
+                if self._app.post_stop is not None:
+                    await self._app.post_stop(self._app)
+        if self._app.post_shutdown is not None:
+            await self._app.post_shutdown(self._app)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_TOKEN_HEADER, "").encode()
+        if not hmac.compare_digest(token, self._secret_token):
+            return web.Response(status=403)
+
+        try:
+            update = Update.de_json(await request.json(), self._app.bot)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            update = None
+        if update is None:
+            logger.warning("Received a malformed webhook update")
+            return web.Response(status=400)
+
+        if self._pending >= self._queue_size:
+            logger.warning("Webhook queue is full, rejecting update")
+            return web.Response(status=503)
+
+        self._pending += 1
+        _ = self._app.create_task(self._process(update), update=update)
+        return web.Response()
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self._app.update_processor.process_update(
+                update,
+                self._app.process_update(update),
+            )
+        finally:
+            self._pending -= 1
@@ -2,10 +2,19 @@ from taskiq import TaskiqScheduler
 from taskiq.schedule_sources import LabelScheduleSource
 from taskiq_redis import RedisAsyncResultBackend, RedisStreamBroker
 
-from env import REDIS_URL
+from env import REDIS_URL, TASK_RESULT_TTL
+from worker.middleware import TaskMetricsMiddleware
 
-broker = RedisStreamBroker(url=REDIS_URL).with_result_backend(
-    RedisAsyncResultBackend(redis_url=REDIS_URL),
+broker = (
+    RedisStreamBroker(url=REDIS_URL)
+    .with_result_backend(
+        # Results are cached by content-addressed task ids, see offload.py
+        RedisAsyncResultBackend(
+            redis_url=REDIS_URL,
+            result_ex_time=TASK_RESULT_TTL,
+        ),
+    )
+    .with_middlewares(TaskMetricsMiddleware())
 )
 
 scheduler = TaskiqScheduler(
@@ -0,0 +1,55 @@
+import time
+from typing import Any, override
+
+from taskiq import TaskiqMessage, TaskiqMiddleware, TaskiqResult
+
+from metrics import (
+    TASK_DURATION_SECONDS,
+    TASK_QUEUE_LAG_SECONDS,
+    TASK_RUNS,
+    serve_metrics,
+)
+
+# Label with the wall clock time a task was sent at
+SENT_AT = "sent_at"
+
+
+class TaskMetricsMiddleware(TaskiqMiddleware):
+    """Records queue lag, duration and outcome of every task.
+
+    Senders, the bot and the scheduler included, stamp messages with the
+    time they were sent; the lag measured from it when a worker starts a
+    task covers both the Redis stream and waiting for a free worker, and
+    is as accurate as the hosts' clocks agree.
+    """
+
+    @override
+    def startup(self) -> None:
+        if self.broker.is_worker_process:
+            serve_metrics()
+
+    @override
+    def pre_send(self, message: TaskiqMessage) -> TaskiqMessage:
+        message.labels[SENT_AT] = time.time()
+        return message
+
+    @override
+    def pre_execute(self, message: TaskiqMessage) -> TaskiqMessage:
+        sent_at = message.labels.get(SENT_AT)
+        if sent_at is not None:
+            TASK_QUEUE_LAG_SECONDS.labels(message.task_name).observe(
+                max(time.time() - float(sent_at), 0.0),
+            )
+        return message
+
+    @override
+    def post_execute(
+        self,
+        message: TaskiqMessage,
+        result: TaskiqResult[Any],
+    ) -> None:
+        outcome = "failure" if result.is_err else "success"
+        TASK_RUNS.labels(message.task_name, outcome).inc()
+        TASK_DURATION_SECONDS.labels(message.task_name).observe(
+            result.execution_time,
+        )
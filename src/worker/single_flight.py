@@ -0,0 +1,108 @@
+import asyncio
+import functools
+from collections.abc import Awaitable, Callable
+from typing import ParamSpec, TypeVar
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import LockError, RedisError
+
+from env import REDIS_URL, SINGLE_FLIGHT_TTL
+from metrics import SINGLE_FLIGHT_RUNS
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class LeaseLostError(RuntimeError):
+    """Raised when a run lost its lease and was stopped."""
+
+
+class SingleFlight:
+    """Lets at most one run of a job be active across all processes.
+
+    A run holds a Redis lease that expires after ``ttl`` seconds and is
+    renewed every third of it while the run lasts. Runs started while the
+    lease is held are skipped. A process that dies or stalls for longer
+    than ``ttl`` loses the lease to the next run; if it comes back it is
+    stopped at the next renewal instead of running alongside.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        name: str,
+        ttl: float = SINGLE_FLIGHT_TTL,
+    ) -> None:
+        self._name = name
+        self._ttl = ttl
+        self._lock = redis.lock(
+            f"single-flight:{name}",
+            timeout=ttl,
+            # Renewed from another task than the one that acquired it
+            thread_local=False,
+        )
+
+    async def run(self, job: Callable[[], Awaitable[T]]) -> T | None:
+        """Run ``job`` unless another run holds the lease, None then."""
+        if not await self._lock.acquire(blocking=False):
+            SINGLE_FLIGHT_RUNS.labels(self._name, "skipped").inc()
+            logger.info(f"Skipping {self._name}, another run is active")
+            return None
+
+        run = asyncio.ensure_future(job())
+        heartbeat = asyncio.create_task(self._renew(run))
+        try:
+            result = await run
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                SINGLE_FLIGHT_RUNS.labels(self._name, "lease_lost").inc()
+                msg = f"{self._name} lost its lease and was stopped"
+                raise LeaseLostError(msg) from None
+            raise
+        finally:
+            _ = heartbeat.cancel()
+            await self._release()
+        SINGLE_FLIGHT_RUNS.labels(self._name, "completed").inc()
+        return result
+
+    async def _renew(self, run: asyncio.Future[object]) -> None:
+        while True:
+            await asyncio.sleep(self._ttl / 3)
+            try:
+                _ = await self._lock.reacquire()
+            except (LockError, RedisError) as e:
+                logger.error(f"Could not renew the {self._name} lease: {e}")
+                _ = run.cancel()
+                return
+
+    async def _release(self) -> None:
+        try:
+            await self._lock.release()
+        except (LockError, RedisError) as e:
+            # Expired or taken over, nothing is left to release
+            logger.warning(f"Could not release the {self._name} lease: {e}")
+
+
+def single_flight(
+    name: str,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T | None]]]:
+    """Make a task skip runs while another one is active, see SingleFlight.
+
+    Meant for scheduled tasks, which overlap when a run stalls or when
+    several schedulers or workers are running.
+    """
+
+    def decorator(
+        func: Callable[P, Awaitable[T]],
+    ) -> Callable[P, Awaitable[T | None]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T | None:
+            async with Redis.from_url(REDIS_URL) as redis:
+                return await SingleFlight(redis, name).run(
+                    lambda: func(*args, **kwargs),
+                )
+
+        return wrapper
+
+    return decorator
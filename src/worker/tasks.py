@@ -1,11 +1,72 @@
+from datetime import date
+from functools import cache
+from pathlib import Path
+from typing import IO
+
 from loguru import logger
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import create_async_engine
+from taskiq import TaskiqEvents, TaskiqState
+from telegram.ext import ExtBot
 
+from charts import ChartRenderer, Period
 from db.manager import DBManager
-from env import DATABASE_URL
-from requesters import ExchangeRatesRequester
+from env import (
+    DATABASE_URL,
+    RATES_SNAPSHOT_PATH,
+    REDIS_URL,
+    TG_TOKEN,
+    WORKER_SEND_GLOBAL_RATE,
+)
+from export import ExportFormat
+from rate_limiter import SendRateLimiter
+from rates_channel import RatesPublisher
+from rates_file import write_rates_file
+from requesters import make_rates_requester
 from service import Service
 from worker.broker import broker
+from worker.single_flight import single_flight
+
+# Shared by every run so that connections to the rates API are reused
+requester = make_rates_requester()
+chart_renderer = ChartRenderer()
+
+
+@cache
+def get_bot() -> ExtBot:
+    """Bot uploading exports, so that they never pass through Redis.
+
+    Its sends are paced apart from the bot's, at a global rate of
+    ``WORKER_SEND_GLOBAL_RATE``.
+    """
+    return ExtBot(
+        TG_TOKEN,
+        rate_limiter=SendRateLimiter(global_rate=WORKER_SEND_GLOBAL_RATE),
+    )
+
+
+@broker.on_event(TaskiqEvents.WORKER_STARTUP)
+async def start_bot(_: TaskiqState) -> None:
+    if TG_TOKEN:
+        await get_bot().initialize()
+
+
+@broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def close_requester(_: TaskiqState) -> None:
+    await requester.aclose()
+    await chart_renderer.close()
+    if TG_TOKEN:
+        await get_bot().shutdown()
+
+
+@cache
+def get_service() -> Service:
+    """Service for the tasks the bot offloads, one engine per worker."""
+    return Service(
+        DBManager(create_async_engine(DATABASE_URL)),
+        requester,
+        chart_renderer=chart_renderer,
+    )
 
 
 @broker.task(
@@ -13,13 +74,62 @@ from worker.broker import broker
         {"cron": "*/5 * * * *"},
     ],
 )
+@single_flight("update_currency_rates")
 async def update_currency_rates() -> None:
     engine = create_async_engine(DATABASE_URL)
     db_manager = DBManager(engine)
-    requester = ExchangeRatesRequester()
 
     interactor = Service(db_manager, requester)
 
-    _ = await interactor.update_currency_rates()
+    updated = await interactor.update_currency_rates()
+    rates_file = Path(RATES_SNAPSHOT_PATH) if RATES_SNAPSHOT_PATH else None
+    # A fresh host has no rates file yet even when the rates are up to date
+    if not updated and (rates_file is None or rates_file.exists()):
+        return
 
     logger.info("Finished update of currencies rates...")
+
+    snapshot = await interactor.get_rates_snapshot()
+    if rates_file is not None:
+        write_rates_file(rates_file, snapshot)
+    async with Redis.from_url(REDIS_URL) as redis:
+        await RatesPublisher(redis).publish(snapshot)
+
+
+# Kicked by name from the bot through offload.TaskOffloader
+@broker.task(task_name="spending_chart")
+async def spending_chart(
+    user_id: int,
+    first_month: str,
+    last_month: str,
+) -> bytes | None:
+    period = Period(
+        date.fromisoformat(first_month),
+        date.fromisoformat(last_month),
+    )
+    return await get_service().get_spending_chart(user_id, period)
+
+
+@broker.task(task_name="export_transactions")
+async def export_transactions(
+    user_id: int,
+    chat_id: int,
+    message_id: int,
+    export_format: str,
+) -> int:
+    """Send the export as a reply to ``message_id``, return its size."""
+
+    async def upload(file: IO[bytes], count: int) -> None:
+        _ = await get_bot().send_document(
+            chat_id,
+            file,
+            filename=f"transactions.{export_format}",
+            caption=f"{count} transactions",
+            reply_to_message_id=message_id,
+        )
+
+    return await get_service().send_export(
+        user_id,
+        ExportFormat(export_format),
+        upload,
+    )
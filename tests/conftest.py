@@ -1,6 +1,11 @@
+import asyncio
+import json
 import os
 import subprocess
 import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
 from pathlib import Path
 from typing import Callable
 from unittest.mock import create_autospec
@@ -12,7 +17,8 @@ from docker.models.containers import Container
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from telegram import Bot as TGBot
-from telegram.ext import ContextTypes
+from telegram import User
+from telegram.ext import ContextTypes, ExtBot
 from typing_extensions import AsyncGenerator
 
 from db.manager import DBManager
@@ -25,6 +31,8 @@ from db.models import (
     UserAccount,
 )
 from db.queries import AsyncQuerier
+from dtos import RatesSnapshot
+from service import Service
 
 BASE_DIR = Path(__file__).parent.parent
 
@@ -33,6 +41,103 @@ class DBSetupError(Exception):
     pass
 
 
+def make_snapshot(version: datetime, gbp_rate: str) -> RatesSnapshot:
+    return RatesSnapshot(
+        base_iso_code=Service.BASE_CURRENCY,
+        base_currency_id=1,
+        version=version,
+        rates={"GBP": Decimal(gbp_rate), "JPY": Decimal("160.123456789")},
+        currency_ids={"GBP": 2, "JPY": 5},
+    )
+
+
+@dataclass
+class StubResponse:
+    status: int = 200
+    json: dict = field(default_factory=dict)
+    delay: float = 0
+    # Close the connection without answering
+    drop: bool = False
+
+
+class StubServer:
+    """Minimal keep-alive HTTP/1.1 server answering with scripted responses.
+
+    Responses are served in order, the last one is repeated once the script
+    runs out.
+    """
+
+    def __init__(self) -> None:
+        self.responses: list[StubResponse] = [StubResponse()]
+        self.requests: list[str] = []
+        self.connections = 0
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/latest"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle,
+            "127.0.0.1",
+            0,
+        )
+
+    async def stop(self) -> None:
+        assert self._server is not None
+        self._server.close()
+        for writer in self._writers:
+            writer.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                self.requests.append(head.split(b" ")[1].decode())
+                index = min(len(self.requests), len(self.responses)) - 1
+                response = self.responses[index]
+                await asyncio.sleep(response.delay)
+                if response.drop:
+                    break
+                body = json.dumps(response.json).encode()
+                writer.write(
+                    f"HTTP/1.1 {response.status} Stub\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body,
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+class OfflineBot(ExtBot):
+    """Bot that initializes without asking Telegram who it is."""
+
+    async def get_me(self, *_: object, **__: object) -> User:
+        self._bot_user = User(
+            id=1,
+            first_name="Bot",
+            is_bot=True,
+            username="offline_bot",
+        )
+        return self._bot_user
+
+
 def run_db_container() -> Container:
     db_port = int(os.getenv("DATABASE_PORT", ""))
     db_password = os.getenv("DATABASE_PASSWORD", "")
@@ -131,6 +236,26 @@ def httpx_client() -> Callable:
     return inner
 
 
+@pytest.fixture
+async def make_stub_server() -> AsyncGenerator:
+    servers: list[StubServer] = []
+
+    async def inner() -> StubServer:
+        server = StubServer()
+        await server.start()
+        servers.append(server)
+        return server
+
+    yield inner
+    for server in servers:
+        await server.stop()
+
+
+@pytest.fixture
+async def stub_server(make_stub_server: Callable) -> StubServer:
+    return await make_stub_server()
+
+
 @pytest.fixture
 def context_mock():
     context_mock = create_autospec(ContextTypes.DEFAULT_TYPE)
@@ -1,5 +1,5 @@
 from typing import Callable
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 from assertpy import assert_that
@@ -96,3 +96,29 @@ async def test_edit_category__change_name(
         original_category.category_id,
     )
     assert_that(category.name).is_equal_to(expected_name)
+
+
+@pytest.mark.asyncio
+async def test_created_category_is_listed_from_cache(
+    db_manager: DBManager,
+    user: UserAccount,
+):
+    # Arrange
+    sut = Service(db_manager, MagicMock())
+    before = await sut.get_user_categories(user.user_id)
+
+    # Act
+    category = await sut.create_category(
+        user.user_id,
+        "Food",
+        CategoryType.EXPENSE,
+    )
+    after = await sut.get_user_categories(user.user_id)
+    with patch.object(db_manager, "transaction") as transaction_mock:
+        cached = await sut.get_user_categories(user.user_id)
+
+    # Assert
+    assert_that(before).is_empty()
+    assert_that(after).is_equal_to([category])
+    assert_that(cached).is_equal_to([category])
+    transaction_mock.assert_not_called()
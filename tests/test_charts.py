@@ -0,0 +1,145 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from assertpy import assert_that
+
+from charts import (
+    MAX_SERIES,
+    ChartCache,
+    ChartRenderer,
+    Period,
+    SpendingChart,
+    build_spending_chart,
+)
+from db.models import Category
+from dtos import CategoryMonthTotal
+from exceptions import ChartQueueFullError
+from misc import CategoryType
+
+USER_ID = 1
+PERIOD = Period(date(2024, 12, 1), date(2025, 2, 1))
+CATEGORIES = {
+    i: Category(
+        category_id=i,
+        user_id=USER_ID,
+        name=f"Expense {i}",
+        type=CategoryType.EXPENSE,
+    )
+    for i in range(1, MAX_SERIES + 3)
+}
+SALARY = Category(
+    category_id=100,
+    user_id=USER_ID,
+    name="Salary",
+    type=CategoryType.INCOME,
+)
+CHART = SpendingChart(
+    title="Spending per month, EUR",
+    months=("Jan 2025", "Feb 2025"),
+    series=(("Food", (10.0, 20.0)), ("Rent", (500.0, 500.0))),
+)
+
+
+def total(category_id: int, month: date, amount: str) -> CategoryMonthTotal:
+    return CategoryMonthTotal(
+        category_id=category_id,
+        month=month,
+        total=Decimal(amount),
+    )
+
+
+def test_period_last_months():
+    # Act
+    period = Period.last_months(3, date(2025, 2, 17))
+
+    # Assert
+    assert_that(period).is_equal_to(PERIOD)
+    assert_that(period.months()).is_equal_to(
+        [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)],
+    )
+
+
+def test_build_spending_chart():
+    # Arrange
+    totals = [
+        total(1, date(2024, 11, 1), "-999"),
+        total(1, date(2025, 1, 1), "-10.50"),
+        total(2, date(2024, 12, 1), "-300"),
+        total(SALARY.category_id, date(2025, 1, 1), "2000"),
+        *(total(i, date(2025, 2, 1), "-1") for i in range(3, MAX_SERIES + 3)),
+    ]
+
+    # Act
+    chart = build_spending_chart(
+        totals,
+        {**CATEGORIES, SALARY.category_id: SALARY},
+        PERIOD,
+        "EUR",
+    )
+
+    # Assert
+    assert chart is not None
+    assert_that(chart.months).is_equal_to(("Dec 2024", "Jan 2025", "Feb 2025"))
+    assert_that(chart.series[:2]).is_equal_to(
+        (("Expense 2", (300.0, 0.0, 0.0)), ("Expense 1", (0.0, 10.5, 0.0))),
+    )
+    assert_that(chart.series).is_length(MAX_SERIES + 1)
+    assert_that(chart.series[-1]).is_equal_to(("Other", (0.0, 0.0, 2.0)))
+
+
+def test_build_spending_chart_without_spending():
+    # Arrange
+    totals = [total(SALARY.category_id, date(2025, 1, 1), "2000")]
+
+    # Act
+    chart = build_spending_chart(
+        totals,
+        {SALARY.category_id: SALARY},
+        PERIOD,
+        "EUR",
+    )
+
+    # Assert
+    assert_that(chart).is_none()
+
+
+def test_chart_cache_versions():
+    # Arrange
+    sut = ChartCache()
+    other_period = Period(date(2025, 1, 1), date(2025, 2, 1))
+    sut.put(USER_ID, PERIOD, (1, None), b"old")
+    sut.put(USER_ID, other_period, (1, None), b"other")
+
+    # Act
+    sut.put(USER_ID, PERIOD, (2, None), b"new")
+
+    # Assert
+    assert_that(sut.get(USER_ID, PERIOD, (1, None))).is_none()
+    assert_that(sut.get(USER_ID, PERIOD, (2, None))).is_equal_to(b"new")
+    assert_that(sut.get(USER_ID, other_period, (2, None))).is_none()
+
+    sut.invalidate(USER_ID)
+    assert_that(sut.get(USER_ID, PERIOD, (2, None))).is_none()
+
+
+@pytest.mark.asyncio
+async def test_renderer_draws_in_a_bounded_pool():
+    # Arrange
+    sut = ChartRenderer(max_workers=1, queue_size=1)
+
+    try:
+        # Act
+        first = asyncio.create_task(sut.render(CHART))
+        await asyncio.sleep(0)
+
+        # Assert
+        assert_that(sut.pending).is_equal_to(1)
+        with pytest.raises(ChartQueueFullError):
+            _ = await sut.render(CHART)
+        image = await first
+        assert_that(image[:8]).is_equal_to(b"\x89PNG\r\n\x1a\n")
+        assert_that(sut.pending).is_zero()
+    finally:
+        await sut.close()
@@ -0,0 +1,137 @@
+from decimal import Decimal
+from typing import Callable
+
+import httpx
+import pytest
+from assertpy import assert_that
+
+from db.manager import DBManager
+from exceptions import NotSupportedCurrencyError
+from rates_cache import RatesCache
+from requesters import ExchangeRatesRequester
+from service import Service
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+TIMESTAMP = 1619622625
+
+
+def rates_response(
+    rates: dict[str, float],
+    timestamp: int = TIMESTAMP,
+) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={
+            "success": True,
+            "timestamp": timestamp,
+            "base": Service.BASE_CURRENCY,
+            "date": "2023-10-25",
+            "rates": rates,
+        },
+    )
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(db_manager: DBManager, clock: FakeClock) -> RatesCache:
+    return RatesCache(db_manager, Service.BASE_CURRENCY, ttl=60, clock=clock)
+
+
+@pytest.fixture
+def make_sut(
+    db_manager: DBManager,
+    httpx_client: Callable,
+    cache: RatesCache,
+) -> Callable:
+    def inner(
+        rates: dict[str, float],
+        rates_cache: RatesCache | None = cache,
+        timestamp: int = TIMESTAMP,
+    ) -> Service:
+        requester = ExchangeRatesRequester(
+            httpx_client(rates_response(rates, timestamp)),
+        )
+        return Service(db_manager, requester, rates_cache=rates_cache)
+
+    return inner
+
+
+@pytest.mark.asyncio
+async def test_convert_between_non_base_currencies(make_sut: Callable):
+    # Arrange
+    sut = make_sut({"GBP": 0.8, "JPY": 160.0})
+    await sut.update_currency_rates()
+
+    # Act
+    result = await sut.convert(Decimal("10"), "GBP", "JPY")
+
+    # Assert
+    assert_that(result).is_equal_to(Decimal("2000"))
+
+
+@pytest.mark.asyncio
+async def test_convert_from_base_currency(make_sut: Callable):
+    # Arrange
+    sut = make_sut({"GBP": 0.8})
+    await sut.update_currency_rates()
+
+    # Act
+    result = await sut.convert(Decimal("10"), Service.BASE_CURRENCY, "GBP")
+
+    # Assert
+    assert_that(result).is_equal_to(Decimal("8.0"))
+
+
+@pytest.mark.asyncio
+async def test_convert_unknown_currency(make_sut: Callable):
+    # Arrange
+    sut = make_sut({"GBP": 0.8})
+    await sut.update_currency_rates()
+
+    # Act/Assert
+    with pytest.raises(NotSupportedCurrencyError):
+        await sut.convert(Decimal("10"), "GBP", "XYZ")
+
+
+@pytest.mark.asyncio
+async def test_convert_uses_cached_rates_until_ttl_expires(
+    make_sut: Callable,
+    clock: FakeClock,
+):
+    # Arrange
+    reader = make_sut({"GBP": 0.8})
+    await reader.update_currency_rates()
+    _ = await reader.convert(Decimal("1"), Service.BASE_CURRENCY, "GBP")
+
+    # Another process writes fresh rates behind the cache's back
+    writer = make_sut(
+        {"GBP": 0.5},
+        rates_cache=None,
+        timestamp=TIMESTAMP + 3600,
+    )
+    await writer.update_currency_rates()
+
+    # Act
+    cached = await reader.convert(Decimal("1"), Service.BASE_CURRENCY, "GBP")
+    clock.now += 61
+    refreshed = await reader.convert(
+        Decimal("1"),
+        Service.BASE_CURRENCY,
+        "GBP",
+    )
+
+    # Assert
+    assert_that(cached).is_equal_to(Decimal("0.8"))
+    assert_that(refreshed).is_equal_to(Decimal("0.5"))
@@ -1,13 +1,18 @@
+import csv
 import datetime
+import io
 from decimal import Decimal
 from typing import Callable
 from unittest.mock import create_autospec
 
 import pytest
 
+from csv_import import StatementRow
 from db.manager import DBManager
 from db.models import Account, Category, Transaction, UserAccount
+from dtos import ImportProgress
 from exceptions import AccountNotFoundError, NotExistingCategoryError
+from export import ExportFormat
 from misc import CategoryType
 from requesters import RatesRequester
 from service import Service
@@ -323,3 +328,155 @@ async def test_transaction_with_different_amounts(
     
     updated_account = await get_account(account.account_id)
     assert updated_account.balance == account.balance + withdrawal_amount
+
+
+@pytest.mark.asyncio
+async def test_import_statement_in_chunks(
+    sut: Service,
+    user: UserAccount,
+    account: Account,
+    expense_category: Category,
+    income_category: Category,
+    get_account: Callable,
+    db_manager: DBManager,
+):
+    # Arrange
+    date = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+    expense = expense_category.name
+    income = income_category.name
+    rows = [
+        StatementRow(date, Decimal("-10.00"), expense, None, None),
+        None,
+        StatementRow(date, Decimal("-2.50"), expense.lower(), "bus", None),
+        StatementRow(date, Decimal("100.00"), income, None, None),
+        StatementRow(date, Decimal("-1.00"), "Unknown", None, None),
+    ]
+    reported: list[ImportProgress] = []
+
+    async def on_progress(progress: ImportProgress) -> None:
+        reported.append(progress.model_copy())
+
+    # Act
+    progress = await sut.import_statement(
+        user.user_id,
+        rows,
+        on_progress=on_progress,
+        chunk_size=2,
+    )
+
+    # Assert
+    assert progress == ImportProgress(imported=3, skipped=2)
+    assert [p.imported for p in reported] == [1, 3, 3]
+
+    updated_account = await get_account(account.account_id)
+    assert updated_account.balance == account.balance + Decimal("87.50")
+
+    async with db_manager.transaction():
+        transactions = await db_manager.get_user_transactions(user.user_id)
+    assert len(transactions) == progress.imported
+
+
+@pytest.mark.asyncio
+async def test_export_transactions(
+    sut: Service,
+    user: UserAccount,
+    account: Account,
+    expense_category: Category,
+    create_transaction: Callable,
+):
+    # Arrange
+    for amount in (Decimal("-1.00"), Decimal("-2.00")):
+        _ = await create_transaction(
+            user.user_id,
+            account.account_id,
+            expense_category.category_id,
+            amount,
+            amount,
+        )
+    file = io.BytesIO()
+
+    # Act
+    count = await sut.export_transactions(
+        user.user_id,
+        file,
+        ExportFormat.CSV,
+    )
+
+    # Assert
+    records = list(csv.reader(io.StringIO(file.getvalue().decode())))
+    assert count == len(records) - 1
+    assert [r[1:6] for r in records[1:]] == [
+        [account.name, "USD", expense_category.name, "expense", "-1.00"],
+        [account.name, "USD", expense_category.name, "expense", "-2.00"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_transaction_writes_bump_ledger_version(
+    sut: Service,
+    user: UserAccount,
+    account: Account,
+    expense_category: Category,
+    db_manager: DBManager,
+):
+    # Act
+    transaction = await sut.create_transaction(
+        user_id=user.user_id,
+        account_id=account.account_id,
+        category_id=expense_category.category_id,
+        withdrawal_amount=Decimal("-1.00"),
+        expense_amount=Decimal("-1.00"),
+    )
+    _ = await sut.edit_transaction(
+        user_id=user.user_id,
+        transaction_id=transaction.transaction_id,
+        account_id=account.account_id,
+        category_id=expense_category.category_id,
+        withdrawal_amount=-1,
+        expense_amount=-1,
+        note="Edited",
+        date=transaction.date,
+    )
+
+    # Assert
+    async with db_manager.transaction():
+        version = await db_manager.get_ledger_version(user.user_id)
+    assert version == user.ledger_version + 2
+
+
+@pytest.mark.asyncio
+async def test_search_transactions_pages_by_similarity(
+    sut: Service,
+    user: UserAccount,
+    account: Account,
+    expense_category: Category,
+    create_transaction: Callable,
+):
+    # Arrange
+    for note in ("Coffee with Anna", "Rent", "coffee beans", "Morning coffee"):
+        _ = await create_transaction(
+            user.user_id,
+            account.account_id,
+            expense_category.category_id,
+            Decimal("-1.00"),
+            Decimal("-1.00"),
+            note,
+        )
+
+    # Act
+    first = await sut.search_transactions(user.user_id, "coffee", page_size=2)
+    assert first.cursor is not None
+    second = await sut.search_transactions(
+        user.user_id,
+        "coffee",
+        first.cursor,
+        page_size=2,
+    )
+
+    # Assert
+    assert [t.note for t in first.transactions + second.transactions] == [
+        "Morning coffee",
+        "coffee beans",
+        "Coffee with Anna",
+    ]
+    assert second.cursor is None
@@ -0,0 +1,144 @@
+from decimal import Decimal
+from typing import TYPE_CHECKING, Callable
+
+import httpx
+import numpy as np
+import pytest
+from assertpy import assert_that
+
+from cross_rates import CrossRates, from_decimals, to_decimals
+from db.manager import DBManager
+from dtos import RatesSnapshot
+from exceptions import NotSupportedCurrencyError
+from requesters import ExchangeRatesRequester
+from service import Service
+
+if TYPE_CHECKING:
+    from db.models import Currency
+
+EUR_ID = 1
+USD_ID = 2
+GBP_ID = 3
+JPY_ID = 5
+
+
+@pytest.fixture
+def cross_rates() -> CrossRates:
+    snapshot = RatesSnapshot(
+        base_iso_code="EUR",
+        base_currency_id=EUR_ID,
+        version=None,
+        rates={
+            "USD": Decimal("1.25"),
+            "GBP": Decimal("0.8"),
+            "JPY": Decimal("160"),
+        },
+        currency_ids={"USD": USD_ID, "GBP": GBP_ID, "JPY": JPY_ID},
+    )
+    return CrossRates.from_snapshot(snapshot)
+
+
+def test_matrix(cross_rates: CrossRates):
+    # Act
+    matrix = cross_rates.matrix()
+
+    # Assert
+    assert_that(matrix.shape).is_equal_to((6, 6))
+    assert_that(matrix[EUR_ID, USD_ID]).is_equal_to(1.25)
+    assert_that(matrix[USD_ID, EUR_ID]).is_equal_to(0.8)
+    assert_that(matrix[GBP_ID, JPY_ID]).is_equal_to(200.0)
+    assert_that(matrix[JPY_ID, JPY_ID]).is_equal_to(1.0)
+
+
+def test_convert_batch(cross_rates: CrossRates):
+    # Arrange
+    amounts = from_decimals([Decimal("10"), Decimal("1.5"), Decimal("100")])
+    from_ids = np.array([GBP_ID, EUR_ID, USD_ID])
+    to_ids = np.array([JPY_ID, USD_ID, GBP_ID])
+
+    # Act
+    converted = to_decimals(cross_rates.convert(amounts, from_ids, to_ids))
+
+    # Assert
+    assert_that(converted).is_equal_to(
+        [Decimal("2000.00"), Decimal("1.88"), Decimal("64.00")],
+    )
+
+
+def test_convert_unknown_currency_id(cross_rates: CrossRates):
+    # Act/Assert
+    with pytest.raises(NotSupportedCurrencyError) as exc_info:
+        cross_rates.convert([1, 1], [USD_ID, 4], [EUR_ID, 42])
+
+    assert_that(str(exc_info.value)).contains("[4]")
+
+
+def test_to_decimals_rounds_half_to_even():
+    # Act
+    result = to_decimals(np.array([1.005, 0.125, 0.135, -2.5]), places=2)
+
+    # Assert
+    assert_that(result).is_equal_to(
+        [Decimal("1.00"), Decimal("0.12"), Decimal("0.14"), Decimal("-2.50")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_convert_user_transactions(
+    db_manager: DBManager,
+    httpx_client: Callable,
+    create_user: Callable,
+    create_category: Callable,
+):
+    # Arrange
+    requester = ExchangeRatesRequester(
+        httpx_client(
+            httpx.Response(
+                200,
+                json={
+                    "base": Service.BASE_CURRENCY,
+                    "timestamp": 1619622625,
+                    "rates": {"USD": 1.25, "GBP": 0.8},
+                },
+            ),
+        ),
+    )
+    sut = Service(db_manager, requester)
+    await sut.update_currency_rates()
+
+    async with db_manager.transaction():
+        usd: Currency = await db_manager.get_currency("USD")
+        gbp: Currency = await db_manager.get_currency("GBP")
+
+    user = await create_user(usd.currency_id)
+    category = await create_category(user.user_id, "Food", "expense")
+    usd_account = await sut.create_account(
+        user.user_id,
+        "Cash",
+        usd.currency_id,
+    )
+    gbp_account = await sut.create_account(
+        user.user_id,
+        "Savings",
+        gbp.currency_id,
+    )
+
+    for account, amount in (
+        (usd_account, Decimal("-10.00")),
+        (gbp_account, Decimal("-8.00")),
+    ):
+        await sut.create_transaction(
+            user.user_id,
+            account.account_id,
+            category.category_id,
+            amount,
+            amount,
+        )
+
+    # Act
+    converted = await sut.convert_user_transactions(user.user_id, "EUR")
+
+    # Assert
+    assert_that(sorted(converted)).is_equal_to(
+        [Decimal("-10.00"), Decimal("-8.00")],
+    )
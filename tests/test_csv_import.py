@@ -0,0 +1,170 @@
+import csv
+import io
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+from assertpy import assert_that
+
+from csv_import import (
+    StatementResolver,
+    StatementRow,
+    parse_mapping,
+    read_statement,
+)
+from db.models import Account, Category
+from dtos import ColumnMapping, UserRefData
+from exceptions import StatementImportError
+from expense_parser import CategoryMatcher
+from misc import CategoryType
+
+USER_ID = 1
+RESTAURANT = Category(
+    category_id=1,
+    user_id=USER_ID,
+    name="Restaurant",
+    type=CategoryType.EXPENSE,
+)
+DEFAULT_ACCOUNT = Account(
+    account_id=1,
+    user_id=USER_ID,
+    name="Default",
+    balance=Decimal(0),
+    currency_id=1,
+)
+CARD = DEFAULT_ACCOUNT.model_copy(update={"account_id": 2, "name": "Card"})
+DATE = datetime(2025, 3, 1, tzinfo=UTC)
+
+
+def test_parse_mapping():
+    # Act
+    mapping = parse_mapping(
+        "date = Booking date\namount=Sum\naccount=\n"
+        "delimiter=;\ndecimal_comma=yes",
+    )
+
+    # Assert
+    assert_that(mapping).is_equal_to(
+        ColumnMapping(
+            date="Booking date",
+            amount="Sum",
+            account=None,
+            delimiter=";",
+            decimal_comma=True,
+        ),
+    )
+
+
+@pytest.mark.parametrize("text", ["date", "currency=EUR", "delimiter=;;"])
+def test_parse_mapping_rejects_invalid_lines(text: str):
+    # Act & Assert
+    assert_that(parse_mapping).raises(
+        StatementImportError,
+    ).when_called_with(text)
+
+
+def test_read_statement():
+    # Arrange
+    lines = io.StringIO(
+        "Booking date;Sum;Note\n"
+        "01.03.2025;-1.234,50;Rent\n"
+        "\n"
+        "02.03.2025;oops;Broken\n"
+        "03.03.2025;12;\n",
+    )
+    mapping = ColumnMapping(
+        date="booking date",
+        amount="sum",
+        date_format="%d.%m.%Y",
+        delimiter=";",
+        decimal_comma=True,
+    )
+
+    # Act
+    rows = list(read_statement(lines, mapping))
+
+    # Assert
+    assert_that(rows).is_equal_to(
+        [
+            StatementRow(DATE, Decimal("-1234.50"), None, "Rent", None),
+            None,
+            StatementRow(
+                datetime(2025, 3, 3, tzinfo=UTC),
+                Decimal(12),
+                None,
+                None,
+                None,
+            ),
+        ],
+    )
+
+
+def test_read_statement_is_lazy():
+    # Arrange
+    read: list[int] = []
+
+    def lines() -> Iterator[str]:
+        yield "date,amount\n"
+        for i in range(100_000):
+            read.append(i)
+            yield f"2025-03-01,{i}\n"
+
+    # Act
+    first = next(read_statement(lines(), ColumnMapping()))
+
+    # Assert
+    assert_that(first.amount).is_equal_to(Decimal(0))
+    assert_that(read).is_length(1)
+
+
+def test_read_statement_requires_mapped_columns():
+    # Arrange
+    lines = io.StringIO("when,amount\n2025-03-01,1\n")
+
+    # Act & Assert
+    assert_that(list).raises(StatementImportError).when_called_with(
+        read_statement(lines, ColumnMapping()),
+    )
+
+
+def test_read_statement_rejects_invalid_csv():
+    # Arrange
+    field = "x" * (csv.field_size_limit() + 1)
+    lines = io.StringIO(f"date,amount,note\n2025-03-01,1,{field}\n")
+
+    # Act & Assert
+    assert_that(list).raises(StatementImportError).when_called_with(
+        read_statement(lines, ColumnMapping()),
+    )
+
+
+def test_resolver_batches_rows():
+    # Arrange
+    refdata = UserRefData(
+        user_id=USER_ID,
+        version=1,
+        categories={RESTAURANT.category_id: RESTAURANT},
+        accounts={a.account_id: a for a in (DEFAULT_ACCOUNT, CARD)},
+    )
+    matcher = CategoryMatcher([RESTAURANT], {"restaurant": ["coffee"]})
+    sut = StatementResolver(refdata, matcher, DEFAULT_ACCOUNT.account_id)
+    rows = [
+        StatementRow(DATE, Decimal(-5), "restaurant", None, None),
+        StatementRow(DATE, Decimal(-3), None, "Coffee shop", "card"),
+        StatementRow(DATE, Decimal(-2), None, "Coffee", "Savings"),
+        StatementRow(DATE, Decimal(-1), "Unknown", None, None),
+        None,
+        StatementRow(DATE, Decimal(-4), "Restaurant", None, "Card"),
+    ]
+
+    # Act
+    batch = sut.resolve(rows)
+
+    # Assert
+    assert_that(batch.account_ids).is_equal_to([1, 2, 2])
+    assert_that(batch.category_ids).is_equal_to([1, 1, 1])
+    assert_that(batch.balance_deltas).is_equal_to(
+        {1: Decimal(-5), 2: Decimal(-7)},
+    )
+    assert_that(batch.skipped).is_equal_to(3)
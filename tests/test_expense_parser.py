@@ -0,0 +1,141 @@
+from decimal import Decimal
+
+import pytest
+from assertpy import assert_that
+
+from db.models import Category
+from dtos import UserRefData
+from exceptions import ExpenseParseError
+from expense_parser import CategoryMatcher, ExpenseParser, parse_expense
+from misc import CategoryType
+
+USER_ID = 1
+RESTAURANT = Category(
+    category_id=1,
+    user_id=USER_ID,
+    name="Restaurant",
+    type=CategoryType.EXPENSE,
+)
+PUBLIC_TRANSPORT = Category(
+    category_id=2,
+    user_id=USER_ID,
+    name="Public transport",
+    type=CategoryType.EXPENSE,
+)
+SALARY = Category(
+    category_id=3,
+    user_id=USER_ID,
+    name="Salary",
+    type=CategoryType.INCOME,
+)
+ALIASES = {"restaurant": ["coffee", "bar"], "salary": ["bonus"]}
+
+
+@pytest.fixture
+def matcher() -> CategoryMatcher:
+    return CategoryMatcher([RESTAURANT, PUBLIC_TRANSPORT, SALARY], ALIASES)
+
+
+@pytest.mark.parametrize(
+    ("text", "amount", "iso_codes"),
+    [
+        ("12.50 coffee", Decimal("12.50"), ()),
+        ("12,50€ coffee", Decimal("12.50"), ("EUR",)),
+        ("$3 coffee", Decimal(3), ("USD", "MXN")),
+        ("coffee 3 USD", Decimal(3), ("USD",)),
+        ("coffee EUR 3", Decimal(3), ("EUR",)),
+        ("coffee 3usd", Decimal(3), ("USD",)),
+        ("1,234.56 coffee", Decimal("1234.56"), ()),
+        ("1.234,56€ coffee", Decimal("1234.56"), ("EUR",)),
+        ("1,234 coffee", Decimal(1234), ()),
+        ("0,500 coffee", Decimal("0.5"), ()),
+    ],
+)
+def test_parse_amount_and_currency(
+    matcher: CategoryMatcher,
+    text: str,
+    amount: Decimal,
+    iso_codes: tuple[str, ...],
+):
+    # Act
+    expense = parse_expense(text, matcher)
+
+    # Assert
+    assert_that(expense.amount).is_equal_to(amount)
+    assert_that(expense.iso_codes[: len(iso_codes)]).is_equal_to(iso_codes)
+    assert_that(expense.category_id).is_equal_to(RESTAURANT.category_id)
+    assert_that(expense.income).is_false()
+
+
+@pytest.mark.parametrize("word", ["cup", "all", "top", "try", "mad"])
+def test_parse_keeps_lowercase_words_that_are_iso_codes(
+    matcher: CategoryMatcher,
+    word: str,
+):
+    # Act
+    expense = parse_expense(f"2 {word} coffee", matcher)
+
+    # Assert
+    assert_that(expense.iso_codes).is_empty()
+    assert_that(expense.note).is_equal_to(word)
+
+
+def test_parse_prefers_names_and_longer_phrases(matcher: CategoryMatcher):
+    # Act
+    by_phrase = parse_expense("2.80 bar public Transport!", matcher)
+    by_name = parse_expense("5 coffee at the restaurant", matcher)
+
+    # Assert
+    assert_that(by_phrase.category_id).is_equal_to(
+        PUBLIC_TRANSPORT.category_id,
+    )
+    assert_that(by_phrase.note).is_equal_to("bar")
+    assert_that(by_name.category_id).is_equal_to(RESTAURANT.category_id)
+    assert_that(by_name.note).is_equal_to("coffee at the")
+
+
+def test_parse_income(matcher: CategoryMatcher):
+    # Act
+    expense = parse_expense("+1500 bonus", matcher)
+
+    # Assert
+    assert_that(expense.income).is_true()
+    assert_that(expense.category_id).is_equal_to(SALARY.category_id)
+    assert_that(expense.note).is_none()
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["coffee", "12 groceries", "1.2.3 coffee", ""],
+)
+def test_parse_rejects_incomplete_text(matcher: CategoryMatcher, text: str):
+    # Act & Assert
+    assert_that(parse_expense).raises(ExpenseParseError).when_called_with(
+        text,
+        matcher,
+    )
+
+
+def test_parser_rebuilds_matcher_on_new_version():
+    # Arrange
+    parser = ExpenseParser()
+    refdata = UserRefData(
+        user_id=USER_ID,
+        version=1,
+        categories={RESTAURANT.category_id: RESTAURANT},
+        accounts={},
+    )
+    renamed = RESTAURANT.model_copy(update={"name": "Eating out"})
+    renamed_refdata = refdata.model_copy(
+        update={"version": 2, "categories": {renamed.category_id: renamed}},
+    )
+
+    # Act
+    first = parser.matcher(refdata)
+    same = parser.matcher(refdata)
+    expense = parser.parse(renamed_refdata, "3 eating out")
+
+    # Assert
+    assert_that(same).is_same_as(first)
+    assert_that(parser.matcher(renamed_refdata)).is_not_same_as(first)
+    assert_that(expense.category_id).is_equal_to(RESTAURANT.category_id)
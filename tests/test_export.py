@@ -0,0 +1,164 @@
+import csv
+import io
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+from assertpy import assert_that
+
+from db.queries import ExportTransactionsRow
+from export import HEADER, ExportFormat, write_export
+
+ROWS = [
+    ExportTransactionsRow(
+        transaction_id=1,
+        date=datetime(2025, 3, 1, 12, tzinfo=UTC),
+        account_name="Default",
+        iso_code="EUR",
+        category_name="Restaurant",
+        category_type="expense",
+        withdrawal_amount=Decimal("-12.50"),
+        expense_amount=Decimal("-12.50"),
+        note="Coffee, cake",
+    ),
+    ExportTransactionsRow(
+        transaction_id=2,
+        date=datetime(2025, 3, 2, tzinfo=UTC),
+        account_name="Card",
+        iso_code="USD",
+        category_name="Salary",
+        category_type="income",
+        withdrawal_amount=Decimal(1500),
+        expense_amount=Decimal(1500),
+        note=None,
+    ),
+]
+
+
+async def stream(
+    rows: list[ExportTransactionsRow],
+) -> AsyncIterator[ExportTransactionsRow]:
+    for row in rows:
+        yield row
+
+
+@pytest.mark.asyncio
+async def test_write_csv():
+    # Arrange
+    file = io.BytesIO()
+
+    # Act
+    count = await write_export(stream(ROWS), file, ExportFormat.CSV)
+
+    # Assert
+    assert_that(file.closed).is_false()
+    records = list(csv.reader(io.StringIO(file.getvalue().decode())))
+    assert_that(count).is_equal_to(len(ROWS))
+    assert_that(records).is_equal_to(
+        [
+            list(HEADER),
+            [
+                "2025-03-01T12:00:00+00:00",
+                "Default",
+                "EUR",
+                "Restaurant",
+                "expense",
+                "-12.50",
+                "-12.50",
+                "Coffee, cake",
+            ],
+            [
+                "2025-03-02T00:00:00+00:00",
+                "Card",
+                "USD",
+                "Salary",
+                "income",
+                "1500",
+                "1500",
+                "",
+            ],
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_write_xlsx():
+    # Arrange
+    openpyxl = pytest.importorskip("openpyxl")
+    file = io.BytesIO()
+
+    # Act
+    count = await write_export(stream(ROWS), file, ExportFormat.XLSX)
+
+    # Assert
+    _ = file.seek(0)
+    sheet = openpyxl.load_workbook(file, read_only=True)["Transactions"]
+    records = list(sheet.iter_rows(values_only=True))
+    assert_that(count).is_equal_to(len(ROWS))
+    assert_that(records[0]).is_equal_to(HEADER)
+    assert_that(records[1][:4]).is_equal_to(
+        (datetime(2025, 3, 1, 12), "Default", "EUR", "Restaurant"),
+    )
+    assert_that(records[2][5]).is_equal_to(1500)
+
+
+INJECTED = ExportTransactionsRow(
+    transaction_id=3,
+    date=datetime(2025, 3, 3, tzinfo=UTC),
+    account_name="@SUM(A1)",
+    iso_code="EUR",
+    category_name="+1",
+    category_type="expense",
+    withdrawal_amount=Decimal(-1),
+    expense_amount=Decimal(-1),
+    note='=HYPERLINK("http://example.com")',
+)
+
+
+@pytest.mark.asyncio
+async def test_write_csv_escapes_formulas():
+    # Arrange
+    file = io.BytesIO()
+
+    # Act
+    _ = await write_export(stream([INJECTED]), file, ExportFormat.CSV)
+
+    # Assert
+    record = list(csv.reader(io.StringIO(file.getvalue().decode())))[1]
+    assert_that(record[1]).is_equal_to("'@SUM(A1)")
+    assert_that(record[3]).is_equal_to("'+1")
+    assert_that(record[5]).is_equal_to("-1")
+    assert_that(record[7]).is_equal_to('\'=HYPERLINK("http://example.com")')
+
+
+@pytest.mark.asyncio
+async def test_write_xlsx_stores_formulas_as_text():
+    # Arrange
+    openpyxl = pytest.importorskip("openpyxl")
+    file = io.BytesIO()
+
+    # Act
+    _ = await write_export(stream([INJECTED]), file, ExportFormat.XLSX)
+
+    # Assert
+    _ = file.seek(0)
+    sheet = openpyxl.load_workbook(file)["Transactions"]
+    cells = [cell for cell in sheet[2] if isinstance(cell.value, str)]
+    assert_that([cell.data_type for cell in cells]).does_not_contain("f")
+    assert_that(sheet["H2"].value).starts_with("'=")
+
+
+@pytest.mark.asyncio
+async def test_write_empty_csv():
+    # Arrange
+    file = io.BytesIO()
+
+    # Act
+    count = await write_export(stream([]), file, ExportFormat.CSV)
+
+    # Assert
+    assert_that(count).is_zero()
+    assert_that(file.getvalue().decode()).is_equal_to(
+        ",".join(HEADER) + "\r\n",
+    )
@@ -0,0 +1,216 @@
+import asyncio
+import itertools
+import time
+from collections.abc import AsyncGenerator, Callable
+from decimal import Decimal
+
+import httpx
+import pytest
+from assertpy import assert_that
+from conftest import StubResponse, StubServer
+
+from db.models import Currency
+from dtos import Rates
+from requesters import (
+    MIN_LATENCY_SAMPLES,
+    ExchangeRatesRequester,
+    HedgedRatesRequester,
+    RatesRequester,
+)
+
+EUR = Currency(currency_id=1, name="Euro", iso_code="EUR", symbol="€")
+SLOW = 1.0
+
+
+def rates(timestamp: int, **data: float) -> dict:
+    return {"base": "EUR", "timestamp": timestamp, "rates": data}
+
+
+class SleepingRequester(RatesRequester):
+    def __init__(self, delay: float) -> None:
+        self._delay = delay
+
+    async def fetch(self, base_currency: Currency) -> Rates:
+        await asyncio.sleep(self._delay)
+        return Rates(
+            source_iso_code=base_currency.iso_code,
+            timestamp=1,
+            data={},
+        )
+
+
+@pytest.fixture
+async def servers(make_stub_server: Callable) -> list[StubServer]:
+    return [await make_stub_server() for _ in range(3)]
+
+
+@pytest.fixture
+async def make_sut(servers: list[StubServer]) -> AsyncGenerator:
+    requesters: list[HedgedRatesRequester] = []
+
+    def inner(**kwargs: object) -> HedgedRatesRequester:
+        requester = HedgedRatesRequester(
+            [
+                ExchangeRatesRequester(url=server.url, retries=0)
+                for server in servers
+            ],
+            hedge_delay=0.1,
+            cross_check_timeout=0.2,
+            **kwargs,
+        )
+        requesters.append(requester)
+        return requester
+
+    yield inner
+    for requester in requesters:
+        await requester.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged(
+    make_sut: Callable,
+    servers: list[StubServer],
+):
+    # Arrange
+    servers[0].responses = [StubResponse(json=rates(1, GBP=0.85))]
+    sut = make_sut()
+
+    # Act
+    result = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(result.timestamp).is_equal_to(1)
+    assert_that(servers[1].requests).is_empty()
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged(
+    make_sut: Callable,
+    servers: list[StubServer],
+):
+    # Arrange
+    servers[0].responses = [StubResponse(json=rates(1), delay=SLOW)]
+    servers[1].responses = [StubResponse(json=rates(2, GBP=0.85))]
+    sut = make_sut()
+
+    # Act
+    started = time.monotonic()
+    result = await sut.fetch(EUR)
+    elapsed = time.monotonic() - started
+
+    # Assert
+    assert_that(result.timestamp).is_equal_to(2)
+    assert_that(elapsed).is_less_than(SLOW)
+    assert_that(servers[2].requests).is_empty()
+
+
+@pytest.mark.asyncio
+async def test_failed_provider_falls_back(
+    make_sut: Callable,
+    servers: list[StubServer],
+):
+    # Arrange
+    servers[0].responses = [StubResponse(status=503)]
+    servers[1].responses = [StubResponse(drop=True)]
+    servers[2].responses = [StubResponse(json=rates(3, GBP=0.85))]
+    sut = make_sut()
+
+    # Act
+    result = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(result.timestamp).is_equal_to(3)
+
+
+@pytest.mark.asyncio
+async def test_all_providers_failed(
+    make_sut: Callable,
+    servers: list[StubServer],
+):
+    # Arrange
+    for server in servers:
+        server.responses = [StubResponse(status=503)]
+    sut = make_sut()
+
+    # Act/Assert
+    with pytest.raises(httpx.HTTPStatusError):
+        _ = await sut.fetch(EUR)
+
+
+@pytest.mark.asyncio
+async def test_outliers_are_dropped(
+    make_sut: Callable,
+    servers: list[StubServer],
+):
+    # Arrange
+    servers[0].responses = [
+        StubResponse(json=rates(1, GBP=0.85, JPY=1600.0)),
+    ]
+    for server in servers[1:]:
+        server.responses = [StubResponse(json=rates(1, GBP=0.86, JPY=160.0))]
+    sut = make_sut(cross_check=True)
+
+    # Act
+    result = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(result.data).is_equal_to({"GBP": Decimal("0.85")})
+    assert_that(servers[1].requests).is_length(1)
+
+
+@pytest.mark.asyncio
+async def test_single_other_answer_keeps_rates(
+    make_sut: Callable,
+    servers: list[StubServer],
+):
+    # Arrange
+    servers[0].responses = [
+        StubResponse(json=rates(1, GBP=0.85, JPY=1600.0)),
+    ]
+    servers[1].responses = [StubResponse(json=rates(1, GBP=0.86, JPY=160.0))]
+    servers[2].responses = [StubResponse(status=503)]
+    sut = make_sut(cross_check=True)
+
+    # Act
+    result = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(result.data).is_equal_to(
+        {"GBP": Decimal("0.85"), "JPY": Decimal("1600.0")},
+    )
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_counts_outrun_primary():
+    # Arrange
+    sut = HedgedRatesRequester(
+        [SleepingRequester(SLOW), SleepingRequester(0)],
+        hedge_delay=0.01,
+        cross_check_timeout=0.01,
+        # Every fetch takes one tick
+        clock=itertools.count().__next__,
+    )
+
+    # Act
+    for _ in range(MIN_LATENCY_SAMPLES):
+        _ = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(sut.hedge_delay).is_equal_to(1)
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_follows_primary_latency(
+    make_sut: Callable,
+    servers: list[StubServer],
+):
+    # Arrange
+    servers[0].responses = [StubResponse(json=rates(1, GBP=0.85))]
+    sut = make_sut()
+
+    # Act
+    for _ in range(MIN_LATENCY_SAMPLES):
+        _ = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(sut.hedge_delay).is_less_than(0.1)
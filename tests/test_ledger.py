@@ -0,0 +1,147 @@
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable
+
+import httpx
+import numpy as np
+import pytest
+from assertpy import assert_that
+
+from db.manager import DBManager
+from dtos import CategoryMonthTotal
+from exceptions import NotSupportedCurrencyError
+from ledger import (
+    LedgerArrays,
+    RateHistoryArrays,
+    convert_ledger,
+    rates_as_of,
+    totals_by_category_month,
+)
+from requesters import ExchangeRatesRequester
+from service import Service
+
+EUR_ID = 1
+USD_ID = 2
+GBP_ID = 3
+
+JAN = int(datetime(2025, 1, 1, tzinfo=UTC).timestamp())
+FEB = int(datetime(2025, 2, 1, tzinfo=UTC).timestamp())
+MAR = int(datetime(2025, 3, 1, tzinfo=UTC).timestamp())
+
+
+def arrays(*values: list) -> list[np.ndarray]:
+    return [np.asarray(v) for v in values]
+
+
+@pytest.fixture
+def history() -> RateHistoryArrays:
+    return RateHistoryArrays(
+        *arrays(
+            [USD_ID, USD_ID, GBP_ID, GBP_ID],
+            [JAN, FEB, JAN, MAR],
+            [1.0, 2.0, 0.5, 0.25],
+        ),
+    )
+
+
+def test_rates_as_of(history: RateHistoryArrays):
+    # Arrange
+    currency_ids, timestamps = arrays(
+        [USD_ID, USD_ID, USD_ID, GBP_ID, GBP_ID, EUR_ID],
+        [JAN - 1, FEB - 1, MAR, FEB, MAR, JAN],
+    )
+
+    # Act
+    rates = rates_as_of(history, currency_ids, timestamps, EUR_ID)
+
+    # Assert
+    assert_that(rates.tolist()).is_equal_to([1.0, 1.0, 2.0, 0.5, 0.25, 1.0])
+
+
+def test_rates_as_of_without_history(history: RateHistoryArrays):
+    # Act/Assert
+    with pytest.raises(NotSupportedCurrencyError):
+        rates_as_of(history, *arrays([4], [JAN]), EUR_ID)
+
+
+def test_totals_by_category_month(history: RateHistoryArrays):
+    # Arrange
+    ledger = LedgerArrays(
+        *arrays(
+            [JAN + 10, JAN + 20, FEB + 10, MAR + 10],
+            [7, 7, 7, 8],
+            [USD_ID, GBP_ID, USD_ID, GBP_ID],
+            [-10.0, -5.0, -10.0, -1.0],
+        ),
+    )
+
+    # Act
+    converted = convert_ledger(ledger, history, EUR_ID, USD_ID)
+    totals = totals_by_category_month(ledger, converted)
+
+    # Assert
+    assert_that(totals).is_equal_to(
+        [
+            CategoryMonthTotal(
+                category_id=7,
+                month=date(2025, 1, 1),
+                total=Decimal("-20.00"),
+            ),
+            CategoryMonthTotal(
+                category_id=7,
+                month=date(2025, 2, 1),
+                total=Decimal("-10.00"),
+            ),
+            CategoryMonthTotal(
+                category_id=8,
+                month=date(2025, 3, 1),
+                total=Decimal("-8.00"),
+            ),
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_category_month_totals(
+    db_manager: DBManager,
+    httpx_client: Callable,
+    create_user: Callable,
+    create_category: Callable,
+    get_currency: Callable,
+):
+    # Arrange
+    for timestamp, gbp_rate in ((JAN, 0.8), (FEB, 0.5)):
+        response = httpx.Response(
+            200,
+            json={
+                "base": Service.BASE_CURRENCY,
+                "timestamp": timestamp,
+                "rates": {"GBP": gbp_rate},
+            },
+        )
+        requester = ExchangeRatesRequester(httpx_client(response))
+        await Service(db_manager, requester).update_currency_rates()
+
+    gbp = await get_currency("GBP")
+    sut = Service(db_manager, ExchangeRatesRequester())
+    user = await create_user(gbp.currency_id)
+    category = await create_category(user.user_id, "Food", "expense")
+    account = await sut.create_account(user.user_id, "Cash", gbp.currency_id)
+
+    for timestamp in (JAN, FEB):
+        await sut.create_transaction(
+            user.user_id,
+            account.account_id,
+            category.category_id,
+            Decimal("-4"),
+            Decimal("-4"),
+            date=datetime.fromtimestamp(timestamp, tz=UTC) + timedelta(days=1),
+        )
+
+    # Act
+    totals = await sut.get_category_month_totals(user.user_id, "EUR")
+
+    # Assert
+    assert_that([t.total for t in totals]).is_equal_to(
+        [Decimal("-5.00"), Decimal("-8.00")],
+    )
@@ -0,0 +1,54 @@
+import pytest
+from assertpy import assert_that
+
+from lru import LRUCache
+
+
+def test_evicts_least_recently_used():
+    # Arrange
+    sut: LRUCache[int, int] = LRUCache(2)
+    sut.put(1, 10)
+    sut.put(2, 20)
+
+    # Act
+    _ = sut.get(1)
+    sut.put(3, 30)
+
+    # Assert
+    assert_that(sut.get(1)).is_equal_to(10)
+    assert_that(sut.get(2)).is_none()
+    assert_that(sut.get(3)).is_equal_to(30)
+    assert_that(sut).is_length(2)
+
+
+def test_put_replaces_value():
+    # Arrange
+    sut: LRUCache[str, int] = LRUCache(2)
+    sut.put("a", 1)
+
+    # Act
+    sut.put("a", 2)
+
+    # Assert
+    assert_that(sut.get("a")).is_equal_to(2)
+    assert_that(sut).is_length(1)
+
+
+def test_pop_removes_entry():
+    # Arrange
+    sut: LRUCache[str, int] = LRUCache(2)
+    sut.put("a", 1)
+
+    # Act
+    popped = sut.pop("a")
+
+    # Assert
+    assert_that(popped).is_equal_to(1)
+    assert_that(sut.pop("a")).is_none()
+    assert_that(sut).is_length(0)
+
+
+def test_maxsize_must_be_positive():
+    # Act/Assert
+    with pytest.raises(ValueError, match="maxsize"):
+        _ = LRUCache(0)
@@ -0,0 +1,119 @@
+import asyncio
+from collections.abc import AsyncGenerator
+
+import pytest
+from assertpy import assert_that
+from taskiq import InMemoryBroker
+
+from exceptions import TaskTimeoutError, TransactionSearchError
+from offload import TaskOffloader, task_key
+
+USER_ID = 1
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator:
+    broker = InMemoryBroker()
+    await broker.startup()
+    yield broker
+    await broker.shutdown()
+
+
+def test_task_key_depends_on_inputs():
+    # Act
+    key = task_key("report", (1, 2), USER_ID, "2025-01-01")
+
+    # Assert
+    assert_that(key).starts_with("report:")
+    assert_that(key).is_equal_to(
+        task_key("report", (1, 2), USER_ID, "2025-01-01"),
+    )
+    assert_that(key).is_not_equal_to(
+        task_key("report", (1, 3), USER_ID, "2025-01-01"),
+    )
+    assert_that(key).is_not_equal_to(
+        task_key("report", (1, 2), USER_ID, "2025-02-01"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_reuses_results_of_the_same_version(broker: InMemoryBroker):
+    # Arrange
+    calls: list[int] = []
+
+    @broker.task(task_name="square")
+    async def square(value: int) -> int:
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * value
+
+    sut = TaskOffloader(broker, check_interval=0.01)
+
+    # Act
+    first, concurrent = await asyncio.gather(
+        sut.run("square", 1, 3),
+        sut.run("square", 1, 3),
+    )
+    cached = await sut.run("square", 1, 3)
+    recomputed = await sut.run("square", 2, 3)
+
+    # Assert
+    assert_that([first, concurrent, cached, recomputed]).is_equal_to(
+        [9, 9, 9, 9],
+    )
+    assert_that(calls).is_equal_to([3, 3])
+
+
+@pytest.mark.asyncio
+async def test_raises_task_errors_and_retries_them(broker: InMemoryBroker):
+    # Arrange
+    calls = 0
+
+    @broker.task(task_name="failing")
+    async def failing() -> None:
+        nonlocal calls
+        calls += 1
+        msg = "Nothing to search for"
+        raise TransactionSearchError(msg)
+
+    sut = TaskOffloader(broker, check_interval=0.01)
+
+    # Act / Assert
+    for _ in range(2):
+        with pytest.raises(TransactionSearchError):
+            await sut.run("failing", 1)
+    assert_that(calls).is_equal_to(2)
+
+
+@pytest.mark.asyncio
+async def test_gives_up_on_slow_workers(broker: InMemoryBroker):
+    # Arrange
+    @broker.task(task_name="slow")
+    async def slow() -> None:
+        await asyncio.sleep(1)
+
+    sut = TaskOffloader(broker, timeout=0.05, check_interval=0.01)
+
+    # Act / Assert
+    with pytest.raises(TaskTimeoutError):
+        await sut.run("slow", 1)
+
+
+@pytest.mark.asyncio
+async def test_runs_not_reused_tasks_every_time(broker: InMemoryBroker):
+    # Arrange
+    calls: list[int] = []
+
+    @broker.task(task_name="send")
+    async def send(value: int) -> int:
+        calls.append(value)
+        return value
+
+    sut = TaskOffloader(broker, check_interval=0.01)
+
+    # Act
+    results = [await sut.run("send", 1, 3, reuse=False) for _ in range(2)]
+
+    # Assert
+    assert_that(results).is_equal_to([3, 3])
+    assert_that(calls).is_equal_to([3, 3])
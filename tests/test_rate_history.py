@@ -0,0 +1,91 @@
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from typing import Callable
+
+import httpx
+import pytest
+from assertpy import assert_that
+
+from db.manager import DBManager
+from requesters import ExchangeRatesRequester
+from service import Service
+
+FIRST_TS = datetime(2025, 5, 1, 10, 0, tzinfo=UTC)
+SECOND_TS = FIRST_TS + timedelta(hours=1)
+
+
+@pytest.fixture
+def update_rates(db_manager: DBManager, httpx_client: Callable) -> Callable:
+    async def inner(timestamp: datetime, rates: dict[str, float]) -> None:
+        response = httpx.Response(
+            200,
+            json={
+                "base": Service.BASE_CURRENCY,
+                "timestamp": int(timestamp.timestamp()),
+                "rates": rates,
+            },
+        )
+        requester = ExchangeRatesRequester(httpx_client(response))
+        await Service(db_manager, requester).update_currency_rates()
+
+    return inner
+
+
+@pytest.fixture
+async def sut(db_manager: DBManager, update_rates: Callable) -> Service:
+    await update_rates(FIRST_TS, {"GBP": 0.8, "JPY": 160.0})
+    await update_rates(SECOND_TS, {"GBP": 0.9, "JPY": 150.0})
+    return Service(db_manager, ExchangeRatesRequester())
+
+
+@pytest.mark.asyncio
+async def test_get_rate_as_of(sut: Service):
+    # Act
+    before = await sut.get_rate_as_of("GBP", FIRST_TS - timedelta(seconds=1))
+    at_first = await sut.get_rate_as_of("GBP", FIRST_TS)
+    between = await sut.get_rate_as_of("GBP", SECOND_TS - timedelta(minutes=1))
+    after = await sut.get_rate_as_of("GBP", SECOND_TS + timedelta(days=30))
+
+    # Assert
+    assert_that(before).is_none()
+    assert_that(at_first).is_equal_to(Decimal("0.8"))
+    assert_that(between).is_equal_to(Decimal("0.8"))
+    assert_that(after).is_equal_to(Decimal("0.9"))
+
+
+@pytest.mark.asyncio
+async def test_get_rates_as_of_keeps_order(sut: Service):
+    # Arrange
+    timestamps = [
+        SECOND_TS,
+        FIRST_TS - timedelta(days=1),
+        FIRST_TS + timedelta(minutes=5),
+    ]
+
+    # Act
+    rates = await sut.get_rates_as_of("JPY", timestamps)
+
+    # Assert
+    assert_that(rates).is_equal_to([Decimal("150.0"), None, Decimal("160.0")])
+
+
+@pytest.mark.asyncio
+async def test_base_currency_rate_is_one(sut: Service):
+    # Act
+    rate = await sut.get_rate_as_of(Service.BASE_CURRENCY, FIRST_TS)
+
+    # Assert
+    assert_that(rate).is_equal_to(Decimal(1))
+
+
+@pytest.mark.asyncio
+async def test_same_provider_timestamp_is_appended_once(
+    sut: Service,
+    update_rates: Callable,
+):
+    # Act
+    await update_rates(SECOND_TS, {"GBP": 0.95})
+
+    # Assert
+    rate = await sut.get_rate_as_of("GBP", SECOND_TS)
+    assert_that(rate).is_equal_to(Decimal("0.9"))
@@ -0,0 +1,152 @@
+import asyncio
+from typing import Any
+
+import pytest
+from assertpy import assert_that
+from telegram.error import RetryAfter
+
+from rate_limiter import Priority, SendRateLimiter, TokenBucket
+
+CHAT_ID = 42
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    # Arrange
+    sut = TokenBucket(rate=2, burst=3)
+
+    # Act
+    delays = [sut.reserve(10.0) for _ in range(5)]
+
+    # Assert
+    assert_that(delays).is_equal_to([0.0, 0.0, 0.0, 0.5, 1.0])
+    assert_that(sut.delay(12.5)).is_zero()
+
+
+async def send(
+    sut: SendRateLimiter,
+    sent: list[str],
+    name: str,
+    data: dict[str, Any],
+    priority: Priority | None = None,
+) -> str:
+    async def callback() -> bool:
+        sent.append(name)
+        return True
+
+    _ = await sut.process_request(
+        callback,
+        (),
+        {},
+        "sendMessage",
+        data,
+        priority,
+    )
+    return name
+
+
+@pytest.mark.asyncio
+async def test_interactive_sends_go_before_broadcasts():
+    # Arrange
+    sut = SendRateLimiter(
+        global_rate=50,
+        global_burst=1,
+        chat_rate=1000,
+    )
+    await sut.initialize()
+    sent: list[str] = []
+
+    try:
+        # Act
+        broadcasts = [
+            asyncio.create_task(
+                send(
+                    sut,
+                    sent,
+                    f"broadcast {i}",
+                    {"chat_id": CHAT_ID + i},
+                    Priority.BROADCAST,
+                ),
+            )
+            for i in range(4)
+        ]
+        await asyncio.sleep(0)
+        reply = asyncio.create_task(
+            send(sut, sent, "reply", {"chat_id": CHAT_ID}),
+        )
+        _ = await asyncio.gather(reply, *broadcasts)
+
+        # Assert
+        assert_that(sent.index("reply")).is_less_than_or_equal_to(2)
+        assert_that(sut.queued).is_zero()
+    finally:
+        await sut.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_requests_without_chat_are_not_limited():
+    # Arrange
+    sut = SendRateLimiter(global_rate=1)
+    sent: list[str] = []
+
+    # Act
+    async with asyncio.timeout(0.5):
+        for i in range(5):
+            _ = await send(sut, sent, f"getMe {i}", {})
+
+    # Assert
+    assert_that(sent).is_length(5)
+    await sut.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_retries_after_flood_control():
+    # Arrange
+    sut = SendRateLimiter(global_rate=1000, chat_rate=1000, max_retries=2)
+    calls = 0
+
+    async def callback() -> bool:
+        nonlocal calls
+        calls += 1
+        if calls < 3:  # noqa: PLR2004
+            raise RetryAfter(0)
+        return True
+
+    try:
+        # Act
+        result = await sut.process_request(
+            callback,
+            (),
+            {},
+            "sendMessage",
+            {"chat_id": CHAT_ID},
+            None,
+        )
+
+        # Assert
+        assert_that(result).is_true()
+        assert_that(calls).is_equal_to(3)
+    finally:
+        await sut.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    # Arrange
+    sut = SendRateLimiter(global_rate=1000, chat_rate=1000, max_retries=1)
+
+    async def callback() -> bool:
+        raise RetryAfter(0)
+
+    try:
+        # Act / Assert
+        with pytest.raises(RetryAfter):
+            _ = await sut.process_request(
+                callback,
+                (),
+                {},
+                "sendMessage",
+                {"chat_id": CHAT_ID},
+                None,
+            )
+    finally:
+        await sut.shutdown()
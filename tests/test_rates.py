@@ -1,17 +1,41 @@
+import asyncio
 from decimal import Decimal
 from types import CoroutineType
-from typing import Callable
+from typing import Callable, override
 
 import httpx
 import pytest
 from assertpy import assert_that
+from prometheus_client import REGISTRY
 
 from currencies import CURRENCIES
 from db.manager import DBManager
+from db.models import Currency
 from dtos import Rates
-from requesters import ExchangeRatesRequester
+from exceptions import InvalidRatesError
+from requesters import ExchangeRatesRequester, RatesRequester
 from service import Service
 
+FETCH_DELAY = 0.3
+
+
+class SlowRequester(RatesRequester):
+    def __init__(self, rates: Rates) -> None:
+        self.rates = rates
+
+    @override
+    async def fetch(self, base_currency: Currency) -> Rates:
+        await asyncio.sleep(FETCH_DELAY)
+        return self.rates
+
+
+def transaction_seconds(name: str) -> tuple[float, float]:
+    labels = {"name": name}
+    return (
+        REGISTRY.get_sample_value("db_transaction_seconds_count", labels) or 0,
+        REGISTRY.get_sample_value("db_transaction_seconds_sum", labels) or 0,
+    )
+
 
 @pytest.fixture
 def base_currency(create_currency: Callable) -> Callable:
@@ -216,3 +240,143 @@ async def test_update_currency_rates_with_unsupported_currency(
 
     assert_that(to_rub_rate).is_not_none()
     assert_that(to_rub_rate.rate).is_equal_to(Decimal("75.5"))
+
+
+@pytest.mark.asyncio
+async def test_update_currency_rates_skips_applied_timestamp(
+    db_manager: DBManager,
+    mock_rates_response: Callable,
+    httpx_client: Callable,
+    get_rate: Callable,
+    get_currency: Callable,
+) -> None:
+    # Arrange
+    mock_data = mock_rates_response(Service.BASE_CURRENCY)
+    client = httpx_client(httpx.Response(200, json=mock_data))
+    writer = Service(db_manager, ExchangeRatesRequester(client))
+    _ = await writer.update_currency_rates()
+
+    mock_data["rates"]["GBP"] = 0.9
+    client = httpx_client(httpx.Response(200, json=mock_data))
+    sut = Service(db_manager, ExchangeRatesRequester(client))
+
+    # Act
+    updated = await sut.update_currency_rates()
+
+    # Assert
+    base_currency = await get_currency(Service.BASE_CURRENCY)
+    gbp_currency = await get_currency("GBP")
+    to_gbp_rate = await get_rate(
+        base_currency.currency_id,
+        gbp_currency.currency_id,
+    )
+    assert_that(updated).is_false()
+    assert_that(to_gbp_rate.rate).is_equal_to(Decimal("0.72"))
+
+
+@pytest.mark.asyncio
+async def test_update_currency_rates_writes_only_changed_rates(
+    db_manager: DBManager,
+    mock_rates_response: Callable,
+    httpx_client: Callable,
+    get_rate: Callable,
+    get_currency: Callable,
+) -> None:
+    # Arrange
+    mock_data = mock_rates_response(Service.BASE_CURRENCY)
+    client = httpx_client(httpx.Response(200, json=mock_data))
+    writer = Service(db_manager, ExchangeRatesRequester(client))
+    _ = await writer.update_currency_rates()
+
+    base_currency = await get_currency(Service.BASE_CURRENCY)
+    gbp_currency = await get_currency("GBP")
+    jpy_currency = await get_currency("JPY")
+    jpy_before = await get_rate(
+        base_currency.currency_id,
+        jpy_currency.currency_id,
+    )
+
+    mock_data["timestamp"] += 3600
+    mock_data["rates"]["GBP"] = 0.75
+    mock_data["rates"]["JPY"] = 110.26
+    client = httpx_client(httpx.Response(200, json=mock_data))
+    sut = Service(
+        db_manager,
+        ExchangeRatesRequester(client),
+        rates_epsilon=Decimal("0.001"),
+    )
+
+    # Act
+    updated = await sut.update_currency_rates()
+
+    # Assert
+    to_gbp_rate = await get_rate(
+        base_currency.currency_id,
+        gbp_currency.currency_id,
+    )
+    jpy_after = await get_rate(
+        base_currency.currency_id,
+        jpy_currency.currency_id,
+    )
+    assert_that(updated).is_true()
+    assert_that(to_gbp_rate.rate).is_equal_to(Decimal("0.75"))
+    assert_that(jpy_after).is_equal_to(jpy_before)
+
+
+@pytest.mark.asyncio
+async def test_update_currency_rates_fetches_outside_transaction(
+    db_manager: DBManager,
+) -> None:
+    # Arrange
+    rates = Rates(
+        source_iso_code=Service.BASE_CURRENCY,
+        timestamp=1619622625,
+        data={"GBP": 0.72, "JPY": 110.25},
+    )
+    sut = Service(db_manager, SlowRequester(rates))
+    count_before, sum_before = transaction_seconds("write_rates")
+
+    # Act
+    updated = await sut.update_currency_rates()
+
+    # Assert
+    count_after, sum_after = transaction_seconds("write_rates")
+    assert_that(updated).is_true()
+    assert_that(count_after - count_before).is_equal_to(1)
+    assert_that(sum_after - sum_before).is_less_than(FETCH_DELAY)
+
+
+@pytest.mark.asyncio
+async def test_update_currency_rates_rejects_other_base(
+    db_manager: DBManager,
+) -> None:
+    # Arrange
+    rates = Rates(source_iso_code="USD", timestamp=1619622625, data={})
+    sut = Service(db_manager, SlowRequester(rates))
+
+    # Act/Assert
+    with pytest.raises(InvalidRatesError):
+        await sut.update_currency_rates()
+
+
+def test_normalize_rates_keeps_valid_supported_rates() -> None:
+    # Arrange
+    rates = Rates(
+        source_iso_code=Service.BASE_CURRENCY,
+        timestamp=1619622625,
+        data={
+            "GBP": Decimal("0.72"),
+            "XYZ": Decimal("1.23"),
+            "JPY": Decimal("-1"),
+            "USD": Decimal("1.1"),
+        },
+    )
+
+    # Act
+    normalized = Service.normalize_rates(rates)
+
+    # Assert
+    assert_that(normalized.iso_codes).is_equal_to(["GBP", "USD"])
+    assert_that(normalized.rates).is_equal_to(
+        [Decimal("0.72"), Decimal("1.1")],
+    )
@@ -0,0 +1,126 @@
+import asyncio
+import zlib
+from collections.abc import AsyncGenerator
+from datetime import UTC, datetime, timedelta
+from unittest.mock import create_autospec
+
+import pytest
+from assertpy import assert_that
+from conftest import make_snapshot
+from fakeredis import FakeAsyncRedis
+
+from db.manager import DBManager
+from rates_cache import RatesCache
+from rates_channel import (
+    INVALIDATION_CHANNEL,
+    SNAPSHOT_KEY,
+    RatesPublisher,
+    RatesSubscriber,
+    decode_snapshot,
+    encode_snapshot,
+)
+from service import Service
+
+VERSION = datetime(2025, 5, 1, 12, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+async def redis() -> AsyncGenerator:
+    client = FakeAsyncRedis()
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def db_manager_mock() -> DBManager:
+    return create_autospec(DBManager, instance=True)
+
+
+@pytest.fixture
+def cache(db_manager_mock: DBManager) -> RatesCache:
+    return RatesCache(db_manager_mock, Service.BASE_CURRENCY, ttl=3600)
+
+
+def test_snapshot_round_trip_keeps_decimals():
+    # Arrange
+    snapshot = make_snapshot(VERSION, "0.85")
+
+    # Act
+    decoded = decode_snapshot(encode_snapshot(snapshot))
+
+    # Assert
+    assert_that(decoded).is_equal_to(snapshot)
+
+
+@pytest.mark.asyncio
+async def test_subscriber_swaps_cache_on_publish(
+    redis: FakeAsyncRedis,
+    cache: RatesCache,
+    db_manager_mock: DBManager,
+):
+    # Arrange
+    subscriber = RatesSubscriber(redis, cache)
+    task = asyncio.create_task(subscriber.run())
+    await asyncio.sleep(0.05)
+    snapshot = make_snapshot(VERSION, "0.85")
+
+    # Act
+    await RatesPublisher(redis).publish(snapshot)
+    for _ in range(50):
+        if cache.snapshot is not None:
+            break
+        await asyncio.sleep(0.01)
+    result = await cache.get()
+    task.cancel()
+
+    # Assert
+    assert_that(result).is_equal_to(snapshot)
+    assert_that(db_manager_mock.transaction.called).is_false()
+
+
+@pytest.mark.asyncio
+async def test_subscriber_ignores_older_snapshot(
+    redis: FakeAsyncRedis,
+    cache: RatesCache,
+):
+    # Arrange
+    newer = make_snapshot(VERSION, "0.85")
+    older = make_snapshot(VERSION - timedelta(hours=1), "0.80")
+    cache.swap(newer)
+    await RatesPublisher(redis).publish(older)
+
+    # Act
+    loaded = await RatesSubscriber(redis, cache).load()
+
+    # Assert
+    assert_that(loaded).is_false()
+    assert_that(cache.snapshot).is_equal_to(newer)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("blob", [b"not zlib", zlib.compress(b"{}")])
+async def test_subscriber_survives_corrupt_snapshot(
+    redis: FakeAsyncRedis,
+    cache: RatesCache,
+    blob: bytes,
+):
+    # Arrange
+    task = asyncio.create_task(RatesSubscriber(redis, cache).run())
+    await asyncio.sleep(0.05)
+    snapshot = make_snapshot(VERSION, "0.85")
+
+    # Act
+    _ = await redis.set(SNAPSHOT_KEY, blob)
+    _ = await redis.publish(INVALIDATION_CHANNEL, "")
+    await asyncio.sleep(0.05)
+    await RatesPublisher(redis).publish(snapshot)
+    for _ in range(50):
+        if cache.snapshot is not None:
+            break
+        await asyncio.sleep(0.01)
+    running = not task.done()
+    task.cancel()
+
+    # Assert
+    assert_that(running).is_true()
+    assert_that(cache.snapshot).is_equal_to(snapshot)
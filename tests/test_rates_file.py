@@ -0,0 +1,119 @@
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import create_autospec
+
+import pytest
+from assertpy import assert_that
+from conftest import make_snapshot
+
+from db.manager import DBManager
+from rates_cache import RatesCache
+from rates_file import (
+    RatesFileReader,
+    RatesFileWatcher,
+    write_rates_file,
+)
+from service import Service
+
+VERSION = datetime(2025, 5, 1, 12, 0, 0, 123456, tzinfo=UTC)
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    return tmp_path / "rates.bin"
+
+
+@pytest.fixture
+def cache() -> RatesCache:
+    db_manager = create_autospec(DBManager, instance=True)
+    return RatesCache(db_manager, Service.BASE_CURRENCY, ttl=3600)
+
+
+def test_round_trip_keeps_snapshot(path: Path):
+    # Arrange
+    snapshot = make_snapshot(VERSION, "0.85")
+    write_rates_file(path, snapshot)
+
+    # Act
+    mapped = RatesFileReader(path).load()
+
+    # Assert
+    assert mapped is not None
+    assert_that(mapped.to_snapshot()).is_equal_to(snapshot)
+
+
+def test_cross_rates_are_not_copied(path: Path):
+    # Arrange
+    write_rates_file(path, make_snapshot(VERSION, "0.8"))
+    mapped = RatesFileReader(path).load()
+    assert mapped is not None
+
+    # Act
+    cross_rates = mapped.cross_rates()
+
+    # Assert
+    assert_that(cross_rates.base_rates.flags.owndata).is_false()
+    assert_that(cross_rates.base_rates.flags.writeable).is_false()
+    assert_that(cross_rates.rate(2, 5)).is_close_to(200.15432, 1e-5)
+
+
+def test_reader_maps_only_replaced_file(path: Path):
+    # Arrange
+    reader = RatesFileReader(path)
+    write_rates_file(path, make_snapshot(VERSION, "0.85"))
+    first = reader.load()
+
+    # Act
+    unchanged = reader.load()
+    write_rates_file(path, make_snapshot(VERSION + timedelta(hours=1), "0.9"))
+    second = reader.load()
+
+    # Assert
+    assert first is not None
+    assert second is not None
+    assert_that(unchanged).is_none()
+    assert_that(second.to_snapshot().rates["GBP"]).is_equal_to(
+        Decimal("0.9"),
+    )
+    # The old mapping stays readable after the file was replaced
+    assert_that(first.to_snapshot().rates["GBP"]).is_equal_to(
+        Decimal("0.85"),
+    )
+
+
+def test_reader_rejects_truncated_file(path: Path):
+    # Arrange
+    write_rates_file(path, make_snapshot(VERSION, "0.85"))
+    path.write_bytes(path.read_bytes()[:-1])
+
+    # Act/Assert
+    with pytest.raises(ValueError, match="truncated"):
+        _ = RatesFileReader(path).load()
+
+
+def test_watcher_swaps_cache(path: Path, cache: RatesCache):
+    # Arrange
+    watcher = RatesFileWatcher(RatesFileReader(path), cache)
+    write_rates_file(path, make_snapshot(VERSION, "0.85"))
+
+    # Act
+    loaded = watcher.load()
+
+    # Assert
+    assert_that(loaded).is_true()
+    assert_that(cache.snapshot).is_equal_to(make_snapshot(VERSION, "0.85"))
+
+
+def test_watcher_ignores_older_file(path: Path, cache: RatesCache):
+    # Arrange
+    newer = make_snapshot(VERSION, "0.85")
+    cache.swap(newer)
+    write_rates_file(path, make_snapshot(VERSION - timedelta(hours=1), "0.8"))
+
+    # Act
+    loaded = RatesFileWatcher(RatesFileReader(path), cache).load()
+
+    # Assert
+    assert_that(loaded).is_false()
+    assert_that(cache.snapshot).is_equal_to(newer)
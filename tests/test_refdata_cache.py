@@ -0,0 +1,152 @@
+from decimal import Decimal
+from unittest.mock import MagicMock, create_autospec
+
+import pytest
+from assertpy import assert_that
+
+from db.manager import DBManager
+from db.models import Account, Category
+from misc import CategoryType
+from refdata_cache import RefDataCache
+
+USER_ID = 1
+FOOD = Category(
+    category_id=1,
+    user_id=USER_ID,
+    name="Food",
+    type=CategoryType.EXPENSE,
+)
+TRANSPORT = Category(
+    category_id=2,
+    user_id=USER_ID,
+    name="Transport",
+    type=CategoryType.EXPENSE,
+)
+DEFAULT_ACCOUNT = Account(
+    account_id=1,
+    user_id=USER_ID,
+    name="Default",
+    balance=Decimal(0),
+    currency_id=1,
+)
+
+
+@pytest.fixture
+def db_manager_mock() -> MagicMock:
+    db_manager = create_autospec(DBManager, instance=True)
+    db_manager.get_refdata_version.return_value = 1
+    db_manager.get_user_categories.return_value = [FOOD]
+    db_manager.get_accounts.return_value = [DEFAULT_ACCOUNT]
+    return db_manager
+
+
+@pytest.fixture
+def sut(db_manager_mock: MagicMock) -> RefDataCache:
+    return RefDataCache(db_manager_mock, maxsize=10)
+
+
+@pytest.mark.asyncio
+async def test_get_loads_once(sut: RefDataCache, db_manager_mock: MagicMock):
+    # Act
+    first = await sut.get(USER_ID)
+    second = await sut.get(USER_ID)
+
+    # Assert
+    assert_that(second).is_equal_to(first)
+    assert_that(first.version).is_equal_to(1)
+    assert_that(list(first.categories.values())).is_equal_to([FOOD])
+    assert_that(first.accounts).is_equal_to({1: DEFAULT_ACCOUNT})
+    db_manager_mock.get_user_categories.assert_awaited_once_with(USER_ID)
+
+
+@pytest.mark.asyncio
+async def test_unknown_category_reloads_once(
+    sut: RefDataCache,
+    db_manager_mock: MagicMock,
+):
+    # Arrange
+    _ = await sut.get(USER_ID)
+    db_manager_mock.get_user_categories.return_value = [FOOD, TRANSPORT]
+
+    # Act
+    created_elsewhere = await sut.get_category(USER_ID, TRANSPORT.category_id)
+    missing = await sut.get_category(USER_ID, 42)
+    cached = await sut.get_category(USER_ID, FOOD.category_id)
+
+    # Assert
+    assert_that(created_elsewhere).is_equal_to(TRANSPORT)
+    assert_that(missing).is_none()
+    assert_that(cached).is_equal_to(FOOD)
+    assert_that(db_manager_mock.get_user_categories.await_count).is_equal_to(
+        3,
+    )
+
+
+@pytest.mark.asyncio
+async def test_validate_drops_stale_entry(
+    sut: RefDataCache,
+    db_manager_mock: MagicMock,
+):
+    # Arrange
+    _ = await sut.get(USER_ID)
+
+    # Act
+    sut.validate(USER_ID, 1)
+    _ = await sut.get(USER_ID)
+    sut.validate(USER_ID, 2)
+    _ = await sut.get(USER_ID)
+
+    # Assert
+    assert_that(db_manager_mock.get_user_categories.await_count).is_equal_to(
+        2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_unknown_user_is_not_cached(
+    sut: RefDataCache,
+    db_manager_mock: MagicMock,
+):
+    # Arrange
+    db_manager_mock.get_refdata_version.return_value = None
+    db_manager_mock.get_user_categories.return_value = []
+    db_manager_mock.get_accounts.return_value = []
+
+    # Act
+    refdata = await sut.get(USER_ID)
+    _ = await sut.get(USER_ID)
+
+    # Assert
+    assert_that(refdata.categories).is_empty()
+    assert_that(db_manager_mock.get_user_categories.await_count).is_equal_to(
+        2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_notices_writes_elsewhere_after_ttl(
+    db_manager_mock: MagicMock,
+):
+    # Arrange
+    now = 0.0
+    sut = RefDataCache(db_manager_mock, maxsize=10, ttl=60, clock=lambda: now)
+    _ = await sut.get(USER_ID)
+    db_manager_mock.get_user_categories.return_value = [FOOD, TRANSPORT]
+
+    # Act
+    now = 30.0
+    cached = await sut.get(USER_ID)
+    now = 61.0
+    unchanged = await sut.get(USER_ID)
+    db_manager_mock.get_refdata_version.return_value = 2
+    now = 122.0
+    reloaded = await sut.get(USER_ID)
+
+    # Assert
+    assert_that(cached.categories).is_length(1)
+    assert_that(unchanged.categories).is_length(1)
+    assert_that(reloaded.version).is_equal_to(2)
+    assert_that(reloaded.categories).is_length(2)
+    assert_that(db_manager_mock.get_user_categories.await_count).is_equal_to(
+        2,
+    )
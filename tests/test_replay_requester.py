@@ -0,0 +1,88 @@
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from assertpy import assert_that
+from conftest import StubResponse, StubServer
+
+from db.models import Currency
+from requesters import (
+    ExchangeRatesRequester,
+    RecordingRatesRequester,
+    ReplayRatesRequester,
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "rates"
+EUR = Currency(currency_id=1, name="Euro", iso_code="EUR", symbol="€")
+USD = Currency(currency_id=2, name="US Dollar", iso_code="USD", symbol="$")
+
+
+@pytest.mark.asyncio
+async def test_replay_cycles_through_recordings():
+    # Arrange
+    sut = ReplayRatesRequester(FIXTURES_DIR)
+
+    # Act
+    timestamps = [(await sut.fetch(EUR)).timestamp for _ in range(4)]
+
+    # Assert
+    assert_that(timestamps).is_equal_to(
+        [1746093600, 1746097200, 1746100800, 1746093600],
+    )
+
+
+@pytest.mark.asyncio
+async def test_replay_waits_for_latency_with_jitter():
+    # Arrange
+    sut = ReplayRatesRequester(FIXTURES_DIR, latency=0.05, jitter=0.02, seed=1)
+
+    # Act
+    started = time.monotonic()
+    for _ in range(3):
+        _ = await sut.fetch(EUR)
+    elapsed = time.monotonic() - started
+
+    # Assert
+    assert_that(elapsed).is_between(3 * 0.03, 3 * 0.07 + 0.05)
+
+
+@pytest.mark.asyncio
+async def test_replay_without_recordings():
+    # Arrange
+    sut = ReplayRatesRequester(FIXTURES_DIR)
+
+    # Act/Assert
+    with pytest.raises(FileNotFoundError):
+        _ = await sut.fetch(USD)
+
+
+@pytest.mark.asyncio
+async def test_recorded_responses_are_replayed(
+    stub_server: StubServer,
+    tmp_path: Path,
+):
+    # Arrange
+    stub_server.responses = [
+        StubResponse(json={"base": "EUR", "timestamp": 1, "rates": {}}),
+        StubResponse(
+            json={"base": "EUR", "timestamp": 2, "rates": {"GBP": 0.85}},
+        ),
+    ]
+    recorder = RecordingRatesRequester(
+        ExchangeRatesRequester(url=stub_server.url, retries=0),
+        tmp_path,
+    )
+    recorded = [await recorder.fetch(EUR) for _ in range(2)]
+    await recorder.aclose()
+
+    # Act
+    replay = ReplayRatesRequester(tmp_path)
+    replayed = [await replay.fetch(EUR) for _ in range(2)]
+
+    # Assert
+    assert_that(replayed).is_equal_to(recorded)
+    assert_that(replayed[1].data).is_equal_to({"GBP": Decimal("0.85")})
+    assert_that(sorted(p.name for p in tmp_path.iterdir())).is_equal_to(
+        ["EUR-0000.json", "EUR-0001.json"],
+    )
@@ -0,0 +1,109 @@
+from collections.abc import AsyncGenerator
+from decimal import Decimal
+
+import httpx
+import pytest
+from assertpy import assert_that
+from conftest import StubResponse, StubServer
+
+from db.models import Currency
+from requesters import ExchangeRatesRequester, decode_rates
+
+EUR = Currency(currency_id=1, name="Euro", iso_code="EUR", symbol="€")
+RATES = {"base": "EUR", "timestamp": 1746093600, "rates": {"GBP": 0.85}}
+
+
+@pytest.fixture
+async def sut(stub_server: StubServer) -> AsyncGenerator:
+    requester = ExchangeRatesRequester(
+        url=stub_server.url,
+        api_key="secret",
+        retries=2,
+        backoff=0,
+    )
+    yield requester
+    await requester.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_reuses_connection(
+    sut: ExchangeRatesRequester,
+    stub_server: StubServer,
+):
+    # Arrange
+    stub_server.responses = [StubResponse(json=RATES)]
+
+    # Act
+    for _ in range(3):
+        rates = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(rates.data).is_equal_to({"GBP": Decimal("0.85")})
+    assert_that(stub_server.requests).is_length(3)
+    assert_that(stub_server.requests[0]).contains("access_key=secret")
+    assert_that(stub_server.connections).is_equal_to(1)
+
+
+@pytest.mark.asyncio
+async def test_fetch_retries_failures(
+    sut: ExchangeRatesRequester,
+    stub_server: StubServer,
+):
+    # Arrange
+    stub_server.responses = [
+        StubResponse(drop=True),
+        StubResponse(status=503),
+        StubResponse(json=RATES),
+    ]
+
+    # Act
+    rates = await sut.fetch(EUR)
+
+    # Assert
+    assert_that(rates.source_iso_code).is_equal_to("EUR")
+    assert_that(stub_server.requests).is_length(3)
+
+
+@pytest.mark.asyncio
+async def test_fetch_gives_up_after_retries(
+    sut: ExchangeRatesRequester,
+    stub_server: StubServer,
+):
+    # Arrange
+    stub_server.responses = [StubResponse(status=503)]
+
+    # Act/Assert
+    with pytest.raises(httpx.HTTPStatusError):
+        _ = await sut.fetch(EUR)
+    assert_that(stub_server.requests).is_length(3)
+
+
+@pytest.mark.asyncio
+async def test_fetch_does_not_retry_client_errors(
+    sut: ExchangeRatesRequester,
+    stub_server: StubServer,
+):
+    # Arrange
+    stub_server.responses = [StubResponse(status=401)]
+
+    # Act/Assert
+    with pytest.raises(httpx.HTTPStatusError):
+        _ = await sut.fetch(EUR)
+    assert_that(stub_server.requests).is_length(1)
+
+
+def test_decode_rates_keeps_every_digit():
+    # Arrange
+    content = (
+        b'{"base": "EUR", "timestamp": 1746093600,'
+        b' "rates": {"JPY": 160.12345678901234567, "EUR": 1}}'
+    )
+
+    # Act
+    rates = decode_rates(content)
+
+    # Assert
+    assert_that(rates.timestamp).is_equal_to(1746093600)
+    assert_that(rates.data).is_equal_to(
+        {"JPY": Decimal("160.12345678901234567"), "EUR": Decimal(1)},
+    )
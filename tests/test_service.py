@@ -1,5 +1,5 @@
 from typing import Callable
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 from assertpy import assert_that
@@ -7,9 +7,11 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 
 from db.manager import DBManager
 from db.models import Category
-from misc import CategoryType
+from misc import DEFAULT_CATEGORIES, CategoryType
 from service import Service
 
+TG_ID = 123456789
+
 
 def sort(categories: list[Category]):
     return sorted(categories, key=lambda x: x.category_id)
@@ -113,3 +115,56 @@ async def test_register_user(
 
     assert_that(categories).is_length(9)
     assert_that(sort(categories)).is_equal_to(sort(expected_categories))
+
+
+@pytest.mark.asyncio
+async def test_get_or_register_user_registers_once(
+    sut: Service,
+    db_manager: DBManager,
+    create_currency: Callable,
+    get_user: Callable,
+    get_accounts: Callable,
+    get_user_categories: Callable,
+) -> None:
+    # Arrange
+    currency = await create_currency("United States dollar", "USD", "$")
+    other_process = Service(db_manager, MagicMock())
+
+    # Act
+    user_id = await sut.get_or_register_user(TG_ID)
+    same_user_id = await other_process.get_or_register_user(TG_ID)
+    other_user_id = await sut.get_or_register_user(TG_ID + 1)
+
+    # Assert
+    assert_that(same_user_id).is_equal_to(user_id)
+    assert_that(other_user_id).is_not_equal_to(user_id)
+
+    user = await get_user(user_id)
+    accounts = await get_accounts(user_id)
+    categories = await get_user_categories(user_id)
+    assert_that(user).has_currency_id(currency.currency_id)
+    assert_that(accounts).is_length(1)
+    assert_that(accounts[0]).has_name("Default")
+    assert_that(accounts[0]).has_currency_id(currency.currency_id)
+    assert_that(sorted((c.name, c.type) for c in categories)).is_equal_to(
+        sorted((c["name"], c["category_type"]) for c in DEFAULT_CATEGORIES),
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_or_register_user_answers_known_ids_from_memory(
+    sut: Service,
+    db_manager: DBManager,
+    create_currency: Callable,
+) -> None:
+    # Arrange
+    _ = await create_currency("United States dollar", "USD", "$")
+    user_id = await sut.get_or_register_user(TG_ID)
+
+    # Act
+    with patch.object(db_manager, "transaction") as transaction_mock:
+        cached_user_id = await sut.get_or_register_user(TG_ID)
+
+    # Assert
+    assert_that(cached_user_id).is_equal_to(user_id)
+    transaction_mock.assert_not_called()
@@ -0,0 +1,76 @@
+import asyncio
+from collections.abc import AsyncGenerator
+
+import pytest
+from assertpy import assert_that
+from fakeredis import FakeAsyncRedis
+
+from worker.single_flight import LeaseLostError, SingleFlight
+
+NAME = "update_currency_rates"
+
+
+@pytest.fixture
+async def redis() -> AsyncGenerator:
+    client = FakeAsyncRedis()
+    yield client
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_runs_one_at_a_time(redis: FakeAsyncRedis):
+    # Arrange
+    started = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def job() -> str:
+        started.set()
+        _ = await finish.wait()
+        return "done"
+
+    first = asyncio.create_task(SingleFlight(redis, NAME).run(job))
+    _ = await started.wait()
+
+    # Act
+    overlapping = await SingleFlight(redis, NAME).run(job)
+    finish.set()
+    result = await first
+    started.clear()
+    after = await SingleFlight(redis, NAME).run(job)
+
+    # Assert
+    assert_that(overlapping).is_none()
+    assert_that(result).is_equal_to("done")
+    assert_that(after).is_equal_to("done")
+
+
+@pytest.mark.asyncio
+async def test_renews_the_lease_while_running(redis: FakeAsyncRedis):
+    # Arrange
+    async def job() -> str:
+        await asyncio.sleep(0.5)
+        return "done"
+
+    # Act
+    result = await SingleFlight(redis, NAME, ttl=0.3).run(job)
+
+    # Assert
+    assert_that(result).is_equal_to("done")
+
+
+@pytest.mark.asyncio
+async def test_stops_a_run_that_lost_its_lease(redis: FakeAsyncRedis):
+    # Arrange
+    finished = False
+
+    async def job() -> None:
+        nonlocal finished
+        # As if the lease expired while the run stalled
+        _ = await redis.delete(f"single-flight:{NAME}")
+        await asyncio.sleep(1)
+        finished = True
+
+    # Act / Assert
+    with pytest.raises(LeaseLostError):
+        await SingleFlight(redis, NAME, ttl=0.3).run(job)
+    assert_that(finished).is_false()
@@ -0,0 +1,60 @@
+from collections.abc import AsyncGenerator
+
+import pytest
+from assertpy import assert_that
+from prometheus_client import REGISTRY
+from taskiq import InMemoryBroker
+
+from worker.middleware import SENT_AT, TaskMetricsMiddleware
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator:
+    broker = InMemoryBroker().with_middlewares(TaskMetricsMiddleware())
+    await broker.startup()
+    yield broker
+    await broker.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_records_lag_duration_and_outcome(broker: InMemoryBroker):
+    # Arrange
+    @broker.task(task_name="metered")
+    async def metered(fail: bool) -> bool:  # noqa: FBT001
+        if fail:
+            msg = "Failed"
+            raise RuntimeError(msg)
+        return True
+
+    lags = sample("task_queue_lag_seconds_count", task_name="metered")
+    durations = sample("task_duration_seconds_count", task_name="metered")
+    succeeded = sample(
+        "task_runs_total",
+        task_name="metered",
+        outcome="success",
+    )
+    failed = sample("task_runs_total", task_name="metered", outcome="failure")
+
+    # Act
+    sent = await metered.kiq(fail=False)
+    result = await sent.wait_result(timeout=1)
+    _ = await (await metered.kiq(fail=True)).wait_result(timeout=1)
+
+    # Assert
+    assert_that(result.labels).contains_key(SENT_AT)
+    assert_that(
+        sample("task_queue_lag_seconds_count", task_name="metered"),
+    ).is_equal_to(lags + 2)
+    assert_that(
+        sample("task_duration_seconds_count", task_name="metered"),
+    ).is_equal_to(durations + 2)
+    assert_that(
+        sample("task_runs_total", task_name="metered", outcome="success"),
+    ).is_equal_to(succeeded + 1)
+    assert_that(
+        sample("task_runs_total", task_name="metered", outcome="failure"),
+    ).is_equal_to(failed + 1)
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import UTC, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from assertpy import assert_that
+from sqlalchemy.ext.asyncio import AsyncEngine
+from telegram import Chat, Message, Update, User
+
+from db.manager import DBManager
+from update_processor import UserOrderedUpdateProcessor
+
+DATE = datetime(2025, 5, 1, 12, 0, tzinfo=UTC)
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=DATE,
+            chat=Chat(id=user_id, type=Chat.PRIVATE),
+            from_user=User(id=user_id, first_name="User", is_bot=False),
+            text=f"/edit {update_id}",
+        ),
+    )
+
+
+class Handler:
+    """Records which updates ran and how many ran at once."""
+
+    def __init__(self, delays: dict[int, float] | None = None) -> None:
+        self.handled: list[tuple[int, int]] = []
+        self.running = 0
+        self.max_running = 0
+        self._delays = delays or {}
+
+    async def __call__(self, update: Update) -> None:
+        assert update.effective_user is not None
+        user_id = update.effective_user.id
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self._delays.get(user_id, 0.01))
+        finally:
+            self.running -= 1
+        self.handled.append((user_id, update.update_id))
+
+
+async def process(
+    sut: UserOrderedUpdateProcessor,
+    handler: Handler,
+    updates: list[Update],
+) -> None:
+    # The application starts one task per update, in the order received
+    await asyncio.gather(
+        *(
+            asyncio.create_task(sut.process_update(update, handler(update)))
+            for update in updates
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_updates_of_one_user_keep_their_order():
+    # Arrange
+    sut = UserOrderedUpdateProcessor(4)
+    handler = Handler()
+    updates = [make_update(i, user_id=i % 2) for i in range(10)]
+
+    # Act
+    await process(sut, handler, updates)
+
+    # Assert
+    for user_id in (0, 1):
+        assert_that(
+            [i for u, i in handler.handled if u == user_id],
+        ).is_equal_to(list(range(user_id, 10, 2)))
+    assert_that(handler.max_running).is_equal_to(2)
+
+
+@pytest.mark.asyncio
+async def test_running_updates_are_bounded():
+    # Arrange
+    sut = UserOrderedUpdateProcessor(3)
+    handler = Handler()
+    updates = [make_update(i, user_id=i) for i in range(10)]
+
+    # Act
+    await process(sut, handler, updates)
+
+    # Assert
+    assert_that(handler.handled).is_length(10)
+    assert_that(handler.max_running).is_equal_to(3)
+
+
+@pytest.mark.asyncio
+async def test_busy_user_does_not_stall_others():
+    # Arrange
+    sut = UserOrderedUpdateProcessor(2)
+    handler = Handler(delays={1: 0.05, 2: 0})
+    updates = [
+        *(make_update(i, user_id=1) for i in range(5)),
+        make_update(5, user_id=2),
+    ]
+
+    # Act
+    await process(sut, handler, updates)
+
+    # Assert
+    assert_that(handler.handled[0]).is_equal_to((2, 5))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_transactions_use_their_own_connection():
+    # Arrange
+    engine = MagicMock(spec=AsyncEngine)
+    engine.begin.side_effect = lambda: MagicMock()
+    sut = DBManager(engine)
+    seen = []
+
+    async def query() -> None:
+        async with sut.transaction():
+            querier = sut._querier  # noqa: SLF001
+            await asyncio.sleep(0.01)
+            seen.append(querier is sut._querier)  # noqa: SLF001
+
+    # Act
+    await asyncio.gather(query(), query())
+
+    # Assert
+    assert_that(seen).is_equal_to([True, True])
+    with pytest.raises(RuntimeError):
+        _ = sut._querier  # noqa: SLF001
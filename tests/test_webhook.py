@@ -0,0 +1,219 @@
+import asyncio
+import os
+import signal
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from assertpy import assert_that
+from conftest import OfflineBot
+from telegram import Update
+from telegram.ext import (
+    Application,
+    ApplicationBuilder,
+    CommandHandler,
+    ContextTypes,
+    MessageHandler,
+    filters,
+)
+
+from controller import Controller
+from service import Service
+from update_processor import UserOrderedUpdateProcessor
+from webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+UPDATES_DIR = Path(__file__).parent / "fixtures" / "updates"
+SECRET = "s3cret"  # noqa: S105
+
+
+class WebhookBot(OfflineBot):
+    """Bot that registers its webhook without asking Telegram."""
+
+    async def set_webhook(self, *_: object, **__: object) -> bool:
+        return True
+
+
+@pytest.fixture
+def service_mock() -> MagicMock:
+    return MagicMock(spec=Service)
+
+
+@pytest.fixture
+def messages() -> asyncio.Queue:
+    return asyncio.Queue()
+
+
+@pytest.fixture
+async def app(
+    service_mock: MagicMock,
+    messages: asyncio.Queue,
+) -> AsyncGenerator:
+    async def record(update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
+        await messages.put(update)
+
+    application = (
+        ApplicationBuilder()
+        .bot(OfflineBot("1:offline"))
+        .updater(None)
+        .concurrent_updates(UserOrderedUpdateProcessor(4))
+        .build()
+    )
+    application.add_handler(
+        CommandHandler("start", Controller(service_mock).start),
+    )
+    application.add_handler(MessageHandler(filters.TEXT, record))
+    async with application:
+        await application.start()
+        yield application
+        await application.stop()
+
+
+@pytest.fixture
+async def server(app: Application) -> AsyncGenerator:
+    webhook = WebhookServer(
+        app,
+        url="https://bot.example.com/telegram",
+        secret_token=SECRET,
+        listen="127.0.0.1",
+        port=0,
+        queue_size=2,
+    )
+    await webhook.start()
+    yield webhook
+    await webhook.stop()
+
+
+@pytest.fixture
+async def client(server: WebhookServer) -> AsyncGenerator:
+    host, port = server.address
+    async with httpx.AsyncClient(
+        base_url=f"http://{host}:{port}",
+        headers={SECRET_TOKEN_HEADER: SECRET},
+    ) as http_client:
+        yield http_client
+
+
+async def post_update(client: httpx.AsyncClient, name: str) -> httpx.Response:
+    return await client.post(
+        "/telegram",
+        content=(UPDATES_DIR / name).read_bytes(),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+@pytest.mark.asyncio
+async def test_recorded_update_reaches_controller(
+    client: httpx.AsyncClient,
+    service_mock: MagicMock,
+):
+    # Arrange
+    registered = asyncio.Event()
+    service_mock.get_or_register_user.side_effect = lambda *_: registered.set()
+
+    # Act
+    response = await post_update(client, "start.json")
+    _ = await asyncio.wait_for(registered.wait(), 1)
+
+    # Assert
+    assert_that(response.status_code).is_equal_to(200)
+    service_mock.get_or_register_user.assert_awaited_once_with(123456789)
+
+
+@pytest.mark.asyncio
+async def test_wrong_secret_token_is_refused(
+    client: httpx.AsyncClient,
+    messages: asyncio.Queue,
+):
+    # Arrange
+    client.headers[SECRET_TOKEN_HEADER] = "guess"
+
+    # Act
+    response = await post_update(client, "text.json")
+
+    # Assert
+    assert_that(response.status_code).is_equal_to(403)
+    assert_that(messages.empty()).is_true()
+
+
+@pytest.mark.asyncio
+async def test_malformed_update_is_rejected(client: httpx.AsyncClient):
+    # Act
+    responses = [
+        await client.post("/telegram", content=b"not json"),
+        await client.post("/telegram", json={"message": {}}),
+        await client.post("/telegram", json=None),
+    ]
+
+    # Assert
+    assert_that([r.status_code for r in responses]).is_equal_to(
+        [400, 400, 400],
+    )
+
+
+@pytest.mark.asyncio
+async def test_full_queue_answers_503(
+    client: httpx.AsyncClient,
+    server: WebhookServer,
+    app: Application,
+    messages: asyncio.Queue,
+):
+    # Arrange
+    release = asyncio.Event()
+
+    async def block(_: Update, __: ContextTypes.DEFAULT_TYPE) -> None:
+        _ = await release.wait()
+
+    app.add_handler(MessageHandler(filters.TEXT, block), group=-1)
+
+    # Act
+    statuses = [
+        (await post_update(client, "text.json")).status_code for _ in range(3)
+    ]
+    release.set()
+    handled = [await asyncio.wait_for(messages.get(), 1) for _ in range(2)]
+    retried = await post_update(client, "text.json")
+
+    # Assert
+    assert_that(statuses).is_equal_to([200, 200, 503])
+    assert_that(retried.status_code).is_equal_to(200)
+    assert_that(server.pending).is_less_than_or_equal_to(1)
+    assert_that(handled[0].effective_user.id).is_equal_to(123456789)
+
+
+@pytest.mark.asyncio
+async def test_sigterm_stops_the_server_gracefully():
+    # Arrange
+    stopped = asyncio.Event()
+
+    async def on_stop(_: Application) -> None:
+        stopped.set()
+
+    application = (
+        ApplicationBuilder()
+        .bot(WebhookBot("1:offline"))
+        .updater(None)
+        .post_stop(on_stop)
+        .build()
+    )
+    sut = WebhookServer(
+        application,
+        url="https://bot.example.com/telegram",
+        secret_token=SECRET,
+        listen="127.0.0.1",
+        port=0,
+    )
+    serving = asyncio.create_task(sut.serve())
+    for _ in range(100):
+        if application.running:
+            break
+        await asyncio.sleep(0.01)
+
+    # Act
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.wait_for(serving, timeout=5)
+
+    # Assert
+    assert_that(stopped.is_set()).is_true()
+    assert_that(application.running).is_false()